@@ -2,6 +2,8 @@
 # Imports
 ########################################################################################################
 import logging
+import os
+from contextlib import nullcontext
 from time import time
 import powerfactory as pf
 import math
@@ -9,14 +11,25 @@ import json
 import sys
 
 # Importiere aus Projektpackages
-from main.faults import Faults, Faults_values
+from main.grid_model import GridModel
 from main.utils_db import (read_project_attributes_from_moebase,
                                   convert_df_to_dict,
                                   read_project_attributes_from_excel)
 from main.utils_sqlite3 import get_db, get_faults_by_test
+from main.pf_index import ObjectIndex
+from main.pf_proxy import WriteCache
+from main.runner import run_parallel, PowerFactoryEngine
+from main.instrumentation import Instrumentation, span
+from main.frt_eval import evaluate_campaign
+from main.result_cache import ResultCache
+from main.run_journal import RunJournal, run_fingerprint
+from main.runtime_history import RuntimeHistory
+from main.pipeline import Pipeline
+from main.presolver import presolve, presolve_messages, park_active_power
 from main.pf_functions import (set_grid, del_faults, del_scenarios, create_faults_scenarios,
                                del_res_vars, clear_vis, set_res_vars, create_load_flow_controller,
-                               set_load_flow_controller, execute_simulation, execute_export)
+                               sync_faults_scenarios, sync_res_vars,
+                               set_load_flow_controller, execute_simulation, execute_export, rated_currents)
 
 
 ########################################################################################################
@@ -33,6 +46,9 @@ if (logger.hasHandlers()):
     logger.handlers.clear()
 logger.addHandler(file_handler)
 
+# Datenverzeichnis neben dem Skript (unabhängig vom Arbeitsverzeichnis von PowerFactory)
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
 # Defniere shortnames, die aus der MOEbase abgerufen werden sollen.
 shortnames = ['zYkGradNB',  # Netzimpedanzwinkel am NAP Yk [°]
               'zSkkVAnb',  #  Netzkurzschlussleistung am NAP Sk [kVA]
@@ -48,6 +64,7 @@ shortnames = ['zYkGradNB',  # Netzimpedanzwinkel am NAP Yk [°]
               'zUsollkVnb', # Reglersollspannung Usoll [kV]
               'sAnschlussSonstNAPnb'] # Sonstiges
 
+tstart = time() # Startzeit für die Zeitauswertung
 app = pf.GetApplication() # Greife auf PowerFactory zu
 app.EchoOff() # Deaktiviert das User Interface von PowerFactory
 app.ClearOutputWindow() # Ausgabefenster leeren
@@ -59,6 +76,63 @@ type = script.type
 t_nachfehler = script.t_nachfehler
 flag_load_flow_unsym = script.lfd_unsym
 t_sim = script.t_sim
+# Optional: vorhandene Betriebs-/Fehlerfälle und Variablenauswahlen abgleichen statt neu erstellen
+flag_sync = getattr(script, "sync", 0)
+# Optional: Versuche parallel in num_workers PowerFactory-Instanzen (Engine-Modus) simulieren.
+# worker_project: Projekt je Worker mit Platzhalter {worker}, z.B. "Park_{worker}" (Kopien des Projekts)
+# python_exe: Python-Interpreter für die Workerprozesse
+num_workers = getattr(script, "num_workers", 1)
+worker_project = getattr(script, "worker_project", "")
+python_exe = getattr(script, "python_exe", "")
+# Optional: cProfile (profile=1) und tracemalloc (memory=1) im Zeitbericht
+flag_profile = getattr(script, "profile", 0)
+flag_memory = getattr(script, "memory", 0)
+# Optional: Exportdateien je Versuch in eine binäre Ergebnisdatei Versuch<N>.dynres übernehmen (store=1),
+# keep_dat=0: Exportdateien (*.dat) danach löschen
+flag_store = getattr(script, "store", 0)
+flag_keep_dat = getattr(script, "keep_dat", 1)
+# Optional: alle Variablen eines Versuchs mit einem ComRes-Aufruf exportieren und in Python aufteilen
+flag_single_export = getattr(script, "single_export", 0)
+# Optional: Export mit voller Auflösung nur um Fehlereintritt/-klärung (t_before/t_after in s),
+# außerhalb mit Schrittweite dt_steady in s (decimate=1). Verkleinert die abgelegten Dateien, ComRes schreibt
+# weiterhin mit voller Auflösung
+if getattr(script, "decimate", 0):
+    decimation = {"t_before": getattr(script, "t_before", 0.1), "t_after": getattr(script, "t_after", 0.5),
+                  "dt_steady": getattr(script, "dt_steady", 0.01)}
+else:
+    decimation = None
+# Optional: FRT-Auswertung der Kampagne (FGW TR8) nach der Simulation als FRT_Auswertung.csv (evaluate=1)
+flag_evaluate = getattr(script, "evaluate", 0)
+# Bemessungsströme in kA je Messstelle für den k-Faktor als JSON (z.B. '{"NAP": 0.58, "EZE": 0.29}'),
+# leer: aus Bemessungsleistung der EZE und Nennspannung der Messstelle (rated_currents)
+i_base = json.loads(getattr(script, "i_base", "") or "null")
+# Optional: Ergebniscache auf der lokalen Platte (cache_dir), unveränderte Versuche werden nicht erneut simuliert.
+# cache_max_gb: maximale Größe in GB, model_version: bei Modelländerungen außerhalb der Elementdaten erhöhen
+cache_dir = getattr(script, "cache_dir", "")
+result_cache = ResultCache(cache_dir, max_bytes=int(getattr(script, "cache_max_gb", 10)*1024**3)) if cache_dir else None
+model_version = str(getattr(script, "model_version", ""))
+# Optional: Laufjournal (data/DB_Journal.db neben dem Skript), nach einem Abbruch setzt der nächste Aufruf beim ersten
+# unvollständigen Versuch fort (resume=1)
+flag_resume = getattr(script, "resume", 0)
+# Optional: Nachbearbeitung der Exporte (Aufteilen, Dezimieren, Ergebnisdatei, Cache) in pipeline_threads Threads
+# parallel zur Simulation des nächsten Versuchs (nur ohne parallele Worker, 0: aus)
+pipeline_threads = getattr(script, "pipeline_threads", 0)
+# Optional: Versuche mit gleichem Arbeitspunkt nacheinander simulieren, Lastfluss innerhalb der Gruppe
+# ohne Flachstart (nur ohne parallele Worker, warm_start=1)
+flag_warm_start = getattr(script, "warm_start", 0)
+# Optional: Vorfehler- und Restspannungen aller Versuche vor der Simulation analytisch prüfen (presolve=1)
+flag_presolve = getattr(script, "presolve", 0)
+
+# RuntimeHistory: class
+# Optional: Gemessene Laufzeiten je Projekt, Fehlertabelle und Versuch (data/DB_Runtime.db neben dem Skript).
+# Daraus werden die Laufzeiten geschätzt (Reihenfolge der parallelen Simulation, Restlaufzeit im Log) (history=1)
+flag_history = getattr(script, "history", 0)
+runtime_history = RuntimeHistory(os.path.join(DATA_DIR, "DB_Runtime.db")) if flag_history else None
+
+# Instrumentation: class
+# Zeichnet die Laufzeit je Stufe und Versuch auf (PowerFactory-Befehle vs. Ablauf/Export im Skript).
+# Der Bericht wird am Ende als Timing_DynSim.json gespeichert.
+instrumentation = Instrumentation("DynSim_VKM {}".format(projektnummer), flag_profile=flag_profile, flag_memory=flag_memory).start()
 
 logger.info("----------------------------------------")
 logger.info("Aufruf DynSim_VKM")
@@ -69,7 +143,8 @@ logger.info("----------------------------------------")
 # Liest die angegeben oder alle Attribute des gewählten Projekts aus der MOEbase/moeProduction-Datenbank.
 # Die Attribute werden als Pandas DataFrame zurückgegeben und als Excel-Datei gespeichert. 
 # df = read_project_attributes_from_moebase(projektnummer=projektnummer, shortnames=shortnames)
-df = read_project_attributes_from_excel()
+with span("read_project_attributes"):
+    df = read_project_attributes_from_excel()
 
 
 # Kontrolle des Rückgabewertes
@@ -93,10 +168,11 @@ logger.debug("Abgefragte Attribute:")
 for key in dict_grid_att.keys():
     logger.debug("{}: {}".format(key, dict_grid_att[key]))
 
-# Funktionsaufruf: calc_grid_data: classmethod von Faults_values
+# GridModel: class
 # Berechnet die Netzdaten für das Ersatzschaltbild (ElmVac/ElmSind) in PowerFactory.
-# Ergebnisse werden als Class Variables gespeichert.
-Faults_values.calc_grid_data(dict_grid_data=dict_grid_att, flag_debug=True)
+# Ergebnisse und Fehlerereignisse werden in der Instanz grid_model für diesen Lauf gespeichert.
+with span("calc_grid_data"):
+    grid_model = GridModel(dict_grid_data=dict_grid_att, flag_debug=True)
 
 
 # Funktionsaufruf: get_db(db_name="DB_Faults.db")
@@ -123,76 +199,167 @@ if isinstance(faults_param, str):
     logger.error("get_faults_by_test: {}".format(faults_param))
     sys.exit()
 
-# Erstelle für jedes Fehlerereignis eine Instanz der Klasse Faults_values
-Faults.list_of_faults = []
-for fault_param in faults_param:
-    # Fault_values: class
-    # Eine Klasse, die die alle Fehlerereignisse in PowerFactory gemäß VDE-AR-N 4110/4120 berechnen kann.
-    # Berechnet die Netzdaten gemäß FGW TR8 Rev.9 basierend auf den Daten des Anhangs VDE-AR-N 4110/4120 E9.
-    Faults_values(fault_param, dict_grid_att)
-# Faults.type = type
-# Faults.vde = vde
+# Funktionsaufruf: add_faults: method von GridModel
+# Berechnet Rf und Xf für alle Fehlerereignisse in einem Durchlauf (calc_fault_values_batch)
+# und speichert die Fehlerereignisse in der Fehlertabelle grid_model.list_of_faults (FaultTable).
+grid_model.add_faults(faults_param)
 logger.debug("Liste der Fehlerfälle:")
-for fault in Faults.list_of_faults:
+for fault in grid_model.list_of_faults:
    logger.debug("{}".format(fault)) 
 conn.close()
 
-# Funktionsaufruf: set_grid(app, Faults_values, logger)
-# Die Function "set_grid" stellt die durch die Klasse "Fault_values"
+# RunJournal: class
+# Speichert den Stand je Versuch (Betriebsfall angelegt, Lastfluss, Simulation, Export).
+# Ein abgebrochener Lauf mit unveränderten Netzdaten, Versuchen und Einstellungen wird fortgesetzt.
+if flag_resume:
+    journal = RunJournal(os.path.join(DATA_DIR, "DB_Journal.db"), "{}_{}".format(projektnummer, tablename),
+                         run_fingerprint(grid_model, {"t_sim": t_sim, "flag_load_flow_unsym": flag_load_flow_unsym,
+                                                      "flag_store": flag_store, "flag_keep_dat": flag_keep_dat,
+                                                      "decimation": decimation, "model_version": model_version})).start()
+    logger.info("Laufjournal: {}".format(journal))
+else:
+    journal = None
+# Bei Fortsetzung werden Betriebs-/Fehlerfälle und Variablenauswahl nur abgeglichen
+flag_sync = flag_sync or (journal is not None and journal.resumed)
+
+# ObjectIndex: class
+# Laufbezogener Index der berechnungsrelevanten Objekte. Ersetzt die wiederholten
+# Platzhaltersuchen mit GetCalcRelevantObjects in allen Funktionen aus pf_functions.
+# WriteCache: class
+# Die Objekte werden als ObjectProxy zurückgegeben: unveränderte Schreibzugriffe werden
+# übersprungen, Änderungen gebündelt vor dem nächsten Methodenaufruf (z.B. Save, Execute) geschrieben.
+obj_index = ObjectIndex(app, write_cache=WriteCache())
+
+# Funktionsaufruf: presolve(grid_model, p_park)
+# Berechnet Vorfehler- und Restspannungen aller Versuche im Ersatzschaltbild (Zeigerrechnung, Millisekunden)
+# und meldet ungültige Fehlerimpedanzen oder Restspannungen, die deutlich von uf abweichen.
+if flag_presolve:
+    with span("presolve"):
+        df_presolve = presolve(grid_model, p_park=park_active_power(obj_index))
+    df_presolve.to_csv(r'C:\Ausgabe_Skript\Vorloeser.csv', sep=";", decimal=",", index=False)
+    for message in presolve_messages(df_presolve):
+        logger.warning(message)
+        app.PrintWarn(message)
+    logger.info("Vorlöser: {} von {} Versuchen plausibel".format(int(df_presolve["passed"].sum()), len(df_presolve)))
+
+# Funktionsaufruf: set_grid(app, grid_model, logger)
+# Die Function "set_grid" stellt die in "grid_model"
 # berechneten Netzdaten in das Ersatzschaltbild des Netzes gemäß FGW TR8 ein.
-set_grid(app, Faults_values, logger)
+set_grid(app, grid_model, logger, obj_index=obj_index)
 
 # Funktionsaufruf: create_load_flow_controller(app, logger)
 # Die Function "create_load_flow_controller" erstellt einen Anlagenregler und nimmt die Voreinstellungen vor
-create_load_flow_controller(app, logger)
+# Im Abgleichmodus wird ein vorhandener Anlagenregler übernommen, damit die Betriebsfälle gültig bleiben
+if not flag_sync or not obj_index.get('*.ElmStactrl'):
+    create_load_flow_controller(app, logger, obj_index=obj_index)
 
-# Funktionsaufruf: del_faults(app, logger)
-# Die Function "del_faults" greift auf den Ordner Fehlerfälle zu und löscht
-# alle vorhandenen Fehlerfälle, wenn der String "Versuch_" im Namen enthalten ist.
-del_faults(app, logger)
+if flag_sync:
+    # Funktionsaufruf: sync_faults_scenarios(app, logger, grid_model)
+    # Die Funktion "sync_faults_scenarios" gleicht die vorhandenen Betriebs- und Fehlerfälle
+    # mit der Liste der ausgewählten Fehlerfälle ab und schreibt nur die Unterschiede.
+    sync_faults_scenarios(app, logger, grid_model, obj_index=obj_index)
+else:
+    # Funktionsaufruf: del_faults(app, logger)
+    # Die Function "del_faults" greift auf den Ordner Fehlerfälle zu und löscht
+    # alle vorhandenen Fehlerfälle, wenn der String "Versuch_" im Namen enthalten ist.
+    del_faults(app, logger, obj_index=obj_index)
 
-# Funktionsaufruf: del_scenarios(app, logger)
-# Die Function "del_scenarios" greift auf den Ordner "Betriebsfälle" zu und löscht
-# alle vorhandenen Betriebsfälle, wenn der String "Versuch_" im Namen enthalten ist.
-del_scenarios(app, logger)
+    # Funktionsaufruf: del_scenarios(app, logger)
+    # Die Function "del_scenarios" greift auf den Ordner "Betriebsfälle" zu und löscht
+    # alle vorhandenen Betriebsfälle, wenn der String "Versuch_" im Namen enthalten ist.
+    del_scenarios(app, logger, obj_index=obj_index)
 
-# Funktionsaufruf: create_faults_scenarios(app, logger, Faults)
-# Die Funktion "create_faults_scenarios" looped über die Liste der ausgewählten Fehlerfälle
-# und erstellt Betriebs- und Fehlerfälle.
-create_faults_scenarios(app, logger, Faults)
+    # Funktionsaufruf: create_faults_scenarios(app, logger, grid_model)
+    # Die Funktion "create_faults_scenarios" looped über die Liste der ausgewählten Fehlerfälle
+    # und erstellt Betriebs- und Fehlerfälle.
+    create_faults_scenarios(app, logger, grid_model, obj_index=obj_index)
 
 # Variablen für verschiedene Messstellen aus json laden
 with open("./data/json_res_vars.txt", "r") as f:
     res_vars = json.load(f)
 print(res_vars)
 
-# Funktionsaufruf: clear_vis(app, logger, flag_clear=True)
-# Die Function "clear_vis" greift auf die VIpages zu und entfernt alle Kurven aus dem Plot,
-# wenn "Trafo bus" oder "Line bus" im Namen enthalten ist.
-# flag_clear: Wenn flag aktiv, werden alle Kurven aus den Plots entfernt.
-clear_vis(app, logger, flag_clear=True)
-
-# Funktionsaufruf: del_res_vars(app, logger, flag_del=True):
-# Die Function "del_res_vars" greift auf die Variablenauswahl zu und löscht
-# alle vorhandenen Variablenauswahlen, wenn der Name NAP, EZE, MS, NS enthält.
-# flag_del: Wenn flag aktiv, werden alle Variablen mit NAP, EZE, MS oder NS im Namen gelöscht
-del_res_vars(app, logger, flag_del=True)
-
-# Funktionsaufruf: set_res_vars(app, logger, res_vars, flag_vis=False)
-# Die Function "set_res_vars" greift auf die Variablenauswahl zu und löscht
-# alle vorhandenen Variablenauswahlen, wenn der der Name NAP, EZE, MS, NS enthält.
-# flag_vis: wenn flag aktiv, werden VIPages und VIPlots erstellt. 
-set_res_vars(app, logger, res_vars, flag_vis=True)
-
-# Funktionsaufruf: execute_simulation(app, logger, Faults, flag_load_flow_unsym, res_vars):
+if flag_sync:
+    # Funktionsaufruf: sync_res_vars(app, logger, res_vars, flag_vis=True)
+    # Die Function "sync_res_vars" gleicht die vorhandenen Variablenauswahlen mit res_vars ab
+    # und baut VIPages nur für neue oder geänderte Variablenauswahlen neu auf.
+    sync_res_vars(app, logger, res_vars, flag_vis=True, obj_index=obj_index)
+else:
+    # Funktionsaufruf: clear_vis(app, logger, flag_clear=True)
+    # Die Function "clear_vis" greift auf die VIpages zu und entfernt alle Kurven aus dem Plot,
+    # wenn "Trafo bus" oder "Line bus" im Namen enthalten ist.
+    # flag_clear: Wenn flag aktiv, werden alle Kurven aus den Plots entfernt.
+    clear_vis(app, logger, flag_clear=True)
+
+    # Funktionsaufruf: del_res_vars(app, logger, flag_del=True):
+    # Die Function "del_res_vars" greift auf die Variablenauswahl zu und löscht
+    # alle vorhandenen Variablenauswahlen, wenn der Name NAP, EZE, MS, NS enthält.
+    # flag_del: Wenn flag aktiv, werden alle Variablen mit NAP, EZE, MS oder NS im Namen gelöscht
+    del_res_vars(app, logger, flag_del=True, obj_index=obj_index)
+
+    # Funktionsaufruf: set_res_vars(app, logger, res_vars, flag_vis=False)
+    # Die Function "set_res_vars" greift auf die Variablenauswahl zu und löscht
+    # alle vorhandenen Variablenauswahlen, wenn der der Name NAP, EZE, MS, NS enthält.
+    # flag_vis: wenn flag aktiv, werden VIPages und VIPlots erstellt. 
+    set_res_vars(app, logger, res_vars, flag_vis=True, obj_index=obj_index)
+
+if journal is not None:
+    journal.mark_new([fault.test for fault in grid_model.list_of_faults], "scenario")
+
+# Funktionsaufruf: execute_simulation(app, logger, grid_model, flag_load_flow_unsym, res_vars):
 # Die Function "execute_simulation" führt einen Lastfluss und Berechnung der Anfangsbedingungen durch.
 # Die Simulation wird durchgeführt und die Exportfunktion aufgerufen.
 # flag_load_flow_unsym: True: Alle Lastflüsse und Berechnung der Anfangsbedingungen werden unsymmetrisch ausgeführt
-execute_simulation(app, logger, Faults, flag_load_flow_unsym=flag_load_flow_unsym, res_vars=res_vars, t_sim=t_sim)
+if num_workers > 1 and worker_project:
+    # Funktionsaufruf: run_parallel(engine_factory, grid_model, res_vars, flag_load_flow_unsym, t_sim, num_workers)
+    # Verteilt die Versuche (längste zuerst) auf num_workers Instanzen mit je einem Projekt worker_project
+    results = run_parallel(PowerFactoryEngine(worker_project), grid_model, res_vars, flag_load_flow_unsym, t_sim,
+                           num_workers=num_workers, logger=logger, log_dir=r'C:\Ausgabe_Skript',
+                           python_exe=python_exe or None, flag_store=flag_store, flag_keep_dat=flag_keep_dat,
+                           flag_single_export=flag_single_export, decimation=decimation,
+                           result_cache=result_cache, model_version=model_version, journal=journal,
+                           runtime_history=runtime_history, project=projektnummer, tablename=tablename,
+                           sim_mode=obj_index.from_study_case('ComInc').iopt_sim)
+    for result in results:
+        if result["error"] is not None:
+            app.PrintError("Versuch {} abgebrochen (siehe Log_DynSim_worker{}.log)".format(result["test"], result["worker"]))
+else:
+    # Threads der Nachbearbeitung werden auch bei einem Abbruch beendet (nullcontext: ohne Pipeline)
+    with Pipeline(max_workers=pipeline_threads, logger=logger) if pipeline_threads else nullcontext() as pipeline:
+        execute_simulation(app, logger, grid_model, flag_load_flow_unsym=flag_load_flow_unsym, res_vars=res_vars, t_sim=t_sim, obj_index=obj_index,
+                           flag_store=flag_store, flag_keep_dat=flag_keep_dat, flag_single_export=flag_single_export,
+                           decimation=decimation, result_cache=result_cache, model_version=model_version, journal=journal,
+                           runtime_history=runtime_history, project=projektnummer, tablename=tablename, pipeline=pipeline,
+                           flag_warm_start=flag_warm_start)
+
+# Laufjournal abschließen, wenn alle Versuche fehlerfrei exportiert sind (sonst setzt der nächste Aufruf fort)
+if journal is not None:
+    logger.info("Laufjournal: {}".format(journal))
+    if not journal.pending(grid_model.list_of_faults):
+        journal.finish()
+
+# Funktionsaufruf: evaluate_campaign(export_dir, faults, i_base=i_base)
+# Wertet Restspannung, k-Faktor, An-/Einschwingzeit und Wiederkehr aller Versuche und Messstellen aus.
+if flag_evaluate:
+    if i_base is None:
+        i_base = rated_currents(app, logger, res_vars, obj_index=obj_index)
+    with span("frt_eval"):
+        df_frt = evaluate_campaign(r'C:\Ausgabe_Skript', grid_model.list_of_faults, i_base=i_base)
+    df_frt.to_csv(r'C:\Ausgabe_Skript\FRT_Auswertung.csv', sep=";", decimal=",", index=False)
+    logger.info("FRT-Auswertung: {} von {} Versuchen/Messstellen bestanden".format(int(df_frt["passed"].sum()), len(df_frt)))
 
 app.EchoOn() # Aktiviert das User Interface von PowerFactory
+logger.info("Objektindex: {}".format(obj_index))
+logger.info("Schreibpuffer: {}".format(obj_index.write_cache))
+if result_cache is not None:
+    logger.info("Ergebniscache: {}".format(result_cache.stats()))
 
 # Zeitauswertung
+instrumentation.stop()
+instrumentation.write_report(r'C:\Ausgabe_Skript\Timing_DynSim.json')
+for test, entry in instrumentation.faults().items():
+    logger.info("Versuch {}: {} s gesamt, davon PowerFactory {} s, Ablauf/Export {} s".format(
+        test, round(entry["total"], 2), round(entry["pf"], 2), round(entry["overhead"], 2)))
 tend = time()
 t = tend-tstart
 app.PrintPlain("Zeit: {} s".format(round(t,2)))
\ No newline at end of file
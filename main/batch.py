@@ -0,0 +1,374 @@
+""" batch.py
+
+Batchlauf über mehrere Projekte und Richtlinien (Fehlertabellen) mit einer gemeinsamen Warteschlange.
+
+Eine Kampagne (Campaign) ist ein Projekt mit einer Fehlertabelle, z.B. 19-EZA-0326 mit FAULTS_4120_TYP1.
+run_batch verteilt alle Versuche aller Kampagnen als Aufträge (Kampagne, Versuch) auf einen Pool von
+Workerprozessen mit je einer Instanz (siehe runner). Die Aufträge einer Kampagne werden zusammenhängend
+verteilt (Priorität der Kampagne, höher zuerst) und innerhalb der Kampagne nach geschätzter Laufzeit
+(longest job first), damit die Worker möglichst selten das Projekt wechseln.
+
+Jeder Worker aktiviert das Projekt der Kampagne eines Auftrags (Kopien je Worker, Platzhalter {worker})
+und bereitet es beim ersten Auftrag der Kampagne vor (Netzdaten, Betriebs-/Fehlerfälle, Variablenauswahl).
+Die Ergebnisse einer Kampagne werden im Unterordner <projektnummer>_<tablename> des Ausgabeordners exportiert.
+
+Aufruf:
+    python -m main.batch batch.json --workers 4 --export-dir C:\\Ausgabe_Skript --pf-path "C:\\...\\Python\\3.9"
+
+batch.json:
+    {"t_sim": 10, "lfd_unsym": 0,
+     "campaigns": [{"projektnummer": "19-EZA-0326", "vde": 4120, "type": 1, "project": "Park_0326_{worker}",
+                    "grid_data_file": "C:/Ausgabe_Skript/grid_data_0326.xlsx", "priority": 1}, ...]}
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import traceback
+from time import time
+
+from main.grid_model import GridModel
+from main.instrumentation import span
+from main.runner import (PowerFactoryEngine, WorkerState, claim_worker_id, lost_job_result, _collect, _worker_logger,
+                         _prepare_project, _cache_settings, _simulate, _start_instrumentation, _stop_instrumentation,
+                         _record_runtime)
+from main.runtime_history import sim_duration, Progress, RuntimeHistory
+from main.utils_sqlite3 import get_db, get_faults_by_test
+from main.pf_functions import EXPORT_DIR
+
+DB_NAME = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "DB_Faults.db")
+RES_VARS_FILE = os.path.join(os.path.dirname(DB_NAME), "json_res_vars.txt")
+RUNTIME_DB_NAME = os.path.join(os.path.dirname(DB_NAME), "DB_Runtime.db")
+
+
+class Campaign:
+    """ Campaign: class
+
+    Ein Projekt mit einer Fehlertabelle innerhalb eines Batchlaufs.
+
+    Attributes:
+    ----------
+    projektnummer: str
+        Projektnummer, z.B. "19-EZA-0326"
+    tablename: str
+        Fehlertabelle, z.B. "FAULTS_4120_TYP1"
+    engine_factory: callable
+        Picklebare Fabrik der Instanz mit activate(app, worker), z.B. PowerFactoryEngine("Park_0326_{worker}")
+    grid_model: GridModel
+        Netzmodell mit den Fehlerereignissen der Kampagne
+    res_vars: dict
+        Variablenauswahl für die Messstellen (json_res_vars.txt)
+    export_dir: str
+        Ausgabeordner der Kampagne
+    priority: int
+        Höhere Priorität wird zuerst simuliert
+    journal: RunJournal or None
+        Laufjournal der Kampagne (siehe run_journal): abgeschlossene Versuche werden nicht verteilt
+    """
+
+    def __init__(self, projektnummer, tablename, engine_factory, grid_model, res_vars, export_dir, priority=0, journal=None):
+        self.projektnummer = projektnummer
+        self.tablename = tablename
+        self.engine_factory = engine_factory
+        self.grid_model = grid_model
+        self.res_vars = res_vars
+        self.export_dir = export_dir
+        self.priority = priority
+        self.journal = journal
+
+    @property
+    def name(self):
+        return "{}_{}".format(self.projektnummer, self.tablename)
+
+    def __repr__(self):
+        return "Campaign('{}', priority={}, faults={})".format(self.name, self.priority, len(self.grid_model.list_of_faults))
+
+
+def create_campaign(projektnummer, vde, type, engine_factory, grid_data, res_vars, export_dir=EXPORT_DIR, priority=0,
+                    db_name=DB_NAME, journal=None):
+    """ create_campaign: function
+        Erstellt eine Kampagne: Netzmodell aus grid_data (dict_grid_att, siehe utils_db.convert_df_to_dict) und
+        Fehlerereignisse der Tabelle FAULTS_<vde>_TYP<type>. Der Ausgabeordner <export_dir>\\<projektnummer>_<tablename>
+        wird angelegt.
+    """
+    tablename = "FAULTS_{}_TYP{}".format(vde, type)
+    conn, c = get_db(db_name=db_name)
+    faults_param = get_faults_by_test(conn, c, tablename)
+    conn.close()
+    if isinstance(faults_param, str):
+        raise ValueError("create_campaign: {}: {}".format(tablename, faults_param))
+    grid_model = GridModel(dict_grid_data=grid_data)
+    grid_model.add_faults(faults_param)
+    campaign_dir = os.path.join(export_dir, "{}_{}".format(projektnummer, tablename))
+    os.makedirs(campaign_dir, exist_ok=True)
+    return Campaign(projektnummer, tablename, engine_factory, grid_model, res_vars, campaign_dir, priority=priority,
+                    journal=journal)
+
+
+def schedule_jobs(campaigns, t_sim, estimate=None):
+    """ schedule_jobs: function
+        Gibt die Aufträge (Kampagne, Position des Versuchs, geschätzte Laufzeit) in der Reihenfolge der Verteilung zurück:
+        je Kampagne zusammenhängend (Priorität absteigend, bei gleicher Priorität geschätzte Gesamtlaufzeit absteigend),
+        innerhalb einer Kampagne geschätzte Laufzeit absteigend (longest job first). Da die Worker die Aufträge der
+        Reihe nach abholen, bleibt ein Worker bei seiner Kampagne, bis deren Aufträge vergeben sind, und wechselt das
+        Projekt höchstens einmal je Kampagne.
+
+    Parameters
+    ----------
+    campaigns: list
+        Kampagnen (Campaign)
+    t_sim: float
+        Simulationsdauer in s
+    estimate: callable (optional)
+        estimate(campaign, fault) -> geschätzte Laufzeit in s. Default: None -> Simulationsdauer (runtime_history.sim_duration)
+    """
+    groups = []
+    for i, campaign in enumerate(campaigns):
+        jobs = []
+        faults = list(campaign.grid_model.list_of_faults)
+        for position, fault in enumerate(faults):
+            if campaign.journal is not None and campaign.journal.is_done(fault.test):
+                continue
+            runtime = estimate(campaign, fault) if estimate is not None else sim_duration(fault, t_sim)
+            jobs.append((i, position, runtime))
+        if jobs:
+            groups.append(sorted(jobs, key=lambda job: -job[2]))
+    groups.sort(key=lambda jobs: (-campaigns[jobs[0][0]].priority, -sum(job[2] for job in jobs)))
+    return [job for jobs in groups for job in jobs]
+
+
+# Zustand des Workerprozesses (wird von _init_batch_worker gesetzt)
+_batch_worker = {}
+
+
+def _init_batch_worker(worker_ids, worker_state, campaigns, settings):
+    """ Initialisiert einen Workerprozess des Batchlaufs. Die Projekte werden erst mit dem ersten Auftrag aktiviert. """
+    worker = claim_worker_id(worker_ids, worker_state)
+    _batch_worker.update(worker=worker, logger=_worker_logger(worker, settings["log_dir"]), campaigns=campaigns,
+                         settings=settings, worker_state=worker_state, active=None, projects={}, errors={},
+                         faults=[list(campaign.grid_model.list_of_faults) for campaign in campaigns])
+
+
+def _activate_campaign(i):
+    """ Aktiviert das Projekt der Kampagne i im Workerprozess und gibt (app, obj_index, cache_settings) zurück. """
+    state = _batch_worker
+    campaign = state["campaigns"][i]
+    if state["active"] == i:
+        return state["projects"][i]
+    if state["active"] is not None:
+        # Gepufferte Änderungen vor dem Projektwechsel schreiben
+        state["projects"][state["active"]][1].flush()
+    logger = state["logger"]
+    with span("activate_project", campaign=campaign.name):
+        if i in state["projects"]:
+            app, obj_index, cache_settings = state["projects"][i]
+            campaign.engine_factory.activate(app, state["worker"])
+            obj_index.invalidate()
+        else:
+            app = campaign.engine_factory(state["worker"])
+            app.EchoOff()
+            obj_index = _prepare_project(app, logger, campaign.grid_model, campaign.res_vars, state["settings"])
+            cache_settings = _cache_settings(obj_index, campaign.res_vars, state["settings"])
+            state["projects"][i] = (app, obj_index, cache_settings)
+    state["active"] = i
+    logger.info("batch: Kampagne {} aktiviert".format(campaign.name))
+    return state["projects"][i]
+
+
+def _run_job(job):
+    """ Simuliert einen Auftrag (Nummer, Kampagne, Position) im Workerprozess und gibt das Ergebnis als dictionary zurück. """
+    number, i, position = job
+    state = _batch_worker
+    campaign = state["campaigns"][i]
+    fault = state["faults"][i][position]
+    result = {"job": number, "campaign": i, "position": position, "test": fault.test, "worker": state["worker"],
+              "err": None, "error": None}
+    state["worker_state"].start(state["worker"], number)
+    try:
+        return _run_batch_fault(state, campaign, fault, result)
+    finally:
+        state["worker_state"].done(state["worker"])
+
+
+def _run_batch_fault(state, campaign, fault, result):
+    """ Aktiviert die Kampagne und simuliert den Versuch (siehe _run_job). """
+    i = result["campaign"]
+    tstart = time()
+    # Fehler bei der Vorbereitung eines Projekts gelten für alle Versuche der Kampagne
+    if i in state["errors"]:
+        result["error"] = state["errors"][i]
+        result["runtime"] = 0.0
+        return result
+    try:
+        app, obj_index, cache_settings = _activate_campaign(i)
+    except Exception:
+        state["errors"][i] = result["error"] = traceback.format_exc()
+        state["active"] = None
+        state["logger"].error("batch: Kampagne {} konnte nicht vorbereitet werden:\n{}".format(campaign.name, result["error"]))
+        result["runtime"] = time() - tstart
+        return result
+    instrumentation = _start_instrumentation(state["worker"], state["settings"])
+    tstart = time()
+    try:
+        result["err"] = _simulate(app, state["logger"], obj_index, campaign.grid_model, campaign.res_vars, fault,
+                                  state["settings"], cache_settings, campaign.export_dir, campaign.journal)
+        result["sim_mode"] = obj_index.from_study_case('ComInc').iopt_sim
+    except Exception:
+        result["error"] = traceback.format_exc()
+        state["logger"].error("batch: {} Versuch {} abgebrochen:\n{}".format(campaign.name, fault.test, result["error"]))
+    result["runtime"] = time() - tstart
+    _stop_instrumentation(result, instrumentation, state["settings"])
+    return result
+
+
+def run_batch(campaigns, flag_load_flow_unsym, t_sim, num_workers=None, logger=None, flag_setup=True, log_dir=None,
+              python_exe=None, estimate=None, flag_store=False, flag_keep_dat=True, flag_single_export=False,
+              decimation=None, result_cache=None, model_version="", runtime_history=None):
+    """ run_batch: function
+        Simuliert die Versuche aller Kampagnen mit einer gemeinsamen Warteschlange in num_workers Workerprozessen.
+
+    Parameters
+    ----------
+    campaigns: list
+        Kampagnen (Campaign, siehe create_campaign)
+    flag_load_flow_unsym, t_sim, flag_setup, log_dir, python_exe:
+        siehe runner.run_parallel
+    num_workers: int (optional)
+        Anzahl der Workerprozesse. Default: None -> min(Anzahl Aufträge, Anzahl CPU-Kerne)
+    logger: logging.logger object (optional)
+        Logger für den Fortschritt im Hauptprozess
+    estimate: callable (optional)
+        Geschätzte Laufzeit je Versuch für die Reihenfolge, siehe schedule_jobs.
+        Default: None -> Schätzung aus runtime_history bzw. Simulationsdauer
+    flag_store, flag_keep_dat, flag_single_export, decimation, result_cache, model_version:
+        siehe pf_functions.execute_simulation (für alle Kampagnen)
+    runtime_history: RuntimeHistory (optional)
+        Laufzeithistorie (siehe runtime_history): Schätzung der Laufzeiten, gemessene Laufzeiten werden gespeichert
+
+    Returns
+    -------
+    results: dictionary
+        Name der Kampagne -> list mit einem dictionary je Versuch (wie runner.run_parallel) in der Reihenfolge
+        der Fehlertabelle
+    """
+    if logger is None:
+        logger = logging.getLogger(__name__)
+    if estimate is None and runtime_history is not None:
+        estimate = lambda campaign, fault: runtime_history.predict(campaign.projektnummer, campaign.tablename, fault, t_sim)
+    jobs = schedule_jobs(campaigns, t_sim, estimate=estimate)
+    results = {campaign.name: {} for campaign in campaigns}
+    if not jobs:
+        return {name: [] for name in results}
+    if num_workers is None:
+        num_workers = min(len(jobs), os.cpu_count() or 1)
+    num_workers = max(1, min(num_workers, len(jobs)))
+    total = sum(job[2] for job in jobs)
+    logger.info("run_batch: {} Versuche aus {} Kampagnen auf {} Worker, geschätzte Laufzeit {} s".format(
+        len(jobs), len(campaigns), num_workers, round(total/num_workers, 1)))
+    progress = Progress({(i, position): runtime for i, position, runtime in jobs}, num_workers)
+
+    ctx = multiprocessing.get_context("spawn")
+    if python_exe is not None:
+        ctx.set_executable(python_exe)
+    worker_ids = ctx.Queue()
+    for worker in range(num_workers):
+        worker_ids.put(worker)
+    worker_state = WorkerState(ctx, num_workers)
+    settings = {"flag_load_flow_unsym": flag_load_flow_unsym, "t_sim": t_sim, "flag_setup": flag_setup,
+                "log_dir": log_dir, "flag_store": flag_store, "flag_keep_dat": flag_keep_dat,
+                "flag_single_export": flag_single_export, "decimation": decimation,
+                "result_cache": result_cache, "model_version": model_version, "flag_instrument": False,
+                "flag_history": runtime_history is not None}
+
+    tstart = time()
+    def lost_result(worker, number):
+        i, position, _ = jobs[number]
+        fault = list(campaigns[i].grid_model.list_of_faults)[position]
+        return dict(lost_job_result(worker, position, fault.test), job=number, campaign=i)
+
+    with ctx.Pool(num_workers, initializer=_init_batch_worker,
+                  initargs=(worker_ids, worker_state, campaigns, settings)) as pool:
+        # chunksize=1: jeder Auftrag wird einzeln vergeben, damit die Reihenfolge erhalten bleibt
+        iterator = pool.imap_unordered(_run_job, [(number, i, position) for number, (i, position, _) in enumerate(jobs)],
+                                       chunksize=1)
+        for result in _collect(iterator, len(jobs), worker_ids, worker_state, lost_result, logger, key="job"):
+            campaign = campaigns[result["campaign"]]
+            results[campaign.name][result["position"]] = result
+            fault = list(campaign.grid_model.list_of_faults)[result["position"]]
+            _record_runtime(runtime_history, campaign.projektnummer, campaign.tablename, fault, t_sim, result)
+            progress.update((result["campaign"], result["position"]), result["runtime"])
+            if result["error"] is not None:
+                logger.error("run_batch: {} Versuch {} (Worker {}) abgebrochen:\n{}".format(
+                    campaign.name, result["test"], result["worker"], result["error"]))
+            else:
+                logger.info("run_batch: {} Versuch {} (Worker {}) in {} s simuliert ({})".format(
+                    campaign.name, result["test"], result["worker"], round(result["runtime"], 2), progress.message()))
+    logger.info("run_batch: {} Versuche in {} s simuliert".format(len(jobs), round(time() - tstart, 2)))
+    for campaign in campaigns:
+        if campaign.journal is not None and not campaign.journal.pending(campaign.grid_model.list_of_faults):
+            campaign.journal.finish()
+    return {name: [result[i] for i in sorted(result)] for name, result in results.items()}
+
+
+def load_batch(fname, export_dir=EXPORT_DIR, user=None, pf_path=None, study_case=None):
+    """ load_batch: function
+        Liest eine Batchdefinition (JSON, siehe Modulbeschreibung) und gibt (Kampagnen, Einstellungen) zurück.
+        Netzdaten je Kampagne: grid_data (dictionary wie dict_grid_att) oder grid_data_file (Excel, Blatt grid_data).
+    """
+    # utils_db benötigt sqlalchemy (MOEbase), nur für Kampagnen aus Excel-Dateien notwendig
+    from main.utils_db import read_project_attributes_from_excel, convert_df_to_dict
+    with open(fname, "r") as f:
+        spec = json.load(f)
+    with open(spec.get("res_vars_file", RES_VARS_FILE), "r") as f:
+        res_vars_default = json.load(f)
+    campaigns = []
+    for entry in spec["campaigns"]:
+        grid_data = entry.get("grid_data")
+        if grid_data is None:
+            df = read_project_attributes_from_excel(file=entry["grid_data_file"], sheet=entry.get("sheet", "grid_data"))
+            if isinstance(df, str):
+                raise ValueError("load_batch: {}: {}".format(entry["projektnummer"], df))
+            grid_data = convert_df_to_dict(df)
+        if "res_vars_file" in entry:
+            with open(entry["res_vars_file"], "r") as f:
+                res_vars = json.load(f)
+        else:
+            res_vars = res_vars_default
+        engine_factory = PowerFactoryEngine(entry["project"], study_case=entry.get("study_case", study_case),
+                                            user=user, pf_path=pf_path)
+        campaigns.append(create_campaign(entry["projektnummer"], entry["vde"], entry["type"], engine_factory, grid_data,
+                                         res_vars, export_dir=export_dir, priority=entry.get("priority", 0)))
+    settings = {"t_sim": spec.get("t_sim", 10), "flag_load_flow_unsym": bool(spec.get("lfd_unsym", 0))}
+    return campaigns, settings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m main.batch", description="Batchlauf über mehrere Projekte und Fehlertabellen")
+    parser.add_argument("batch", help="Batchdefinition (JSON)")
+    parser.add_argument("--workers", type=int, default=None, help="Anzahl der Workerprozesse")
+    parser.add_argument("--export-dir", default=EXPORT_DIR, help="Ausgabeordner (Unterordner je Kampagne)")
+    parser.add_argument("--pf-path", default=None, help="Verzeichnis des powerfactory Python-Moduls")
+    parser.add_argument("--user", default=None, help="PowerFactory-Benutzer")
+    parser.add_argument("--study-case", default=None, help="Berechnungsfall (Default: aktiver Berechnungsfall)")
+    parser.add_argument("--store", action="store_true", help="Ergebnisdateien (*.dynres) je Versuch schreiben")
+    parser.add_argument("--history", default=RUNTIME_DB_NAME, help="Laufzeithistorie (sqlite3), leer: keine")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s:%(levelname)s:%(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+    logger = logging.getLogger(__name__)
+    campaigns, settings = load_batch(args.batch, export_dir=args.export_dir, user=args.user, pf_path=args.pf_path,
+                                     study_case=args.study_case)
+    results = run_batch(campaigns, settings["flag_load_flow_unsym"], settings["t_sim"], num_workers=args.workers,
+                        logger=logger, log_dir=args.export_dir, flag_store=args.store,
+                        runtime_history=RuntimeHistory(args.history) if args.history else None)
+    failed = [(name, result["test"]) for name, campaign_results in results.items() for result in campaign_results
+              if result["error"] is not None or result["err"]]
+    for name, test in failed:
+        logger.error("Batch: {} Versuch {} fehlgeschlagen".format(name, test))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
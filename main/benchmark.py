@@ -0,0 +1,416 @@
+""" benchmark.py
+
+Benchmark der Stufen einer Versuchskampagne ohne PowerFactory (Simulation mit pf_standin).
+
+Stufen: Einlesen der Netzdaten (Excel, DataFrame -> dict), Netzdaten/Ersatzschaltbild,
+Fehlerereignisse aus der Datenbank, Betriebs-/Fehlerfälle erstellen und abgleichen,
+Simulation mit Export (sequentiell und parallel) und Einlesen der *.dat-Exportdateien
+bzw. der binären Ergebnisdateien (result_store).
+Die Ergebnisse werden als JSON gespeichert; der Vergleich zweier Ergebnisdateien meldet
+Stufen, deren Median sich um mehr als die Toleranz verschlechtert hat.
+
+Aufruf:
+    python -m main.benchmark run --output bench.json [--repeat 5] [--table FAULTS_4120_TYP1]
+    python -m main.benchmark compare bench_alt.json bench.json [--threshold 0.2]
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+from datetime import datetime
+from time import perf_counter
+
+import numpy as np
+
+from main.faults import Faults_values
+from main.grid_model import GridModel
+from main.pf_index import ObjectIndex
+from main.pf_proxy import WriteCache
+from main.pf_standin import StandinApp, StandinEngine
+from main.pf_functions import (set_grid, create_load_flow_controller, create_faults_scenarios,
+                               sync_faults_scenarios, set_res_vars, execute_simulation)
+from main.results import read_dat
+from main.result_store import read_store
+from main.runner import run_parallel
+from main.utils_sqlite3 import get_db, get_faults_by_test
+
+# Beispiel-Netzdaten gemäß Anhang E9 (MS-Netz mit vorgelagertem Netztransformator)
+SAMPLE_GRID_DATA = {'zYkGradNB': '80',
+                    'zSkkVAnb': '500000',
+                    'zUnkVnb': '20',
+                    'zUckVnb': '20',
+                    'sSPEnapNB': 'Resonanzsternpunkterdung (RSPE)',
+                    'sArtVNetzNB': 'Kabelnetz',
+                    'zRnetzOhmNB': '0,1',
+                    'zSnetzkVAnb': '40000',
+                    'zXnetzOhmNB': '2',
+                    'sAnschlussartEZEnb': 'MS-Netz',
+                    'zUsollkVnb': '20'}
+
+DB_NAME = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "DB_Faults.db")
+RES_VARS_FILE = os.path.join(os.path.dirname(DB_NAME), "json_res_vars.txt")
+
+# Registrierte Benchmarks: name -> function(ctx) -> (setup, run)
+BENCHMARKS = {}
+
+
+class SkipBenchmark(Exception):
+    """ Benchmark kann in dieser Umgebung nicht ausgeführt werden (z.B. fehlendes Paket). """
+
+
+def benchmark(name):
+    """ benchmark: decorator
+        Registriert eine Funktion function(ctx) -> (setup, run). setup() wird vor jeder Wiederholung
+        ohne Zeitmessung aufgerufen, run(state) mit dem Rückgabewert von setup gemessen.
+    """
+    def register(function):
+        BENCHMARKS[name] = function
+        return function
+    return register
+
+
+def _quiet():
+    """ Unterdrückt die print-Ausgaben der gemessenen Funktionen. """
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+def _grid_model(ctx):
+    with _quiet():
+        grid_model = GridModel(ctx["grid_data"])
+        grid_model.add_faults(ctx["faults_param"])
+    return grid_model
+
+
+def _grid_data_frame(grid_data):
+    """ Erstellt aus einem dict_grid_att eine Tabelle im Format der MOEbase (shortname, type, stringvalue, ...). """
+    import pandas as pd
+    rows = [{"shortname": key, "type": 1, "stringvalue": value, "datevalue": None, "integervalue": float("nan"),
+             "booleanvalue": None} for key, value in grid_data.items()]
+    return pd.DataFrame(rows).set_index("shortname")
+
+
+def _prepared_app(ctx, **kwargs):
+    """ StandinApp mit eingestellten Netzdaten, Betriebs-/Fehlerfällen und Variablenauswahl. """
+    app = StandinApp(output_dir=ctx["output_dir"], **kwargs)
+    obj_index = ObjectIndex(app, write_cache=WriteCache())
+    logger = ctx["logger"]
+    set_grid(app, ctx["grid_model"], logger, obj_index=obj_index)
+    create_load_flow_controller(app, logger, obj_index=obj_index)
+    create_faults_scenarios(app, logger, ctx["grid_model"], obj_index=obj_index)
+    set_res_vars(app, logger, ctx["res_vars"], flag_vis=True, obj_index=obj_index)
+    return app, obj_index
+
+
+@benchmark("read_project_attributes_from_excel")
+def bench_read_excel(ctx):
+    try:
+        from main.utils_db import read_project_attributes_from_excel
+        fname = os.path.join(ctx["tmp_dir"], "grid_data.xlsx")
+        _grid_data_frame(ctx["grid_data"]).to_excel(fname, sheet_name="grid_data")
+    except ImportError as e:
+        raise SkipBenchmark(str(e))
+
+    def run(state):
+        with _quiet():
+            read_project_attributes_from_excel(file=fname, sheet="grid_data")
+    return (lambda: None), run
+
+
+@benchmark("convert_df_to_dict")
+def bench_convert_df_to_dict(ctx):
+    try:
+        from main.utils_db import convert_df_to_dict
+        df = _grid_data_frame(ctx["grid_data"])
+    except ImportError as e:
+        raise SkipBenchmark(str(e))
+    return (lambda: None), (lambda state: convert_df_to_dict(df))
+
+
+@benchmark("calc_grid_data")
+def bench_calc_grid_data(ctx):
+    def run(state):
+        with _quiet():
+            Faults_values.calc_grid_data(ctx["grid_data"])
+    return (lambda: None), run
+
+
+@benchmark("faults_from_db")
+def bench_faults_from_db(ctx):
+    def run(state):
+        conn, c = get_db(db_name=DB_NAME)
+        faults_param = get_faults_by_test(conn, c, ctx["table"])
+        conn.close()
+        with _quiet():
+            GridModel(ctx["grid_data"]).add_faults(faults_param)
+    return (lambda: None), run
+
+
+@benchmark("create_faults_scenarios")
+def bench_create_scenarios(ctx):
+    def setup():
+        app = StandinApp(output_dir=ctx["output_dir"], call_latency=ctx["call_latency"])
+        obj_index = ObjectIndex(app, write_cache=WriteCache())
+        set_grid(app, ctx["grid_model"], ctx["logger"], obj_index=obj_index)
+        create_load_flow_controller(app, ctx["logger"], obj_index=obj_index)
+        return app, obj_index
+
+    def run(state):
+        app, obj_index = state
+        create_faults_scenarios(app, ctx["logger"], ctx["grid_model"], obj_index=obj_index)
+    return setup, run
+
+
+@benchmark("sync_faults_scenarios")
+def bench_sync_scenarios(ctx):
+    # Abgleich eines unveränderten Projekts (zweiter Lauf mit denselben Versuchen)
+    def setup():
+        return _prepared_app(ctx, call_latency=ctx["call_latency"])
+
+    def run(state):
+        app, obj_index = state
+        sync_faults_scenarios(app, ctx["logger"], ctx["grid_model"], obj_index=obj_index)
+    return setup, run
+
+
+@benchmark("execute_simulation")
+def bench_execute_simulation(ctx):
+    def setup():
+        return _prepared_app(ctx, call_latency=ctx["call_latency"], sim_factor=ctx["sim_factor"])
+
+    def run(state):
+        app, obj_index = state
+        execute_simulation(app, ctx["logger"], ctx["grid_model"], False, ctx["res_vars"], ctx["t_sim"], obj_index=obj_index)
+    return setup, run
+
+
+@benchmark("run_parallel")
+def bench_run_parallel(ctx):
+    if ctx["num_workers"] < 2:
+        raise SkipBenchmark("num_workers < 2")
+    engine = StandinEngine(output_dir=ctx["output_dir"], call_latency=ctx["call_latency"], sim_factor=ctx["sim_factor"])
+
+    def run(state):
+        run_parallel(engine, ctx["grid_model"], ctx["res_vars"], False, ctx["t_sim"], num_workers=ctx["num_workers"], logger=ctx["logger"])
+    return (lambda: None), run
+
+
+@benchmark("read_dat")
+def bench_read_dat(ctx):
+    # Exportdateien einer Kampagne (EMT, damit die Dateien eine realistische Größe haben)
+    dat_dir = os.path.join(ctx["tmp_dir"], "dat")
+    os.makedirs(dat_dir, exist_ok=True)
+    app = StandinApp(output_dir=dat_dir)
+    app.GetFromStudyCase("ComInc").iopt_sim = "ins"
+    obj_index = ObjectIndex(app, write_cache=WriteCache())
+    logger = ctx["logger"]
+    set_grid(app, ctx["grid_model"], logger, obj_index=obj_index)
+    create_load_flow_controller(app, logger, obj_index=obj_index)
+    create_faults_scenarios(app, logger, ctx["grid_model"], obj_index=obj_index)
+    set_res_vars(app, logger, ctx["res_vars"], obj_index=obj_index)
+    grid_model = GridModel.__new__(GridModel)
+    grid_model.__dict__.update(ctx["grid_model"].__dict__)
+    grid_model.list_of_faults = ctx["grid_model"].list_of_faults[:ctx["num_dat_faults"]]
+    execute_simulation(app, logger, grid_model, False, ctx["res_vars"], ctx["t_sim"], obj_index=obj_index)
+    files = list(app.exported)
+
+    def run(state):
+        for fname in files:
+            read_dat(fname)
+    return (lambda: None), run
+
+
+@benchmark("read_store")
+def bench_read_store(ctx):
+    # Dieselben Exporte wie read_dat, je Versuch in eine Ergebnisdatei übernommen (alle Spalten lesen)
+    store_dir = os.path.join(ctx["tmp_dir"], "store")
+    os.makedirs(store_dir, exist_ok=True)
+    app = StandinApp(output_dir=store_dir)
+    app.GetFromStudyCase("ComInc").iopt_sim = "ins"
+    obj_index = ObjectIndex(app, write_cache=WriteCache())
+    logger = ctx["logger"]
+    set_grid(app, ctx["grid_model"], logger, obj_index=obj_index)
+    create_load_flow_controller(app, logger, obj_index=obj_index)
+    create_faults_scenarios(app, logger, ctx["grid_model"], obj_index=obj_index)
+    set_res_vars(app, logger, ctx["res_vars"], obj_index=obj_index)
+    grid_model = GridModel.__new__(GridModel)
+    grid_model.__dict__.update(ctx["grid_model"].__dict__)
+    grid_model.list_of_faults = ctx["grid_model"].list_of_faults[:ctx["num_dat_faults"]]
+    execute_simulation(app, logger, grid_model, False, ctx["res_vars"], ctx["t_sim"], obj_index=obj_index,
+                       export_dir=store_dir, flag_store=True, flag_keep_dat=False)
+    files = [os.path.join(store_dir, fname) for fname in sorted(os.listdir(store_dir)) if fname.endswith(".dynres")]
+
+    def run(state):
+        for fname in files:
+            store = read_store(fname)
+            for table in store.tables:
+                store.table(table)
+    return (lambda: None), run
+
+
+def run_benchmarks(names=None, repeat=5, table="FAULTS_4120_TYP1", call_latency=0.0, sim_factor=0.0,
+                   num_workers=4, t_sim=10, num_dat_faults=2, logger=None):
+    """ run_benchmarks: function
+        Führt die Benchmarks aus und gibt die Ergebnisse als dictionary zurück.
+
+    Parameters
+    ----------
+    names: list (optional)
+        Namen der auszuführenden Benchmarks (siehe BENCHMARKS). Default: alle
+    repeat: int
+        Anzahl der Wiederholungen je Benchmark
+    table: str
+        Tabelle der Fehlerereignisse in DB_Faults.db
+    call_latency, sim_factor: float
+        Laufzeit der Aufrufe der StandinApp (siehe pf_standin)
+    num_workers: int
+        Anzahl der Worker für run_parallel
+    t_sim: float
+        Simulationsdauer in s
+    num_dat_faults: int
+        Anzahl der Versuche, deren Exportdateien für read_dat erzeugt werden
+    logger: logging.logger object (optional)
+        Default: Logger ohne Ausgabe
+
+    Returns
+    -------
+    results: dictionary
+        "meta": Umgebung und Einstellungen
+        "benchmarks": je Benchmark min, median, mean, stdev in s und repeat, oder "skipped" mit Begründung
+    """
+    if logger is None:
+        logger = logging.getLogger(__name__)
+        logger.addHandler(logging.NullHandler())
+        logger.propagate = False
+    names = list(BENCHMARKS.keys()) if names is None else names
+    tmp_dir = tempfile.mkdtemp(prefix="dynsim_bench_")
+    output_dir = os.path.join(tmp_dir, "export")
+    os.makedirs(output_dir)
+    conn, c = get_db(db_name=DB_NAME)
+    faults_param = get_faults_by_test(conn, c, table)
+    conn.close()
+    with open(RES_VARS_FILE, "r") as f:
+        res_vars = json.load(f)
+    ctx = {"tmp_dir": tmp_dir, "output_dir": output_dir, "grid_data": dict(SAMPLE_GRID_DATA), "table": table,
+           "faults_param": faults_param, "res_vars": res_vars, "call_latency": call_latency, "sim_factor": sim_factor,
+           "num_workers": num_workers, "t_sim": t_sim, "num_dat_faults": num_dat_faults, "logger": logger}
+    ctx["grid_model"] = _grid_model(ctx)
+
+    results = {"meta": {"timestamp": datetime.now().isoformat(timespec="seconds"),
+                        "python": platform.python_version(), "platform": platform.platform(),
+                        "numpy": np.__version__, "repeat": repeat, "table": table, "call_latency": call_latency,
+                        "sim_factor": sim_factor, "num_workers": num_workers, "t_sim": t_sim},
+               "benchmarks": {}}
+    try:
+        for name in names:
+            try:
+                setup, run = BENCHMARKS[name](ctx)
+                times = []
+                for _ in range(repeat):
+                    state = setup()
+                    tstart = perf_counter()
+                    run(state)
+                    times.append(perf_counter() - tstart)
+            except SkipBenchmark as e:
+                results["benchmarks"][name] = {"skipped": str(e)}
+                logger.info("run_benchmarks: {} übersprungen: {}".format(name, e))
+                continue
+            results["benchmarks"][name] = {"min": min(times), "median": statistics.median(times),
+                                           "mean": statistics.mean(times),
+                                           "stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+                                           "repeat": repeat}
+            logger.info("run_benchmarks: {}: {} s (Median)".format(name, round(results["benchmarks"][name]["median"], 4)))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return results
+
+
+def compare_results(base, new, threshold=0.2):
+    """ compare_results: function
+        Vergleicht zwei Ergebnisse von run_benchmarks anhand des Medians.
+
+    Parameters
+    ----------
+    base, new: dictionary
+        Ergebnisse von run_benchmarks (Referenz und aktueller Stand)
+    threshold: float
+        Relative Toleranz. Verschlechterung um mehr als threshold (0.2 -> 20 %) gilt als Regression.
+
+    Returns
+    -------
+    rows: list
+        Ein dictionary je Benchmark mit name, base, new (Median in s), ratio (new/base) und
+        status: "regression", "improvement", "ok" oder "skipped"
+    """
+    rows = []
+    for name in sorted(set(base["benchmarks"]) | set(new["benchmarks"])):
+        b = base["benchmarks"].get(name, {})
+        n = new["benchmarks"].get(name, {})
+        if "median" not in b or "median" not in n:
+            rows.append({"name": name, "base": b.get("median"), "new": n.get("median"), "ratio": None, "status": "skipped"})
+            continue
+        ratio = n["median"]/b["median"] if b["median"] > 0 else float("inf")
+        if ratio > 1 + threshold:
+            status = "regression"
+        elif ratio < 1/(1 + threshold):
+            status = "improvement"
+        else:
+            status = "ok"
+        rows.append({"name": name, "base": b["median"], "new": n["median"], "ratio": ratio, "status": status})
+    return rows
+
+
+def _format_time(value):
+    return "-" if value is None else "{:.4f}".format(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m main.benchmark", description="Benchmark der DynSim-Stufen")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    parser_run = subparsers.add_parser("run", help="Benchmarks ausführen")
+    parser_run.add_argument("--output", default="benchmark.json", help="Ergebnisdatei (JSON)")
+    parser_run.add_argument("--repeat", type=int, default=5)
+    parser_run.add_argument("--table", default="FAULTS_4120_TYP1")
+    parser_run.add_argument("--only", nargs="*", choices=list(BENCHMARKS.keys()), help="nur diese Benchmarks")
+    parser_run.add_argument("--call-latency", type=float, default=0.0, help="Laufzeit je Aufruf der StandinApp in s")
+    parser_run.add_argument("--sim-factor", type=float, default=0.0, help="Laufzeit von ComSim je simulierter Sekunde in s")
+    parser_run.add_argument("--workers", type=int, default=4)
+    parser_compare = subparsers.add_parser("compare", help="Zwei Ergebnisdateien vergleichen")
+    parser_compare.add_argument("base")
+    parser_compare.add_argument("new")
+    parser_compare.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        results = run_benchmarks(names=args.only, repeat=args.repeat, table=args.table, call_latency=args.call_latency,
+                                 sim_factor=args.sim_factor, num_workers=args.workers)
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        for name, result in results["benchmarks"].items():
+            if "skipped" in result:
+                print("{:40s} übersprungen ({})".format(name, result["skipped"]))
+            else:
+                print("{:40s} {} s (Median), {} s (min)".format(name, _format_time(result["median"]), _format_time(result["min"])))
+        print("Ergebnisse gespeichert: {}".format(args.output))
+        return 0
+
+    with open(args.base, "r") as f:
+        base = json.load(f)
+    with open(args.new, "r") as f:
+        new = json.load(f)
+    rows = compare_results(base, new, threshold=args.threshold)
+    for row in rows:
+        ratio = "-" if row["ratio"] is None else "{:.2f}x".format(row["ratio"])
+        print("{:40s} {:>10s} {:>10s} {:>8s}  {}".format(row["name"], _format_time(row["base"]), _format_time(row["new"]), ratio, row["status"]))
+    # Rückgabewert 1 bei Regressionen (z.B. für CI)
+    return 1 if any(row["status"] == "regression" for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
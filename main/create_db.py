@@ -86,7 +86,7 @@ for i in range(4):
         fault_12 = Faults(12, 5.000, 1, 1.200, 'g', 'uebererregt', 3, 1.10)
         fault_13 = Faults(13, 5.000, 1, 1.100, 'g', 'uebererregt', 2, 1.00)
         fault_14 = Faults(14, 0.833, 0, 0.750, 'v', 'untererregt', 3, 0.95)
-        fault_15 = Faults(15, 0.220, 2, 0.025, 'g', 'untererreg', 1, 0.95)
+        fault_15 = Faults(15, 0.220, 2, 0.025, 'g', 'untererregt', 1, 0.95)
         fault_16 = Faults(16, 60.000, 1, 1.150, 'g', '0', 3, 1.00)
         fault_17 = Faults(17, 60.000, 2, 0.850, 'g', '0', 3, 1.00)
     elif i == 3:
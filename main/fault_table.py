@@ -0,0 +1,205 @@
+""" fault_table.py
+
+Kompakte Fehlertabelle auf Basis eines numpy structured array.
+
+Eine Zeile je Fehlerereignis mit den Spalten test, duration, fault_type, uf, grid,
+qset, phases, uv, Rf, Xf. Beim Iterieren werden leichtgewichtige FaultRecord-Objekte
+(__slots__) erzeugt, die dieselben Attribute wie Faults_values besitzen und daher
+direkt an die Funktionen in pf_functions übergeben werden können.
+"""
+import numpy as np
+
+# Spalten der Fehlertabelle
+FAULT_TABLE_DTYPE = np.dtype([('test', 'U8'),  # Versuchsnummer gemäß VDE-AR-N 4110/4120
+                              ('duration', 'f8'),  # Fehlerdauer in s
+                              ('fault_type', 'i1'),  # Fehlertyp (0, 1, 2)
+                              ('uf', 'f8'),  # Restspannung während des Fehlers in p.u.
+                              ('grid', 'U1'),  # Fehlerort: 'g' - gleiches Netz, 'v' - vorgelagertes Netz
+                              ('qset', 'U11'),  # Blindleistung am NAP: '0', 'untererregt', 'uebererregt'
+                              ('phases', 'i1'),  # Anzahl der Phasen (3, 2, 1)
+                              ('uv', 'f8'),  # Vorfehlerspannung in p.u.
+                              ('Rf', 'f8'),  # Fehlerwiderstand in Ohm (NaN: Schalterereignis)
+                              ('Xf', 'f8')])  # Fehlerreaktanz in Ohm (NaN: Schalterereignis)
+# Zulässige Werte der Textspalten (andere Werte würden stillschweigend als qset '0' simuliert)
+GRID_VALUES = ('g', 'v')
+QSET_VALUES = ('0', 'untererregt', 'uebererregt')
+
+
+def check_fault_impedance(uf, Rf, Xf, tests):
+    """ check_fault_impedance: function
+        Prüft die Fehlerimpedanzen (vektorisiert): Versuche mit uf <= 1 (LVRT) benötigen Rf, Xf >= 0 in Ohm.
+        Ohne gültige Fehlerimpedanz (NaN: uf >= uv oder keine Lösung der TR8-Formel) würde ein LVRT-Versuch
+        als Schalterereignis bzw. mit ungültiger Impedanz simuliert. Für uf > 1 (Schalterereignis) ist Rf/Xf beliebig.
+
+    Parameters
+    ----------
+    uf, Rf, Xf: array_like
+        Restspannung in p.u. und Fehlerimpedanz in Ohm je Versuch (NaN: keine Fehlerimpedanz)
+    tests: array_like
+        Versuchsnummern (für die Fehlermeldung)
+
+    Raises
+    ------
+    ValueError
+        Versuche mit uf <= 1 ohne gültige Fehlerimpedanz
+    """
+    uf, Rf, Xf = (np.asarray(values, dtype=float) for values in (uf, Rf, Xf))
+    invalid = ~((Rf >= 0) & (Xf >= 0)) & ~(uf > 1)
+    if invalid.any():
+        raise ValueError("Keine gültige Fehlerimpedanz (uf >= uv oder keine Lösung der TR8-Formel) für Versuche {}: "
+                         "Rf={} Ohm, Xf={} Ohm, uf={} p.u.".format(np.asarray(tests)[invalid].tolist(),
+                                                                   np.broadcast_to(Rf, invalid.shape)[invalid].tolist(),
+                                                                   np.broadcast_to(Xf, invalid.shape)[invalid].tolist(),
+                                                                   np.broadcast_to(uf, invalid.shape)[invalid].tolist()))
+
+
+class FaultRecord:
+    """
+    Ein Fehlerereignis der Fehlertabelle (kompakte Alternative zu Faults_values).
+
+    Attributes:
+    ----------
+    test, duration, fault_type, uf, grid, qset, phases, uv:
+        siehe Faults
+    Rf, Xf: float or None
+        Fehlerwiderstand und Fehlerreaktanz in Ohm, None bei Schalterereignissen (uf > 1).
+        Für uf <= 1 erforderlich (geprüft in FaultTable.from_rows, siehe check_fault_impedance)
+    """
+    __slots__ = FAULT_TABLE_DTYPE.names
+
+    def __init__(self, test, duration, fault_type, uf, grid, qset, phases, uv, Rf=None, Xf=None):
+        self.test = test
+        self.duration = duration
+        self.fault_type = fault_type
+        self.uf = uf
+        self.grid = grid
+        self.qset = qset
+        self.phases = phases
+        self.uv = uv
+        self.Rf = None if Rf is None or Rf != Rf else Rf
+        self.Xf = None if Xf is None or Xf != Xf else Xf
+
+    def params(self):
+        """ params: method
+            Gibt die Fehlerdefinition als Tupel (test, duration, fault_type, uf, grid, qset, phases, uv) zurück.
+        """
+        return (self.test, self.duration, self.fault_type, self.uf, self.grid, self.qset, self.phases, self.uv)
+
+    def __repr__(self):
+        return "FaultRecord('{}',{},{}, {}, '{}', '{}', '{}', '{}')".format(*self.params())
+
+    def __str__(self):
+        return "Test {} Fault event: duration: {} s, fault_type: {}, uf: {} p.u., grid: {},qset: {}, phases: {}, uv: {})".format(*self.params())
+
+
+def _check_column(name, column, tests):
+    """ Prüft, ob die Werte column ohne Abschneiden (Text) bzw. Überlauf (Ganzzahl) in die Spalte name passen. """
+    field = FAULT_TABLE_DTYPE[name]
+    if field.kind == 'U':
+        length = field.itemsize//np.dtype('U1').itemsize
+        invalid = [(test, value) for test, value in zip(tests, column) if len(str(value)) > length]
+    elif field.kind == 'i':
+        info = np.iinfo(field)
+        invalid = [(test, value) for test, value in zip(tests, column) if not info.min <= int(value) <= info.max]
+    else:
+        return
+    if invalid:
+        raise ValueError("FaultTable: Wert passt nicht in die Spalte {} ({}): {} (Versuch, Wert)".format(
+            name, field.str, invalid))
+
+
+class FaultTable:
+    """
+    Kompakte Tabelle von Fehlerereignissen (numpy structured array mit FAULT_TABLE_DTYPE).
+
+    Unterstützt len(), Iteration (FaultRecord), Indizierung mit int (FaultRecord),
+    Slice/Maske (FaultTable als View) und Spaltenzugriff mit dem Spaltennamen (numpy.ndarray).
+
+    Attributes:
+    ----------
+    data: numpy.ndarray
+        structured array mit FAULT_TABLE_DTYPE
+    """
+
+    def __init__(self, data=None):
+        """
+        Parameters
+        ----------
+        data: numpy.ndarray (optional)
+            structured array mit FAULT_TABLE_DTYPE. Default: leere Tabelle
+        """
+        if data is None:
+            data = np.empty(0, dtype=FAULT_TABLE_DTYPE)
+        self.data = data
+
+    @classmethod
+    def from_rows(cls, rows, Rf=None, Xf=None):
+        """ from_rows: classmethod
+            Erstellt eine Fehlertabelle aus Zeilen der Datenbank.
+
+        Parameters
+        ----------
+        rows: list
+            Liste von Tupeln (test, duration, fault_type, uf, grid, qset, phases, uv),
+            z.B. das Ergebnis von get_faults_by_test
+        Rf, Xf: array_like (optional)
+            Fehlerimpedanzen in Ohm je Zeile (NaN: Schalterereignis). Erforderlich, sobald eine Zeile uf <= 1 hat.
+            Default: NaN
+
+        Raises
+        ------
+        ValueError
+            Wert passt nicht in die Spalte (Text zu lang, Ganzzahl außerhalb des Wertebereichs),
+            unzulässiger Wert für grid bzw. qset oder keine gültige Fehlerimpedanz (siehe check_fault_impedance)
+        """
+        data = np.empty(len(rows), dtype=FAULT_TABLE_DTYPE)
+        if len(rows):
+            columns = list(zip(*rows))
+            for name, column in zip(FAULT_TABLE_DTYPE.names[:8], columns):
+                _check_column(name, column, [row[0] for row in rows])
+                data[name] = column
+            for name, values in (('grid', GRID_VALUES), ('qset', QSET_VALUES)):
+                invalid = ~np.isin(data[name], values)
+                if invalid.any():
+                    raise ValueError("FaultTable: Versuche {}: unzulässiger Wert für {}: {} (zulässig: {})".format(
+                        data['test'][invalid].tolist(), name, data[name][invalid].tolist(), values))
+        data['Rf'] = np.nan if Rf is None else Rf
+        data['Xf'] = np.nan if Xf is None else Xf
+        check_fault_impedance(data['uf'], data['Rf'], data['Xf'], data['test'])
+        return cls(data)
+
+    def append(self, other):
+        """ append: method
+            Hängt die Zeilen einer anderen Fehlertabelle an (erzeugt ein neues Array).
+        """
+        self.data = np.concatenate([self.data, other.data])
+
+    def by_test(self, test):
+        """ by_test: method
+            Filtert die Tabelle nach der Versuchsnummer test (str oder Liste von str).
+        """
+        tests = [test] if isinstance(test, str) else list(test)
+        return FaultTable(self.data[np.isin(self.data['test'], tests)])
+
+    def to_rows(self):
+        """ to_rows: method
+            Gibt die Fehlerdefinitionen als Liste von Tupeln zurück (Format der Datenbank).
+        """
+        return [row[:8] for row in self.data.tolist()]
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        for row in self.data.tolist():
+            yield FaultRecord(*row)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.data[key]
+        if isinstance(key, (int, np.integer)):
+            return FaultRecord(*self.data[key].tolist())
+        return FaultTable(self.data[key])
+
+    def __repr__(self):
+        return "FaultTable({} faults: {})".format(len(self), self.data['test'].tolist())
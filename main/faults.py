@@ -1,3 +1,8 @@
+import numpy as np
+
+from main.fault_table import check_fault_impedance
+
+
 class Faults:
     """
     A class used to represent an Fault event in PowerFactory
@@ -36,7 +41,7 @@ class Faults:
     num_of_faults = 0
     list_of_faults = []
     
-    def __init__(self, test, duration, fault_type, uf, grid, qset, phases, uv):
+    def __init__(self, test, duration, fault_type, uf, grid, qset, phases, uv, list_of_faults=None):
         """
         Parameters 
         ----------
@@ -56,6 +61,9 @@ class Faults:
             phases of short circuit (3 - 3 phase symmetric, 2 - 2ph without earth, 1 - 1ph with earth)
         uv: 
             prefault voltage in p.u (Uc)
+        list_of_faults: list (optional)
+            run-scoped list, the instance is appended to (e.g. GridModel.list_of_faults).
+            Default: None -> class variable list_of_faults
     """ 
         self.test = test
         self.duration = duration
@@ -65,8 +73,11 @@ class Faults:
         self.qset = qset
         self.phases = phases
         self.uv = uv
-        Faults.num_of_faults += 1
-        Faults.list_of_faults.append(self)
+        if list_of_faults is None:
+            Faults.num_of_faults += 1
+            Faults.list_of_faults.append(self)
+        else:
+            list_of_faults.append(self)
         
     def __repr__(self):
         """__repr__:
@@ -133,6 +144,10 @@ class Faults_values(Faults):
         Berechnet die Netzdaten für das Ersatzschaltbild (ElmVac/ElmSind) in PowerFactory.
     calc_fault_values: 
         Berechnet den Fehlerwiderstand und Fehlerreaktanz in Abhängigkeit der Netzdaten.
+    calc_fault_values_batch: @classmethod
+        Berechnet Fehlerwiderstand und Fehlerreaktanz für eine ganze Fehlertabelle (numpy).
+    from_faults_param: @classmethod
+        Erstellt Instanzen für alle Fehlerereignisse auf Basis der Batch-Berechnung.
     """
     flag_UW = None
     flag_MS = None
@@ -224,225 +239,52 @@ class Faults_values(Faults):
         - Flag debug durch logger ersetzen
 
         """
-        import math
-        import sys
-        
-        # Attribute aus der Moebase auf Eintragung und Wert überprüfen:
-        # 'zUnkVnb' - Nominale Betriebsspannung Un [kV]
-        # 'zUckVnb' - Vereinbarte Versorgungsspannung Uc [kV]
-        # 'zSkkVAnb' - Netzkurzschlussleistung am NAP Sk [kVA]
-        # 'zYkGradNB' - Netzimpedanzwinkel am NAP Yk [°]
-        for key in ['zUnkVnb', 'zUckVnb', 'zSkkVAnb', 'zYkGradNB']:
-            try:
-                value = float(dict_grid_data[key].replace(",", "."))
-            except KeyError as e: 
-                print("Key not in dict_grad_data: {}".format(e))
-                print("Bitte Angabe des Attribut in der Moebase prüfen!")
-                sys.exit()
-            except ValueError as e: 
-                print("Kein gültiger Wert für: {}".format(e))
-                print("Bitte Angabe des Attribut in der Moebase prüfen!")
-                sys.exit()
-            else:
-                if key == 'zUnkVnb':
-                    # Nominale Betriebsspannung Un [kV]
-                    Un = value
-                elif key == 'zUckVnb':
-                    # Vereinbarte Versorgungsspannung Uc [kV]
-                    Uc = value
-                elif key == 'zSkkVAnb':
-                    # Netzkurzschlussleistung am NAP Sk [kVA]
-                    Skvmin = value
-                elif key == 'zYkGradNB':
-                    # Netzimpedanzwinkel am NAP Yk [°]
-                    Ykv = value
-        
-        # Prüfe die Anschlussart der EZE
-        # Gültige Werte: MS-Netz; MS-Netz (reine Einspeiseleitung); HS-Netz oder UW-Direktanschluss ist
-        # Default: MS-Netz
-        try:
-            Anschlussart = dict_grid_data['sAnschlussartEZEnb']
-            print('Anschlussart: {}'.format(Anschlussart))
-        except KeyError as e:
-            print("Key not in dict_grad_data: {}".format(e))
-            print("MS-Netz angenommen!")
-            Anschlussart = "MS-Netz"
-            
-        if not Anschlussart == None:
-            if Anschlussart.strip() in ["MS-Netz", "MS-Netz (reine Einspeiseleistung)"]:
-                flag_MS = True
-                flag_HS = False
-                flag_UW = False
-            elif Anschlussart.strip() == "UW-Direktanschluss":
-                flag_MS = True
-                flag_HS = False
-                flag_UW = True
-            elif Anschlussart.strip() == "HS-Netz":
-                flag_HS = True
-                flag_MS = False
-                flag_UW = False
-            else:
-                print("Keine gültiger Wert in der Moebase für das Attribut: Anschlussart der EZE")
-                print("gültige Werte: MS-Netz; MS-Netz (reine Einspeiseleitung); HS-Netz; UW-Direktanschluss")
-                print("MS-Netz angenommen!")                
-                flag_MS = True
-                flag_HS = False
-                flag_UW = False
+        set_grid_data(cls, dict_grid_data, flag_debug=flag_debug)
+
+    @classmethod
+    def calc_fault_values_batch(cls, faults_param, dict_grid_data):
+        """ calc_fault_values_batch: classmethod
+            Calculates the fault resistance and fault reactance for a whole fault table
+            in one vectorized pass. Uses the grid data stored by calc_grid_data.
         
-        # Wenn Anschluss im MS-Netz und kein UW-Direktanschluss, prüfe ob Daten für den vorgelagerten Netztrafo vorhanden sind.
-        if flag_MS and not flag_UW:
-            try: 
-                RT = dict_grid_data['zRnetzOhmNB']
-                XT = dict_grid_data['zXnetzOhmNB']
-            except KeyError as e:
-                print("Key not in dict_grad_data: {}".format(e))
-                print("Annahme: Keine Trafodaten vorhanden!")
-                flag_UW = True
-            else:
-                try:
-                    # Konvertiere RT und XT von String zu float 
-                    # Ersetze Komma durch Punkt
-                    RT = float(RT.replace(",", "."))
-                    XT = float(XT.replace(",", "."))
-                except ValueError as e:
-                    print("Kein gültiger Wert für Vorgelagerter Netztransformator: Rnetz oder Xnetz")
-                    print("Trafodaten werden vernachlässigt!")
-                    flag_UW = True
-                    
-        # Wenn Anschluss im HS-Netz oder UW-Direktanschluss, hole zusätzlich das Attribut Reglersollspannung
-        if flag_HS or flag_UW:
-            try: 
-                Usoll = float(dict_grid_data['zUsollkVnb'].replace(",", "."))
-            except KeyError as e: 
-                print("Key not in dict_grad_data: {}".format(e))
-                print("Bitte Angabe des Attributs in der Moebase prüfen!")
-                sys.exit()
-            except ValueError as e: 
-                print("Kein gültiger Wert für: {}".format(e))
-                print("Bitte Angabe des Attributs in der Moebase prüfen!")
-                sys.exit()
-            else: 
-                cls.grid_Usoll = Usoll  
+        Parameters:
+        -----------
+        faults_param: list
+            Liste von Tupeln (test, duration, fault_type, uf, grid, qset, phases, uv),
+            z.B. das Ergebnis von get_faults_by_test
+        dict_grid_data: dictionary
+            Dictionary, welche die Netzdaten gemäß Anhang E9 der VDE-AR-N enthält.
+            Relevanter Key: "sArtVNetzNB" (siehe calc_fault_values)
         
-        # Speichere Flags in cls
-        cls.flag_UW = flag_UW
-        cls.flag_MS = flag_MS
-        cls.flag_HS = flag_HS
-        cls.grid_Uc = Uc
-        cls.grid_Un = Un
+        Returns:
+        --------
+        (Rf, Xf): tuple of numpy.ndarray
+            Fehlerwiderstand Rf und Fehlerreaktanz Xf in Ohm je Fehlerereignis.
+            Für Versuche mit uf > 1 (Schalterereignis) ist der Wert NaN.
+        """
+        return calc_fault_values_batch(cls, faults_param, dict_grid_data)
 
-        # Berechne Netzimpedanz ZN, Netzwiederstand RN und Netzreaktanz XN
-        ZN = round(Un*Un*1000/(Skvmin), 7)  # Ohm
-        RN = round(ZN*math.cos(math.radians(Ykv)), 7)  # Ohm
-        XN = round(ZN*math.sin(math.radians(Ykv)), 7)  # Ohm
+    @classmethod
+    def from_faults_param(cls, faults_param, dict_grid_data):
+        """ from_faults_param: classmethod
+            Erstellt für jedes Fehlerereignis eine Instanz der Klasse. 
+            Rf und Xf werden vorab für alle Fehlerereignisse mit calc_fault_values_batch berechnet.
         
-        # Berechne Za und Zb für Ersatzschaltbild
-        cls.grid_Ra_vorg = round(0.1*RN, 5)
-        cls.grid_Xa_vorg = round(0.1*XN, 5)
-        cls.grid_Rb_vorg = round(0.9*RN, 5)
-        cls.grid_Xb_vorg = round(0.9*XN, 5)
-        if flag_MS and not flag_UW:
-            cls.grid_Ra_gleich = RT
-            cls.grid_Xa_gleich = XT
-            cls.grid_Rb_gleich = round(RN - RT, 5)
-            cls.grid_Xb_gleich = round(XN - XT, 5)
-        elif flag_HS or flag_UW:
-            cls.grid_Ra_gleich = RN
-            cls.grid_Xa_gleich = XN
-            cls.grid_Rb_gleich = 0
-            cls.grid_Xb_gleich = 0
-            
-        # Berechne die Nullsystemimpedanz Z0 bzw. R0/X0
-        # Sternpunkterdung (SPE)
-        # gültige Werte:  
-        # Starre Sternpunkterdung (SSPE)
-        # Resonanzsternpunkterdung (RSPE)
-        # Isoliert (OSPE)
-        # Nierderohmige Sternpunkterdung (NOSPE)
-        # kurzzeitig niederohmige Sternpunkterdnung (KNOSPE)
-        SPE_values = ["Starre Sternpunkterdung (SSPE)",
-                      "Resonanzsternpunkterdung (RSPE)",
-                      "Isoliert (OSPE)",
-                      "Niederohmige Sternpunkterdung (NOSPE)",
-                      "kurzzeitig niederohmige Sternpunkterdnung (KNOSPE)"]               
-        try:
-            SPE = dict_grid_data["sSPEnapNB"]
-        except KeyError as e:
-            # Keine Angabe in der Moebase
-            print("Key not in dict_grad_data: {}".format(e))
-            print("Resonanzsternpunkterdung angenommen!")
-            cls.grid_R0 = 20
-            cls.grid_X0 = 15000
-        else:
-            # Prüfe ob ein gültiger Wert gewählt wurde. Wenn nicht, wird RSPE angenommen.
-            if SPE in SPE_values:
-                # SSPE
-                if SPE == "Starre Sternpunkterdung (SSPE)":
-                    cls.grid_R0 = cls.grid_Ra_gleich
-                    cls.grid_X0 = cls.grid_Xa_gleich
-                # OSPE / RSPE)
-                elif SPE == "Isoliert (OSPE)" or SPE == "Resonanzsternpunkterdung (RSPE)":
-                    cls.grid_R0 = 20
-                    cls.grid_X0 = 15000
-                # NOSPE / KNOSPE
-                elif SPE == "kurzzeitig niederohmige Sternpunkterdnung (KNOSPE)" or SPE == "Niederohmige Sternpunkterdung (NOSPE)":
-                    # Bei NOSPE oder Knospe wird geprüft, ob ein Wert für die Impedanz
-                    # der Sternpunkterdnung Zspe in der MOEbase angegeben wurde.
-                    # Wenn ja: R0 = 3*Zspe + Ra, X0 = 0
-                    # Wenn nein oder ungültiger Wert R0 = 30 Ohm + Ra, X0 = 0
-                    try: 
-                        Zspe = float(dict_grid_data["zImpSPEnb"].replace(",","."))
-                    except KeyError as e:
-                        # R0 = 30 Ohm + Ra, X0 = 0
-                        print("Key not in dict_grad_data: {}".format(e))
-                        print("Annahme: R0= 30 Ohm + Ra, X0 = 0")
-                        cls.grid_R0 = 30 + cls.grid_Ra_gleich
-                        cls.grid_X0 = 0
-                    except ValueError as e:
-                        # R0 = 30 Ohm + Ra, X0 = 0
-                        print("Kein gültiger Wert für: {}".format(e))
-                        print("Annahme: R0= 30 Ohm + Ra, X0 = 0")    
-                        cls.grid_R0 = round(30 + cls.grid_Ra_gleich,4)
-                        cls.grid_X0 = 0
-                    else:
-                        # R0 = 3*Zspe + Ra
-                        cls.grid_R0 = round(3*Zspe + cls.grid_Ra_gleich, 4)
-                        cls.grid_X0 = 0
-            else:
-                print("Kein gültiger Wert für die Sternpunkterdung")
-                print("Resonanzsternpunkterdung angenommen!")       
-                cls.grid_R0 = 20
-                cls.grid_X0 = 15000  
-
-        # Kontrollausgabe Netzparameter
-        if flag_debug:
-            print("flag_MS: {}".format(flag_MS))
-            print("flag_HS: {}".format(flag_HS))
-            print("flag_UW: {}".format(flag_UW))
-            if flag_UW:
-                print("Usoll = {} kV".format(Usoll))
-            print("Uc = {} kV".format(Uc))
-            print("Un = {} kV".format(Un))
-            print('Skvmin = {} kVA'.format(Skvmin))
-            print('Ykv = {} Grad'.format(Ykv))
-            if flag_MS and not flag_UW:
-                print('RT = {} Ohm'.format(RT))
-                print('XT = {} Ohm'.format(XT))
-            print('ZN = {} Ohm'.format(ZN))
-            print('RN = {} Ohm'.format(RN))
-            print('XN = {} Ohm'.format(XN))
-            print('Ra_gleich = {} Ohm'.format(cls.grid_Ra_gleich))
-            print('Xa_gleich = {} Ohm'.format(cls.grid_Xa_gleich))
-            print('Rb_gleich = {} Ohm'.format(cls.grid_Rb_gleich))
-            print('Xb_gleich = {} Ohm'.format(cls.grid_Xb_gleich))
-            print('Ra_vorg = {} Ohm'.format(cls.grid_Ra_vorg))
-            print('Xa_vorg = {} Ohm'.format(cls.grid_Xa_vorg))
-            print('Rb_vorg = {} Ohm'.format(cls.grid_Rb_vorg))
-            print('Xb_vorg  = {} Ohm'.format(cls.grid_Xb_vorg))
-            print("R0 = {} Ohm".format(cls.grid_R0))
-            print("X0 = {} Ohm".format(cls.grid_X0))
+        Parameters:
+        -----------
+        faults_param: list
+            Liste von Tupeln (test, duration, fault_type, uf, grid, qset, phases, uv)
+        dict_grid_data: dictionary
+            Dictionary, welche die Netzdaten gemäß Anhang E9 der VDE-AR-N enthält.
+        
+        Returns:
+        --------
+        list: Liste der erstellten Instanzen
+        """
+        Rf, Xf = cls.calc_fault_values_batch(faults_param, dict_grid_data)
+        return [cls(params, dict_grid_data, impedance=(Rf[i], Xf[i])) for i, params in enumerate(faults_param)]
 
-    def calc_fault_values(self, dict_grid_data):
+    def calc_fault_values(self, dict_grid_data, flag_debug=False):
         """ calc_fault_values: method
             Calculates the fault resistance and fault reactance depending on the grid data        
         
@@ -455,6 +297,8 @@ class Faults_values(Faults):
             "sArtVNetzNB": string
                 Art des vorgelagerten Netzes 
                 Optionen: unbekannt, gemischt, Freileitungsnetz, Kabelnetz
+        flag_debug: boolean
+            Aktiviert (True) oder deaktiviert (False) die Ausgabe zum Debuggen
         
         Updated Instance Variables: 
         ---------------------------
@@ -463,81 +307,459 @@ class Faults_values(Faults):
         self.Xf: float
             Fehlerreaktanz Xf in Ohm für die aktuelle Instanz
         """
-        from math import radians, tan, sqrt
-        
-        flag_MS = self.flag_MS
-        flag_HS = self.flag_HS
-        uf = self.uf/self.uv
-        
-        # Unterscheidung gleiches/vorgelagertes Netz
-        if self.grid == "g":
-            Ra = self.grid_Ra_gleich
-            Xa = self.grid_Xa_gleich
-        else: 
-            Ra = self.grid_Ra_vorg
-            Xa = self.grid_Xa_vorg
+        params = (self.test, self.duration, self.fault_type, self.uf, self.grid, self.qset, self.phases, self.uv)
+        Rf, Xf = self.calc_fault_values_batch([params], dict_grid_data)
+        self.set_fault_values(Rf[0], Xf[0])
+            
+        # Debuggingausgabe
+        if flag_debug:
+            print("Test No.: {}".format(self.test))
+            print("uf: {} p.u.".format(self.uf/self.uv))
+            print("Rf [Ohm] = {} ".format(self.Rf))
+            print("Xf [Ohm] = {}\n\n".format(self.Xf))
+
+    def set_fault_values(self, Rf, Xf):
+        """ set_fault_values: method
+            Übernimmt Rf und Xf aus dem Ergebnis der Batch-Berechnung.
+            NaN (keine Fehlerimpedanz, Schalterereignis) wird für uf > 1 als None gespeichert.
+            NaN oder negative Werte für uf <= 1 ergeben einen ValueError (siehe fault_table.check_fault_impedance).
+        """
+        check_fault_impedance([self.uf], [Rf], [Xf], [self.test])
+        self.Rf = None if np.isnan(Rf) else float(Rf)
+        self.Xf = None if np.isnan(Xf) else float(Xf)
+            
+    def __init__(self, params, dict_grid_data, impedance=None, list_of_faults=None):
+        test, duration, fault_type, uf, grid, qset, phases, uv = params
+        super().__init__(test, duration, fault_type, uf, grid, qset, phases, uv, list_of_faults=list_of_faults)
+        if impedance is None:
+            self.calc_fault_values(dict_grid_data)
+        else:
+            self.set_fault_values(*impedance)
+
+
+# Gültige Werte für die Sternpunkterdung (SPE)
+# Starre Sternpunkterdung (SSPE)
+# Resonanzsternpunkterdung (RSPE)
+# Isoliert (OSPE)
+# Nierderohmige Sternpunkterdung (NOSPE)
+# kurzzeitig niederohmige Sternpunkterdnung (KNOSPE)
+SPE_values = ["Starre Sternpunkterdung (SSPE)",
+              "Resonanzsternpunkterdung (RSPE)",
+              "Isoliert (OSPE)",
+              "Niederohmige Sternpunkterdung (NOSPE)",
+              "kurzzeitig niederohmige Sternpunkterdnung (KNOSPE)"]
+
+# Ergebnisse von calc_equivalent_circuit, die als grid_<key> gespeichert werden
+EQUIVALENT_CIRCUIT_KEYS = ["Ra_gleich", "Xa_gleich", "Rb_gleich", "Xb_gleich",
+                           "Ra_vorg", "Xa_vorg", "Rb_vorg", "Xb_vorg", "R0", "X0"]
+
+
+def parse_grid_data(dict_grid_data):
+    """ parse_grid_data: function
+        Prüft die Netzdaten aus der Moebase auf Eintragung und Wert und konvertiert sie
+        in die Eingangsgrößen für calc_equivalent_circuit.
+    
+    Parameters:
+    -----------
+    dict_grid_data: dictionary
+        Dictionary, welche die Netzdaten gemäß Anhang E9 der VDE-AR-N enthält
+        (Keys siehe Faults_values.calc_grid_data).
+    
+    Returns:
+    --------
+    grid_input: dictionary
+        keys: Un, Uc, Skvmin, Ykv, flag_MS, flag_HS, flag_UW, flag_trafo, RT, XT, Usoll, SPE, Zspe
+    """
+    import sys
+    
+    # Attribute aus der Moebase auf Eintragung und Wert überprüfen:
+    # 'zUnkVnb' - Nominale Betriebsspannung Un [kV]
+    # 'zUckVnb' - Vereinbarte Versorgungsspannung Uc [kV]
+    # 'zSkkVAnb' - Netzkurzschlussleistung am NAP Sk [kVA]
+    # 'zYkGradNB' - Netzimpedanzwinkel am NAP Yk [°]
+    for key in ['zUnkVnb', 'zUckVnb', 'zSkkVAnb', 'zYkGradNB']:
+        try:
+            value = float(dict_grid_data[key].replace(",", "."))
+        except KeyError as e: 
+            print("Key not in dict_grad_data: {}".format(e))
+            print("Bitte Angabe des Attribut in der Moebase prüfen!")
+            sys.exit()
+        except ValueError as e: 
+            print("Kein gültiger Wert für: {}".format(e))
+            print("Bitte Angabe des Attribut in der Moebase prüfen!")
+            sys.exit()
+        else:
+            if key == 'zUnkVnb':
+                # Nominale Betriebsspannung Un [kV]
+                Un = value
+            elif key == 'zUckVnb':
+                # Vereinbarte Versorgungsspannung Uc [kV]
+                Uc = value
+            elif key == 'zSkkVAnb':
+                # Netzkurzschlussleistung am NAP Sk [kVA]
+                Skvmin = value
+            elif key == 'zYkGradNB':
+                # Netzimpedanzwinkel am NAP Yk [°]
+                Ykv = value
+    
+    # Prüfe die Anschlussart der EZE
+    # Gültige Werte: MS-Netz; MS-Netz (reine Einspeiseleitung); HS-Netz oder UW-Direktanschluss ist
+    # Default: MS-Netz
+    try:
+        Anschlussart = dict_grid_data['sAnschlussartEZEnb']
+        print('Anschlussart: {}'.format(Anschlussart))
+    except KeyError as e:
+        print("Key not in dict_grad_data: {}".format(e))
+        print("MS-Netz angenommen!")
+        Anschlussart = "MS-Netz"
         
-        # Frage die Art des vorgelagerten Netzes ab.
-        # Optionen: unbekannt, gemischt, Freileitungsnetz, Kabelnetz
-        # Default: unbekannt
+    if not Anschlussart == None:
+        if Anschlussart.strip() in ["MS-Netz", "MS-Netz (reine Einspeiseleistung)"]:
+            flag_MS = True
+            flag_HS = False
+            flag_UW = False
+        elif Anschlussart.strip() == "UW-Direktanschluss":
+            flag_MS = True
+            flag_HS = False
+            flag_UW = True
+        elif Anschlussart.strip() == "HS-Netz":
+            flag_HS = True
+            flag_MS = False
+            flag_UW = False
+        else:
+            print("Keine gültiger Wert in der Moebase für das Attribut: Anschlussart der EZE")
+            print("gültige Werte: MS-Netz; MS-Netz (reine Einspeiseleitung); HS-Netz; UW-Direktanschluss")
+            print("MS-Netz angenommen!")                
+            flag_MS = True
+            flag_HS = False
+            flag_UW = False
+    
+    # Wenn Anschluss im MS-Netz und kein UW-Direktanschluss, prüfe ob Daten für den vorgelagerten Netztrafo vorhanden sind.
+    RT = None
+    XT = None
+    if flag_MS and not flag_UW:
         try: 
-            grid_type = dict_grid_data["sArtVNetzNB"]
+            RT = dict_grid_data['zRnetzOhmNB']
+            XT = dict_grid_data['zXnetzOhmNB']
         except KeyError as e:
             print("Key not in dict_grad_data: {}".format(e))
-            print("Annahme: Art des vorgl. Netzes: unbekannt")
-            grid_type = "unbekannt"
-        else:   
-            if not grid_type in ["unbekannt", "gemischt","Freileitungsnetz", "Kabelnetz"]:
-                print("Kein gültiger Wert für die Art des vorgelagerten Netzes")
-                print("Annahme: Art des vorgl. Netzes: unbekannt")
-                grid_type = "unbekannt"
+            print("Annahme: Keine Trafodaten vorhanden!")
+            flag_UW = True
+        else:
+            try:
+                # Konvertiere RT und XT von String zu float 
+                # Ersetze Komma durch Punkt
+                RT = float(RT.replace(",", "."))
+                XT = float(XT.replace(",", "."))
+            except ValueError as e:
+                print("Kein gültiger Wert für Vorgelagerter Netztransformator: Rnetz oder Xnetz")
+                print("Trafodaten werden vernachlässigt!")
+                flag_UW = True
+                
+    # Wenn Anschluss im HS-Netz oder UW-Direktanschluss, hole zusätzlich das Attribut Reglersollspannung
+    Usoll = None
+    if flag_HS or flag_UW:
+        try: 
+            Usoll = float(dict_grid_data['zUsollkVnb'].replace(",", "."))
+        except KeyError as e: 
+            print("Key not in dict_grad_data: {}".format(e))
+            print("Bitte Angabe des Attributs in der Moebase prüfen!")
+            sys.exit()
+        except ValueError as e: 
+            print("Kein gültiger Wert für: {}".format(e))
+            print("Bitte Angabe des Attributs in der Moebase prüfen!")
+            sys.exit()
+    
+    # Sternpunkterdung (SPE). Wenn kein gültiger Wert angegeben ist, wird RSPE angenommen.
+    try:
+        SPE = dict_grid_data["sSPEnapNB"]
+    except KeyError as e:
+        # Keine Angabe in der Moebase
+        print("Key not in dict_grad_data: {}".format(e))
+        print("Resonanzsternpunkterdung angenommen!")
+        SPE = "Resonanzsternpunkterdung (RSPE)"
+    else:
+        if not SPE in SPE_values:
+            print("Kein gültiger Wert für die Sternpunkterdung")
+            print("Resonanzsternpunkterdung angenommen!")
+            SPE = "Resonanzsternpunkterdung (RSPE)"
+    
+    # Bei NOSPE oder Knospe wird geprüft, ob ein Wert für die Impedanz
+    # der Sternpunkterdnung Zspe in der MOEbase angegeben wurde.
+    Zspe = None
+    if SPE in ["Niederohmige Sternpunkterdung (NOSPE)", "kurzzeitig niederohmige Sternpunkterdnung (KNOSPE)"]:
+        try: 
+            Zspe = float(dict_grid_data["zImpSPEnb"].replace(",","."))
+        except KeyError as e:
+            print("Key not in dict_grad_data: {}".format(e))
+            print("Annahme: R0= 30 Ohm + Ra, X0 = 0")
+        except ValueError as e:
+            print("Kein gültiger Wert für: {}".format(e))
+            print("Annahme: R0= 30 Ohm + Ra, X0 = 0")
+    
+    return {"Un": Un, "Uc": Uc, "Skvmin": Skvmin, "Ykv": Ykv,
+            "flag_MS": flag_MS, "flag_HS": flag_HS, "flag_UW": flag_UW,
+            "flag_trafo": flag_MS and not flag_UW,
+            "RT": RT, "XT": XT, "Usoll": Usoll, "SPE": SPE, "Zspe": Zspe}
+
+
+def calc_equivalent_circuit(Un, Skvmin, Ykv, RT=np.nan, XT=np.nan,
+                            SPE="Resonanzsternpunkterdung (RSPE)", Zspe=None):
+    """ calc_equivalent_circuit: function
+        Berechnet das Ersatzschaltbild des Netzes gemäß FGW TR8 für beliebig viele Netzvarianten.
+        Alle Parameter können Skalare oder Arrays sein (numpy broadcasting).
+    
+    Parameters:
+    -----------
+    Un: array_like
+        Nominale Betriebsspannung Un [kV]
+    Skvmin: array_like
+        Netzkurzschlussleistung am NAP Sk [kVA]
+    Ykv: array_like
+        Netzimpedanzwinkel am NAP Yk [°]
+    RT, XT: array_like
+        Vorgelagerter Netztransformator Rnetz/Xnetz [Ohm].
+        NaN: keine Trafodaten (HS-Netz oder UW-Direktanschluss) => Za = ZN, Zb = 0
+    SPE: str or array_like of str
+        Sternpunkterdung im gleichen Netz (siehe SPE_values)
+    Zspe: array_like or None
+        Impedanz der SPE [Ohm] bei NOSPE/KNOSPE. None oder NaN: R0 = 30 Ohm + Ra
+    
+    Returns:
+    --------
+    circuit: dictionary
+        keys: ZN, RN, XN und EQUIVALENT_CIRCUIT_KEYS, Werte als numpy.ndarray in Ohm
+    """
+    Un = np.asarray(Un, dtype=float)
+    RT = np.asarray(RT, dtype=float)
+    XT = np.asarray(XT, dtype=float)
+    Zspe = np.asarray(np.nan if Zspe is None else Zspe, dtype=float)
+    SPE = np.asarray(SPE, dtype=object)
+    
+    # Berechne Netzimpedanz ZN, Netzwiederstand RN und Netzreaktanz XN
+    ZN = np.round(Un*Un*1000/np.asarray(Skvmin, dtype=float), 7)  # Ohm
+    RN = np.round(ZN*np.cos(np.radians(Ykv)), 7)  # Ohm
+    XN = np.round(ZN*np.sin(np.radians(Ykv)), 7)  # Ohm
+    
+    circuit = {"ZN": ZN, "RN": RN, "XN": XN}
+    # Berechne Za und Zb für Ersatzschaltbild
+    circuit["Ra_vorg"] = np.round(0.1*RN, 5)
+    circuit["Xa_vorg"] = np.round(0.1*XN, 5)
+    circuit["Rb_vorg"] = np.round(0.9*RN, 5)
+    circuit["Xb_vorg"] = np.round(0.9*XN, 5)
+    # MS-Netz mit Trafodaten: Za = ZT, Zb = ZN - ZT
+    # HS-Netz oder UW-Direktanschluss: Za = ZN, Zb = 0
+    flag_trafo = ~np.isnan(RT)
+    circuit["Ra_gleich"] = np.where(flag_trafo, RT, RN)
+    circuit["Xa_gleich"] = np.where(flag_trafo, XT, XN)
+    circuit["Rb_gleich"] = np.where(flag_trafo, np.round(RN - RT, 5), 0.)
+    circuit["Xb_gleich"] = np.where(flag_trafo, np.round(XN - XT, 5), 0.)
+    
+    # Berechne die Nullsystemimpedanz Z0 bzw. R0/X0
+    # SSPE: Z0 = Za
+    # NOSPE / KNOSPE: R0 = 3*Zspe + Ra bzw. R0 = 30 Ohm + Ra, X0 = 0
+    # OSPE / RSPE (Default): R0 = 20 Ohm, X0 = 15000 Ohm
+    flag_SSPE = SPE == "Starre Sternpunkterdung (SSPE)"
+    flag_NOSPE = (SPE == "Niederohmige Sternpunkterdung (NOSPE)") | (SPE == "kurzzeitig niederohmige Sternpunkterdnung (KNOSPE)")
+    R0_NOSPE = np.round(np.where(np.isnan(Zspe), 30., 3*Zspe) + circuit["Ra_gleich"], 4)
+    circuit["R0"] = np.select([flag_SSPE, flag_NOSPE], [circuit["Ra_gleich"], R0_NOSPE], 20.)
+    circuit["X0"] = np.select([flag_SSPE, flag_NOSPE], [circuit["Xa_gleich"], 0.], 15000.)
+    return circuit
+
+
+def set_grid_data(target, dict_grid_data, flag_debug=False):
+    """ set_grid_data: function
+        Berechnet die Netzdaten für das Ersatzschaltbild (ElmVac/ElmSind) in PowerFactory
+        und speichert sie als Attribute von target (grid_Ra_gleich, ..., flag_MS, ...).
         
-        #Bestimmung des Fehlerimpedanzwinkels Psif
-        if self.flag_HS: 
-            if grid_type == "Freileitungsnetz":
-                Psif = 75
-            else: # unbekannt, gemischt, Kabelnetz
-                Psif = 70
-        elif self.flag_MS:
-            if grid_type == "Freileitungsnetz":
-                Psif = 50
-            else: # unbekannt, gemischt, Kabelnetz
-                Psif = 30
-        else: 
-            Psif = 30 
+    Parameters:
+    -----------
+    target: object
+        Klasse Faults_values (Klassenvariablen) oder Instanz von GridModel
+    dict_grid_data: dictionary
+        Dictionary, welche die Netzdaten gemäß Anhang E9 der VDE-AR-N enthält
+        (Keys siehe Faults_values.calc_grid_data).
+    flag_debug: boolean
+        Aktiviert (True) oder deaktiviert (False) die Ausgabe zum Debuggen
+    """
+    grid_input = parse_grid_data(dict_grid_data)
+    Uc = grid_input["Uc"]
+    Un = grid_input["Un"]
+    
+    # Speichere Flags in target
+    target.flag_UW = grid_input["flag_UW"]
+    target.flag_MS = grid_input["flag_MS"]
+    target.flag_HS = grid_input["flag_HS"]
+    target.grid_Uc = Uc
+    target.grid_Un = Un
+    if grid_input["Usoll"] is not None:
+        target.grid_Usoll = grid_input["Usoll"]
+    
+    # Berechne das Ersatzschaltbild (Za, Zb für gleiches/vorgelagertes Netz, Z0)
+    circuit = calc_equivalent_circuit(Un=Un,
+                                      Skvmin=grid_input["Skvmin"],
+                                      Ykv=grid_input["Ykv"],
+                                      RT=grid_input["RT"] if grid_input["flag_trafo"] else np.nan,
+                                      XT=grid_input["XT"] if grid_input["flag_trafo"] else np.nan,
+                                      SPE=grid_input["SPE"],
+                                      Zspe=grid_input["Zspe"])
+    for key in EQUIVALENT_CIRCUIT_KEYS:
+        setattr(target, "grid_{}".format(key), float(circuit[key]))
+
+    # Kontrollausgabe Netzparameter
+    if flag_debug:
+        print("flag_MS: {}".format(target.flag_MS))
+        print("flag_HS: {}".format(target.flag_HS))
+        print("flag_UW: {}".format(target.flag_UW))
+        if target.flag_UW:
+            print("Usoll = {} kV".format(grid_input["Usoll"]))
+        print("Uc = {} kV".format(Uc))
+        print("Un = {} kV".format(Un))
+        print('Skvmin = {} kVA'.format(grid_input["Skvmin"]))
+        print('Ykv = {} Grad'.format(grid_input["Ykv"]))
+        if grid_input["flag_trafo"]:
+            print('RT = {} Ohm'.format(grid_input["RT"]))
+            print('XT = {} Ohm'.format(grid_input["XT"]))
+        print('ZN = {} Ohm'.format(float(circuit["ZN"])))
+        print('RN = {} Ohm'.format(float(circuit["RN"])))
+        print('XN = {} Ohm'.format(float(circuit["XN"])))
+        print('Ra_gleich = {} Ohm'.format(target.grid_Ra_gleich))
+        print('Xa_gleich = {} Ohm'.format(target.grid_Xa_gleich))
+        print('Rb_gleich = {} Ohm'.format(target.grid_Rb_gleich))
+        print('Xb_gleich = {} Ohm'.format(target.grid_Xb_gleich))
+        print('Ra_vorg = {} Ohm'.format(target.grid_Ra_vorg))
+        print('Xa_vorg = {} Ohm'.format(target.grid_Xa_vorg))
+        print('Rb_vorg = {} Ohm'.format(target.grid_Rb_vorg))
+        print('Xb_vorg  = {} Ohm'.format(target.grid_Xb_vorg))
+        print("R0 = {} Ohm".format(target.grid_R0))
+        print("X0 = {} Ohm".format(target.grid_X0))
+
+
+def calc_fault_values_batch(grid, faults_param, dict_grid_data):
+    """ calc_fault_values_batch: function
+        Berechnet Rf und Xf für alle Fehlerereignisse einer Fehlertabelle
+        mit den Netzdaten von grid (siehe set_grid_data).
+    
+    Parameters:
+    -----------
+    grid: object
+        Klasse Faults_values oder Instanz von GridModel
+    faults_param: list
+        Liste von Tupeln (test, duration, fault_type, uf, grid, qset, phases, uv)
+    dict_grid_data: dictionary
+        Dictionary, welche die Netzdaten gemäß Anhang E9 der VDE-AR-N enthält.
         
-        print("Test No.: {}".format(self.test))    
-        print("Psif: {} Grad".format(Psif))
-        print("uf: {} p.u.".format(uf))
+    Returns:
+    --------
+    (Rf, Xf): tuple of numpy.ndarray
+        Fehlerwiderstand Rf und Fehlerreaktanz Xf in Ohm, NaN für uf > 1
+    """
+    Psif = calc_fault_angle(get_grid_type(dict_grid_data), grid.flag_MS, grid.flag_HS)
+    
+    _, _, fault_type, uf, grid_location, _, _, uv = zip(*faults_param) if faults_param else ([],)*8
+    flag_gleich = np.array(grid_location, dtype=object) == "g"
+    Ra = np.where(flag_gleich, grid.grid_Ra_gleich, grid.grid_Ra_vorg)
+    Xa = np.where(flag_gleich, grid.grid_Xa_gleich, grid.grid_Xa_vorg)
+    return calc_fault_impedance(uf, uv, fault_type, Ra, Xa, Psif)
+
+
+def get_grid_type(dict_grid_data):
+    """ get_grid_type: function
+        Frage die Art des vorgelagerten Netzes ab.
+        Optionen: unbekannt, gemischt, Freileitungsnetz, Kabelnetz
+        Default: unbekannt
+    
+    Parameters:
+    -----------
+    dict_grid_data: dictionary
+        Dictionary, welche die Netzdaten gemäß Anhang E9 der VDE-AR-N enthält.
+    
+    Returns:
+    --------
+    grid_type: str
+    """
+    try: 
+        grid_type = dict_grid_data["sArtVNetzNB"]
+    except KeyError as e:
+        print("Key not in dict_grad_data: {}".format(e))
+        print("Annahme: Art des vorgl. Netzes: unbekannt")
+        grid_type = "unbekannt"
+    else:   
+        if not grid_type in ["unbekannt", "gemischt","Freileitungsnetz", "Kabelnetz"]:
+            print("Kein gültiger Wert für die Art des vorgelagerten Netzes")
+            print("Annahme: Art des vorgl. Netzes: unbekannt")
+            grid_type = "unbekannt"
+    return grid_type
+
+
+def calc_fault_angle(grid_type, flag_MS, flag_HS):
+    """ calc_fault_angle: function
+        Bestimmung des Fehlerimpedanzwinkels Psif in Grad
         
-        # Berechne Rf und Xf für Versuche mit Fehlerspannung <= 1 p.u.
-        if self.uf <= 1:
-            # Formeln gemäß FGW TR8 Rev 9
-            A = tan(radians(Psif))
-            B = ((uf**2)-1)*(1+(A**2))
-            p = (2*(uf**2)*(Ra+A*Xa))/B
-            q = ((uf**2)*((Ra**2)+(Xa**2)))/B
-            self.Rf = -p/2 + sqrt((p**2)/4 - q)
-            # Fehlerwiderstand wird bei unsymmetrischen Fehlern verdoppelt
-            if not self.fault_type==0 and not self.fault_type==2 : 
-                self.Rf *= 2
-                print("unsymmetrischer Fehler => Rf*2")
-            self.Xf = self.Rf*A
-            # Debuggingausgabe
-            print("A = {}".format(A))
-            print("B = {}".format(B))
-            print("p = {}".format(p))
-            print("q = {}".format(q))
-        else: 
-            # Wenn Fehlerspannung > 1, werden keine Werte für Rf und Xf berechnet
-            self.Rf = None
-            self.Xf = None
-            
-        # Debuggingausgabe
-        print("Rf [Ohm] = {} ".format(self.Rf))
-        print("Xf [Ohm] = {}\n\n".format(self.Xf))
-            
-    def __init__(self, params, dict_grid_data):
-        test, duration, fault_type, uf, grid, qset, phases, uv = params
-        super().__init__(test, duration, fault_type, uf, grid, qset, phases, uv)
-        self.calc_fault_values(dict_grid_data)
\ No newline at end of file
+    Parameters:
+    -----------
+    grid_type: str
+        Art des vorgelagerten Netzes (unbekannt, gemischt, Freileitungsnetz, Kabelnetz)
+    flag_MS: boolean
+        Anschluss der EZA im MS-Netz (True), sonst (False)
+    flag_HS: boolean
+        Anschluss der EZA im HS-Netz (True), sonst (False)
+    """
+    if flag_HS: 
+        if grid_type == "Freileitungsnetz":
+            return 75
+        # unbekannt, gemischt, Kabelnetz
+        return 70
+    elif flag_MS:
+        if grid_type == "Freileitungsnetz":
+            return 50
+        # unbekannt, gemischt, Kabelnetz
+        return 30
+    return 30
+
+
+def calc_fault_impedance(uf, uv, fault_type, Ra, Xa, Psif):
+    """ calc_fault_impedance: function
+        Berechnet Rf und Xf gemäß FGW TR8 Rev 9 für beliebig viele Fehlerereignisse.
+        Alle Parameter können Skalare oder gleich lange Arrays sein (numpy broadcasting).
+    
+    Parameters:
+    -----------
+    uf: array_like
+        Restspannung während des Fehlers in p.u.
+    uv: array_like
+        Vorfehlerspannung in p.u. (Uc)
+    fault_type: array_like
+        Fehlertyp (0 - 3-polig, 1 - 2-polig, 2 - 1-polig mit Erdberührung)
+    Ra, Xa: array_like
+        Resistanz und Reaktanz der Wechselspannungsquelle in Ohm (gleiches oder vorgelagertes Netz)
+    Psif: array_like
+        Fehlerimpedanzwinkel in Grad
+    
+    Returns:
+    --------
+    (Rf, Xf): tuple of numpy.ndarray
+        Fehlerwiderstand und Fehlerreaktanz in Ohm. NaN für uf > 1 (keine Fehlerimpedanz) und für uf <= 1 ohne
+        Lösung (negative Diskriminante). Für uf >= uv ergeben sich NaN oder negative Werte. In beiden Fällen ist der
+        Versuch ungültig (siehe set_fault_values).
+    """
+    uf_abs = np.asarray(uf, dtype=float)
+    uf = uf_abs/np.asarray(uv, dtype=float)
+    fault_type = np.asarray(fault_type)
+    Ra = np.asarray(Ra, dtype=float)
+    Xa = np.asarray(Xa, dtype=float)
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Formeln gemäß FGW TR8 Rev 9
+        A = np.tan(np.radians(Psif))
+        B = ((uf**2)-1)*(1+(A**2))
+        p = (2*(uf**2)*(Ra+A*Xa))/B
+        q = ((uf**2)*((Ra**2)+(Xa**2)))/B
+        Rf = -p/2 + np.sqrt((p**2)/4 - q)
+    # Fehlerwiderstand wird bei unsymmetrischen Fehlern verdoppelt
+    Rf = np.where((fault_type == 0) | (fault_type == 2), Rf, 2*Rf)
+    Xf = Rf*A
+    # Wenn Fehlerspannung > 1, werden keine Werte für Rf und Xf berechnet
+    Rf = np.where(uf_abs <= 1, Rf, np.nan)
+    Xf = np.where(uf_abs <= 1, Xf, np.nan)
+    return Rf, Xf
@@ -0,0 +1,253 @@
+""" frt_eval.py
+
+Auswertung der FRT-Versuche (FGW TR8) einer Kampagne aus den exportierten Ergebnissen.
+
+Je Versuch und Messstelle (EZE, NAP, MS, NS, ...) werden Spannung (m:u1 bzw. Mitsystem aus n:ul),
+Blindstrom (m:I1Q) und Wirkstrom (m:I1P) im Zeitfenster um den Fehler eingelesen (Ergebnisdatei
+Versuch<N>.dynres, sonst Exportdateien *.dat), auf ein gemeinsames Zeitraster relativ zum
+Fehlereintritt interpoliert und für alle Versuche und Messstellen gemeinsam als Matrix ausgewertet:
+Vorfehlerwerte, Restspannung, Spannungs- und Blindstromänderung, k-Faktor (-ΔIq/ΔU), An- und
+Einschwingzeit des Blindstroms, Wiederkehr von Spannung und Wirkstrom sowie Bewertung gegen Grenzwerte.
+
+Beispiel:
+    i_base = rated_currents(app, logger, res_vars, obj_index=obj_index)
+    series = load_campaign(r"C:\\Ausgabe_Skript", grid_model.list_of_faults, i_base=i_base)
+    df = evaluate_frt(series)
+    df.to_csv(r"C:\\Ausgabe_Skript\\FRT_Auswertung.csv", sep=";", decimal=",")
+"""
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+
+from main.results import T_FAULT, read_dat_window
+from main.result_store import read_store, export_table_name
+from main.symcomp import SymCompStream
+
+# Grenzwerte der Bewertung (None: Kriterium nicht bewerten)
+LIMITS = {"t_rise_max": 0.03,  # Anschwingzeit Blindstrom in s
+          "t_settle_max": 0.06,  # Einschwingzeit Blindstrom in s
+          "k_min": 2.0,  # k-Faktor
+          "k_max": 6.0,
+          "t_recovery_p_max": 1.0}  # Wiederkehr des Wirkstroms auf 90 % in s nach Fehlerklärung
+
+# Tabellen ohne Auswertung: Leiter-Erd-Spannungen (ULE), Synchronmaschine (VKM)
+SKIP_TABLES = ("ULE", "VKM")
+
+
+def _select(variables, prefix):
+    """ Gibt die Spaltennummern der Variablen mit dem Präfix prefix (z.B. "m:I1Q:") zurück. """
+    return [i for i, variable in enumerate(variables) if variable.startswith(prefix)]
+
+
+def extract_series(result, fault, point, flag_emt=False, i_base=None):
+    """ extract_series: function
+        Gibt Zeit, Spannung, Blind- und Wirkstrom einer Messstelle als dictionary zurück.
+
+    Parameters
+    ----------
+    result: dictionary
+        Tabelle im Format von results.read_dat (objects, variables, data)
+    fault: Instance of Class
+        Fehlerdefinition des Versuchs (FaultRecord)
+    point: str
+        Messstelle, z.B. "EZE1", "NAP"
+    flag_emt: bool
+        True: EMT-Export, Leiterspannungen sind Augenblickswerte (Mitsystem über gleitende DFT, siehe symcomp)
+    i_base: dictionary
+        Bemessungsstrom in kA je Messstelle (z.B. {"EZE1": 0.25, "EZE": 0.5, "NAP": 0.6}, zuerst mit, dann
+        ohne Nummer gesucht). m:I1Q/m:I1P werden in kA exportiert, der k-Faktor braucht Ströme in p.u.
+        Enthält die Tabelle Ströme, aber i_base keinen Eintrag für die Messstelle: ValueError
+    """
+    variables = result["variables"]
+    data = result["data"]
+    u1, ul = _select(variables, "m:u1:"), _select(variables, "n:ul:")
+    if u1:
+        u = data[:, u1[0]]
+    elif ul:
+        # Mitsystemspannung aus den Leiter-Leiter-Spannungen (RMS: Spannungsdreieck, EMT: gleitende DFT)
+        try:
+            u = SymCompStream(variables, flag_emt).process(result)["u1"]
+        except ValueError:
+            # Dezimierter EMT-Export: keine konstante Schrittweite für die DFT
+            u = np.full(data.shape[0], np.nan)
+    else:
+        u = np.full(data.shape[0], np.nan)
+    iq, ip = _select(variables, "m:I1Q:"), _select(variables, "m:I1P:")
+    base = 1.0
+    if iq or ip:
+        i_base = i_base or {}
+        base = i_base.get(point, i_base.get(point.rstrip("0123456789")))
+        if not base:
+            raise ValueError("extract_series: Kein Bemessungsstrom (i_base) für Messstelle {}, "
+                             "Ströme in kA können nicht bewertet werden".format(point))
+    return {"test": fault.test, "point": point, "duration": float(fault.duration), "uf": float(fault.uf),
+            "fault_type": int(fault.fault_type), "phases": int(fault.phases), "t": data[:, 0], "u": u,
+            "iq": data[:, iq[0]]/base if iq else np.full(data.shape[0], np.nan),
+            "ip": data[:, ip[0]]/base if ip else np.full(data.shape[0], np.nan)}
+
+
+def load_campaign(export_dir, faults, points=None, t_pre=0.2, t_post=2.0, i_base=None):
+    """ load_campaign: function
+        Liest die Ergebnisse aller Versuche im Zeitfenster um den Fehler ein.
+
+    Parameters
+    ----------
+    export_dir: str
+        Ausgabeordner der Exporte (z.B. "C:\\Ausgabe_Skript")
+    faults: iterable
+        Fehlerdefinitionen der Kampagne (z.B. grid_model.list_of_faults)
+    points: list (optional)
+        Nur diese Messstellen (z.B. ["EZE", "NAP"]). Default: alle exportierten
+    t_pre, t_post: float
+        Zeitfenster vor dem Fehlereintritt bzw. nach der Fehlerklärung in s
+    i_base: dictionary
+        Bemessungsströme in kA, siehe extract_series (z.B. aus pf_functions.rated_currents)
+
+    Returns
+    -------
+    series: list
+        Ein dictionary je Versuch und Messstelle (siehe extract_series)
+    """
+    series = []
+    for fault in faults:
+        t_start, t_stop = T_FAULT - t_pre, T_FAULT + fault.duration + t_post
+        fname_store = os.path.join(export_dir, "Versuch{}.dynres".format(fault.test))
+        if os.path.isfile(fname_store):
+            store = read_store(fname_store)
+            flag_emt = store.meta.get("sim_mode") == "ins"
+            tables = [(name, lambda name=name: store.window(name, t_start, t_stop)) for name in store.tables]
+        else:
+            files = glob.glob(os.path.join(export_dir, "Versuch{}_*.dat".format(fault.test)))
+            flag_emt = any("_EMT_" in os.path.basename(fname) for fname in files)
+            tables = [(export_table_name(fname, fault.test),
+                       lambda fname=fname: read_dat_window(fname, t_start, t_stop)) for fname in sorted(files)]
+        for name, read in tables:
+            point = name[len("EMT_"):] if name.startswith("EMT_") else name
+            if point.endswith(SKIP_TABLES) or point == "Export":
+                continue
+            if points is not None and point.rstrip("0123456789") not in points and point not in points:
+                continue
+            series.append(extract_series(read(), fault, point, flag_emt=flag_emt, i_base=i_base))
+    return series
+
+
+def _masked_mean(x, mask):
+    mask = mask & ~np.isnan(x)
+    count = mask.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count > 0, np.where(mask, x, 0.0).sum(axis=1)/count, np.nan)
+
+
+def _first_time(tau, mask):
+    """ Gibt je Zeile die erste Zeit tau mit mask zurück (nan, wenn mask in der Zeile nie zutrifft). """
+    return np.where(mask.any(axis=1), tau[mask.argmax(axis=1)], np.nan)
+
+
+def _evaluate_group(series, duration, dt, t_pre, t_stationary, band, band_min):
+    """ Wertet Versuche gleicher Fehlerdauer als Matrix (Versuch/Messstelle x Zeitpunkt) aus. """
+    tau = np.arange(-t_pre, duration + max(2.0, t_pre), dt)
+    # Gemeinsames Zeitraster relativ zum Fehlereintritt, außerhalb der Daten nan
+    def grid(key):
+        return np.vstack([np.interp(T_FAULT + tau, s["t"], s[key], left=np.nan, right=np.nan) for s in series])
+    u, iq, ip = grid("u"), grid("iq"), grid("ip")
+
+    pre = np.broadcast_to(tau < 0, u.shape)
+    during = np.broadcast_to((tau >= 0) & (tau < duration), u.shape)
+    stationary = during & (tau >= min(t_stationary, duration/2))
+    after = np.broadcast_to(tau >= duration, u.shape)
+
+    u_pre, iq_pre, ip_pre = _masked_mean(u, pre), _masked_mean(iq, pre), _masked_mean(ip, pre)
+    u_res, iq_fault = _masked_mean(u, stationary), _masked_mean(iq, stationary)
+    du, diq = u_res - u_pre, iq_fault - iq_pre
+    with np.errstate(invalid="ignore", divide="ignore"):
+        k = np.where(np.abs(du) > 1e-3, -diq/du, np.nan)
+    flag_iq = np.abs(diq) > 1e-3
+
+    # Anschwingzeit: erstes Erreichen von 90 % der Blindstromänderung
+    delta = iq - iq_pre[:, None]
+    t_rise = np.where(flag_iq, _first_time(tau, during & (np.abs(delta) >= 0.9*np.abs(diq)[:, None])), np.nan)
+    # Einschwingzeit: ab dem letzten Verlassen des Toleranzbands um die stationäre Blindstromänderung
+    tolerance = np.maximum(band*np.abs(diq), band_min)[:, None]
+    outside = during & ~(np.abs(delta - diq[:, None]) <= tolerance)
+    last = outside.shape[1] - 1 - outside[:, ::-1].argmax(axis=1)
+    t_settle = np.where(outside.any(axis=1), tau[np.minimum(last + 1, len(tau) - 1)], 0.0)
+    t_settle = np.where(flag_iq, t_settle, np.nan)
+    # Wiederkehr nach Fehlerklärung auf 90 % des Vorfehlerwerts
+    t_recovery_u = _first_time(tau, after & (u >= 0.9*u_pre[:, None])) - duration
+    t_recovery_p = np.where(ip_pre > 1e-3, _first_time(tau, after & (ip >= 0.9*ip_pre[:, None])) - duration, np.nan)
+    return {"u_pre": u_pre, "u_res": u_res, "du": du, "iq_pre": iq_pre, "iq_fault": iq_fault, "diq": diq, "k": k,
+            "t_rise": t_rise, "t_settle": t_settle, "t_recovery_u": t_recovery_u, "t_recovery_p": t_recovery_p}
+
+
+def evaluate_frt(series, limits=None, dt=1e-3, t_pre=0.1, t_stationary=0.05, band=0.1, band_min=0.02):
+    """ evaluate_frt: function
+        Wertet alle Versuche und Messstellen gemeinsam aus.
+
+    Parameters
+    ----------
+    series: list
+        Rückgabewert von load_campaign
+    limits: dictionary (optional)
+        Grenzwerte (siehe LIMITS). Default: LIMITS
+    dt: float
+        Schrittweite des gemeinsamen Zeitrasters in s
+    t_pre: float
+        Zeitfenster vor dem Fehlereintritt für die Vorfehlerwerte in s
+    t_stationary: float
+        Beginn des stationären Fehlerzustands nach Fehlereintritt in s (höchstens halbe Fehlerdauer)
+    band, band_min:
+        Toleranzband der Einschwingzeit: max(band*|ΔIq|, band_min)
+
+    Returns
+    -------
+    df: pandas.DataFrame
+        Eine Zeile je Versuch und Messstelle: test, point, fault_type, phases, duration, uf, u_pre, u_res, du,
+        iq_pre, iq_fault, diq, k, t_rise, t_settle, t_recovery_u, t_recovery_p, die Bewertung je Kriterium
+        (pass_*: True/False, None: nicht bewertet, z.B. Kennwert nan), passed (alle Kriterien bewertet und
+        bestanden) und not_evaluated (nicht bewertete Kriterien)
+    """
+    limits = dict(LIMITS, **(limits or {}))
+    columns = ["test", "point", "fault_type", "phases", "duration", "uf"]
+    if not series:
+        return pd.DataFrame(columns=columns)
+    # Versuche gleicher Fehlerdauer gemeinsam auswerten (gleiches Zeitraster, keine Auffüllung langer Versuche)
+    values = {}
+    durations = np.array([s["duration"] for s in series])
+    for duration in np.unique(durations):
+        rows = np.flatnonzero(durations == duration)
+        group = _evaluate_group([series[i] for i in rows], duration, dt, t_pre, t_stationary, band, band_min)
+        for name, column in group.items():
+            values.setdefault(name, np.full(len(series), np.nan))[rows] = column
+    df = pd.DataFrame({column: [s[column] for s in series] for column in columns}).assign(**values)
+    k, t_rise, t_settle, t_recovery_p = values["k"], values["t_rise"], values["t_settle"], values["t_recovery_p"]
+    # Bewertung je Kriterium: nan (z.B. fehlende Spalte m:I1Q, leeres Zeitfenster) gilt als nicht bewertet
+    # (None in pass_*) und nicht als bestanden
+    not_evaluated = [[] for _ in series]
+    with np.errstate(invalid="ignore"):
+        checks = {"pass_t_rise": (t_rise, [(np.less_equal, limits["t_rise_max"])]),
+                  "pass_t_settle": (t_settle, [(np.less_equal, limits["t_settle_max"])]),
+                  "pass_k": (k, [(np.greater_equal, limits["k_min"]), (np.less_equal, limits["k_max"])]),
+                  "pass_t_recovery_p": (t_recovery_p, [(np.less_equal, limits["t_recovery_p_max"])])}
+        passed = np.ones(len(series), dtype=bool)
+        for name, (metric, conditions) in checks.items():
+            conditions = [(compare, limit) for compare, limit in conditions if limit is not None]
+            if not conditions:
+                continue
+            evaluated = ~np.isnan(metric)
+            result = evaluated & np.logical_and.reduce([compare(metric, limit) for compare, limit in conditions])
+            df[name] = np.where(evaluated, result, None)
+            passed &= result
+            for i in np.flatnonzero(~evaluated):
+                not_evaluated[i].append(name[len("pass_"):])
+    df["passed"] = passed
+    df["not_evaluated"] = [", ".join(names) for names in not_evaluated]
+    return df
+
+
+def evaluate_campaign(export_dir, faults, points=None, limits=None, i_base=None, **kwargs):
+    """ evaluate_campaign: function
+        Liest die Ergebnisse der Kampagne ein (load_campaign) und wertet sie aus (evaluate_frt).
+    """
+    return evaluate_frt(load_campaign(export_dir, faults, points=points, i_base=i_base), limits=limits, **kwargs)
@@ -0,0 +1,83 @@
+""" grid_model.py
+
+Netzmodell eines Projekts für einen Simulationslauf.
+
+Im Gegensatz zu den Klassenvariablen von Faults_values hält eine Instanz von GridModel
+das berechnete Ersatzschaltbild und die Liste der Fehlerereignisse eines Laufs.
+Mehrere Projekte können so im selben Interpreter (z.B. in Threads) berechnet werden.
+"""
+from main.faults import set_grid_data, calc_fault_values_batch
+from main.fault_table import FaultTable
+
+
+class GridModel:
+    """ GridModel: class
+
+    Netzdaten gemäß FGW TR8 Rev.9 und Fehlerereignisse gemäß VDE-AR-N 4110/4120 für einen Lauf.
+    Die Attribute entsprechen den Klassenvariablen von Faults_values, sodass eine Instanz
+    an set_grid, create_faults_scenarios und execute_simulation übergeben werden kann.
+
+    Attributes:
+    ----------
+    dict_grid_data: dictionary
+        Netzdaten gemäß Anhang E9 der VDE-AR-N
+    flag_UW, flag_MS, flag_HS: boolean
+        Anschlussart der EZA (siehe Faults_values)
+    grid_Usoll, grid_Uc, grid_Un: float
+        Reglersollspannung, vereinbarte Versorgungsspannung und nominale Betriebsspannung in kV
+    grid_Ra_gleich, grid_Xa_gleich, grid_Rb_gleich, grid_Xb_gleich: float
+        Ersatzschaltbild gleiches Netz in Ohm
+    grid_Ra_vorg, grid_Xa_vorg, grid_Rb_vorg, grid_Xb_vorg: float
+        Ersatzschaltbild vorgelagertes Netz in Ohm
+    grid_R0, grid_X0: float
+        Nullsystemimpedanz der Wechselspannungsquellen in Ohm
+    list_of_faults: FaultTable
+        Fehlerereignisse dieses Laufs. Iteration liefert FaultRecord-Objekte.
+
+    Methods:
+    -------
+    add_faults:
+        Berechnet Rf/Xf und nimmt die Fehlerereignisse in list_of_faults auf.
+    """
+
+    def __init__(self, dict_grid_data, flag_debug=False):
+        """
+        Parameters
+        ----------
+        dict_grid_data: dictionary
+            Netzdaten gemäß Anhang E9 der VDE-AR-N (Keys siehe Faults_values.calc_grid_data)
+        flag_debug: boolean
+            Aktiviert (True) oder deaktiviert (False) die Ausgabe zum Debuggen
+        """
+        self.dict_grid_data = dict_grid_data
+        self.grid_Usoll = None
+        set_grid_data(self, dict_grid_data, flag_debug=flag_debug)
+        self.list_of_faults = FaultTable()
+
+    def add_faults(self, faults_param):
+        """ add_faults: method
+            Berechnet Rf und Xf für alle Fehlerereignisse in einem Durchlauf
+            und nimmt sie in list_of_faults auf.
+
+        Parameters
+        ----------
+        faults_param: list
+            Liste von Tupeln (test, duration, fault_type, uf, grid, qset, phases, uv),
+            z.B. das Ergebnis von get_faults_by_test
+
+        Returns
+        -------
+        FaultTable: die neu aufgenommenen Fehlerereignisse
+
+        Raises
+        ------
+        ValueError
+            Für einen Versuch mit uf <= 1 kann keine gültige Fehlerimpedanz berechnet werden (siehe FaultTable.from_rows)
+        """
+        Rf, Xf = calc_fault_values_batch(self, faults_param, self.dict_grid_data)
+        table = FaultTable.from_rows(faults_param, Rf, Xf)
+        self.list_of_faults.append(table)
+        return table
+
+    def __repr__(self):
+        return "GridModel(Un={} kV, Uc={} kV, faults={})".format(self.grid_Un, self.grid_Uc, len(self.list_of_faults))
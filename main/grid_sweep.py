@@ -0,0 +1,138 @@
+""" grid_sweep.py
+
+Parameterstudie über die Netzdaten gemäß Anhang E9 der VDE-AR-N 4110/4120.
+
+Berechnet das Ersatzschaltbild (Ra/Xa/Rb/Xb gleiches/vorgelagertes Netz, R0/X0)
+und die Fehlerimpedanzen Rf/Xf für alle Kombinationen der variierten Netzattribute
+in einem vektorisierten Durchlauf. Interessante Varianten können anschließend mit
+variant_grid_data in ein dict_grid_att für die Simulation überführt werden.
+"""
+import numpy as np
+
+from main.faults import (parse_grid_data, calc_equivalent_circuit, calc_fault_impedance,
+                         calc_fault_angle, get_grid_type, EQUIVALENT_CIRCUIT_KEYS, SPE_values)
+
+# Netzattribute (shortnames), die variiert werden können
+SWEEP_KEYS = ['zSkkVAnb',  # Netzkurzschlussleistung am NAP Sk [kVA]
+              'zYkGradNB',  # Netzimpedanzwinkel am NAP Yk [°]
+              'zUckVnb',  # Vereinbarte Versorgungsspannung Uc [kV]
+              'zRnetzOhmNB',  # Vorgelagerter Netztransformator: Rnetz [Ohm]
+              'zXnetzOhmNB',  # Vorgelagerter Netztransformator: Xnetz [Ohm]
+              'sSPEnapNB',  # Sternpunktbehandlung im gleichen Netz
+              'zImpSPEnb']  # Impedanz der SPE [Ohm]
+
+
+def _to_float(value):
+    """ Konvertiert einen Wert der Moebase (String mit Dezimalkomma oder Zahl) zu float. """
+    if isinstance(value, str):
+        return float(value.replace(",", "."))
+    return float(value)
+
+
+def sweep_grid_data(dict_grid_data, sweep, faults_param=None):
+    """ sweep_grid_data: function
+        Berechnet das Ersatzschaltbild und optional Rf/Xf für alle Kombinationen
+        (kartesisches Produkt) der in sweep angegebenen Werte.
+
+    Parameters:
+    -----------
+    dict_grid_data: dictionary
+        Basis-Netzdaten gemäß Anhang E9 (siehe Faults_values.calc_grid_data).
+        Nicht variierte Attribute werden aus dieser Dictionary übernommen.
+    sweep: dictionary
+        shortname (siehe SWEEP_KEYS) als key, Liste/Array der Werte als value.
+        Beispiel: {'zSkkVAnb': np.linspace(1e5, 1e6, 100), 'zYkGradNB': range(60, 90)}
+    faults_param: list (optional)
+        Liste von Tupeln (test, duration, fault_type, uf, grid, qset, phases, uv),
+        z.B. das Ergebnis von get_faults_by_test. Wenn angegeben, werden Rf/Xf berechnet.
+
+    Returns:
+    --------
+    result: dictionary
+        "params": dictionary mit den Werten der variierten Attribute je Variante, shape (N,)
+        "usetp": Sollspannung der Spannungsquellen Uc/Un in p.u., shape (N,)
+        EQUIVALENT_CIRCUIT_KEYS, "ZN", "RN", "XN": numpy.ndarray in Ohm, shape (N,)
+        "Rf", "Xf": numpy.ndarray in Ohm, shape (N, Anzahl Fehlerereignisse), NaN für uf > 1
+    """
+    for key in sweep.keys():
+        if not key in SWEEP_KEYS:
+            raise KeyError("Attribut kann nicht variiert werden: {} (gültig: {})".format(key, SWEEP_KEYS))
+    # Unbekannte Sternpunkterdungen würden in calc_equivalent_circuit still wie RSPE berechnet
+    invalid = [value for value in sweep.get('sSPEnapNB', []) if value not in SPE_values]
+    if invalid:
+        raise ValueError("Ungültige Werte für sSPEnapNB: {} (gültig: {})".format(invalid, SPE_values))
+
+    grid_input = parse_grid_data(dict_grid_data)
+    # Ohne vorgelagerten Netztrafo (HS-Netz/UW-Direktanschluss) werden RT/XT ignoriert, alle Varianten wären gleich
+    swept_trafo = [key for key in ('zRnetzOhmNB', 'zXnetzOhmNB') if key in sweep]
+    if swept_trafo and not grid_input["flag_trafo"]:
+        raise ValueError("{} kann nicht variiert werden: kein vorgelagerter Netztransformator (HS-Netz oder "
+                         "UW-Direktanschluss)".format(swept_trafo))
+
+    # Basiswerte der variierbaren Attribute
+    base = {'zSkkVAnb': grid_input["Skvmin"],
+            'zYkGradNB': grid_input["Ykv"],
+            'zUckVnb': grid_input["Uc"],
+            'zRnetzOhmNB': grid_input["RT"] if grid_input["flag_trafo"] else np.nan,
+            'zXnetzOhmNB': grid_input["XT"] if grid_input["flag_trafo"] else np.nan,
+            'sSPEnapNB': grid_input["SPE"],
+            'zImpSPEnb': np.nan}
+    try:
+        base['zImpSPEnb'] = _to_float(dict_grid_data["zImpSPEnb"])
+    except (KeyError, ValueError):
+        pass
+
+    # Kartesisches Produkt der variierten Werte
+    keys = list(sweep.keys())
+    axes = [np.asarray(sweep[key], dtype=object if key == 'sSPEnapNB' else float) for key in keys]
+    mesh = np.meshgrid(*axes, indexing="ij") if axes else []
+    params = {key: values.ravel() for key, values in zip(keys, mesh)}
+    n_variants = params[keys[0]].size if keys else 1
+    values = {key: params.get(key, base[key]) for key in SWEEP_KEYS}
+
+    circuit = calc_equivalent_circuit(Un=grid_input["Un"],
+                                      Skvmin=values['zSkkVAnb'],
+                                      Ykv=values['zYkGradNB'],
+                                      RT=values['zRnetzOhmNB'],
+                                      XT=values['zXnetzOhmNB'],
+                                      SPE=values['sSPEnapNB'],
+                                      Zspe=values['zImpSPEnb'])
+
+    result = {"params": params}
+    result["usetp"] = np.broadcast_to(np.asarray(values['zUckVnb'], dtype=float)/grid_input["Un"], (n_variants,))
+    for key in ["ZN", "RN", "XN"] + EQUIVALENT_CIRCUIT_KEYS:
+        result[key] = np.broadcast_to(circuit[key], (n_variants,))
+
+    if faults_param is not None:
+        Psif = calc_fault_angle(get_grid_type(dict_grid_data), grid_input["flag_MS"], grid_input["flag_HS"])
+        _, _, fault_type, uf, grid, _, _, uv = [np.asarray(col) for col in zip(*faults_param)]
+        flag_gleich = (grid == "g")[np.newaxis, :]
+        Ra = np.where(flag_gleich, result["Ra_gleich"][:, np.newaxis], result["Ra_vorg"][:, np.newaxis])
+        Xa = np.where(flag_gleich, result["Xa_gleich"][:, np.newaxis], result["Xa_vorg"][:, np.newaxis])
+        result["Rf"], result["Xf"] = calc_fault_impedance(uf.astype(float), uv.astype(float), fault_type, Ra, Xa, Psif)
+    return result
+
+
+def variant_grid_data(dict_grid_data, result, index):
+    """ variant_grid_data: function
+        Erstellt für eine Variante der Parameterstudie ein dict_grid_att,
+        das z.B. an Faults_values.calc_grid_data übergeben werden kann.
+
+    Parameters:
+    -----------
+    dict_grid_data: dictionary
+        Basis-Netzdaten, die an sweep_grid_data übergeben wurden
+    result: dictionary
+        Rückgabewert von sweep_grid_data
+    index: int
+        Index der Variante
+
+    Returns:
+    --------
+    dict_grid_att: dictionary
+        Kopie von dict_grid_data mit den Werten der Variante (als String wie in der Moebase)
+    """
+    dict_grid_att = dict(dict_grid_data)
+    for key, values in result["params"].items():
+        dict_grid_att[key] = str(values[index])
+    return dict_grid_att
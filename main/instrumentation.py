@@ -0,0 +1,269 @@
+""" instrumentation.py
+
+Zeitmessung je Stufe und Versuch für einen Simulationslauf.
+
+Die Funktionen in pf_functions sind mit timed bzw. span instrumentiert (set_grid,
+create_faults_scenarios, set_res_vars, Lastfluss, ComInc, ComSim, execute_export, ...).
+Solange keine Instrumentation aktiv ist, kosten die Messpunkte nur eine Abfrage.
+Eine aktive Instrumentation zeichnet Wandzeit und Anzahl der Aufrufe auf, optional ein
+cProfile-Profil und tracemalloc-Speicherstatistiken, und schreibt einen Bericht als JSON.
+
+Beispiel:
+    instrumentation = Instrumentation("DynSim_VKM").start()
+    ...
+    instrumentation.stop()
+    instrumentation.write_report(r"C:\\Ausgabe_Skript\\Timing_DynSim.json")
+"""
+import cProfile
+import json
+import pstats
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from time import perf_counter
+
+# Befehle, deren Laufzeit PowerFactory zugerechnet wird (Rest eines Versuchs: Ablauf und Export im Skript)
+PF_COMMANDS = ("ComLdf", "ComInc", "ComSim", "ComRes")
+
+_state = threading.local()
+
+
+def get_active():
+    """ get_active: function
+        Gibt die im aktuellen Thread aktive Instrumentation zurück (oder None).
+    """
+    return getattr(_state, "active", None)
+
+
+@contextmanager
+def span(name, **tags):
+    """ span: context manager
+        Misst die Wandzeit des Blocks unter dem Namen name, wenn eine Instrumentation aktiv ist.
+        tags werden mit aufgezeichnet, z.B. span("ComSim", test=fault.test).
+    """
+    instrumentation = get_active()
+    if instrumentation is None:
+        yield
+        return
+    with instrumentation.span(name, **tags):
+        yield
+
+
+def timed(name=None):
+    """ timed: decorator
+        Misst jeden Aufruf der Funktion als span (Default-Name: Name der Funktion).
+    """
+    def decorator(function):
+        span_name = name or function.__name__
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            instrumentation = get_active()
+            if instrumentation is None:
+                return function(*args, **kwargs)
+            with instrumentation.span(span_name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class Instrumentation:
+    """ Instrumentation: class
+
+    Aufzeichnung der Messpunkte (spans) eines Laufs.
+
+    Attributes:
+    ----------
+    name: str
+        Name des Laufs im Bericht
+    flag_profile: bool
+        True: cProfile zwischen start und stop
+    flag_memory: bool
+        True: tracemalloc zwischen start und stop, Speicheränderung je span
+    records: list
+        Ein dictionary je span: name, path (übergeordnete spans), start, duration in s, tags
+
+    Methods:
+    -------
+    start, stop:
+        Aktiviert/deaktiviert die Instrumentation im aktuellen Thread
+    span:
+        Context manager für einen Messpunkt
+    add_records:
+        Übernimmt Messpunkte aus einem anderen Prozess (z.B. Worker von runner.run_parallel)
+    report, write_report:
+        Bericht als dictionary bzw. JSON-Datei
+    """
+
+    def __init__(self, name="DynSim", flag_profile=False, flag_memory=False, profile_top=30):
+        """
+        Parameters
+        ----------
+        name, flag_profile, flag_memory:
+            siehe Attributes
+        profile_top: int
+            Anzahl der Funktionen (nach kumulierter Zeit) bzw. Codezeilen (nach Speicher) im Bericht
+        """
+        self.name = name
+        self.flag_profile = flag_profile
+        self.flag_memory = flag_memory
+        self.profile_top = profile_top
+        self.records = []
+        self.started = None
+        self._t0 = None
+        self._total = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._profile = None
+        self._profile_stats = None
+        self._memory_stats = None
+
+    def start(self):
+        """ start: method
+            Aktiviert die Instrumentation im aktuellen Thread und startet Profiler/tracemalloc.
+        """
+        self.started = datetime.now().isoformat(timespec="seconds")
+        self._t0 = perf_counter()
+        if self.flag_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if self.flag_profile:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        self.activate()
+        return self
+
+    def stop(self):
+        """ stop: method
+            Deaktiviert die Instrumentation und wertet Profiler/tracemalloc aus.
+        """
+        self._total = perf_counter() - self._t0
+        if self._profile is not None:
+            self._profile.disable()
+            self._profile_stats = self._profile_summary(self._profile)
+        if self.flag_memory and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self._memory_stats = {"current_kb": current/1024, "peak_kb": peak/1024,
+                                  "top": [{"location": str(stat.traceback), "size_kb": stat.size/1024, "count": stat.count}
+                                          for stat in snapshot.statistics("lineno")[:self.profile_top]]}
+        self.deactivate()
+        return self
+
+    def activate(self):
+        """ activate: method
+            Setzt die Instrumentation im aktuellen Thread aktiv (z.B. in Threads eines Pipelines).
+        """
+        _state.active = self
+
+    def deactivate(self):
+        if get_active() is self:
+            _state.active = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    @contextmanager
+    def span(self, name, **tags):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        path = "/".join(stack)
+        stack.append(name)
+        memory = tracemalloc.get_traced_memory()[0] if self.flag_memory and tracemalloc.is_tracing() else None
+        tstart = perf_counter()
+        try:
+            yield
+        finally:
+            duration = perf_counter() - tstart
+            stack.pop()
+            record = {"name": name, "path": path, "start": tstart - self._t0 if self._t0 is not None else 0.0,
+                      "duration": duration, "tags": tags}
+            if memory is not None:
+                record["memory_kb"] = (tracemalloc.get_traced_memory()[0] - memory)/1024
+            with self._lock:
+                self.records.append(record)
+
+    def add_records(self, records, **tags):
+        """ add_records: method
+            Übernimmt Messpunkte (Liste von dictionaries wie records) und ergänzt die tags.
+            start bleibt auf den Start der Instrumentation bezogen, die die Messpunkte aufgezeichnet hat.
+        """
+        with self._lock:
+            for record in records:
+                record = dict(record)
+                record["tags"] = dict(record.get("tags", {}), **tags)
+                self.records.append(record)
+
+    def _profile_summary(self, profile):
+        stats = pstats.Stats(profile)
+        rows = []
+        for (fname, line, function), (cc, nc, tt, ct, callers) in stats.stats.items():
+            rows.append({"function": "{}:{}({})".format(fname, line, function), "ncalls": nc, "tottime": tt, "cumtime": ct})
+        rows.sort(key=lambda row: -row["cumtime"])
+        return rows[:self.profile_top]
+
+    def summary(self):
+        """ summary: method
+            Gibt je span-Name Anzahl, Summe, Minimum, Maximum und Mittelwert der Wandzeit in s zurück.
+        """
+        spans = {}
+        for record in self.records:
+            entry = spans.setdefault(record["name"], {"count": 0, "total": 0.0, "min": float("inf"), "max": 0.0})
+            entry["count"] += 1
+            entry["total"] += record["duration"]
+            entry["min"] = min(entry["min"], record["duration"])
+            entry["max"] = max(entry["max"], record["duration"])
+        for entry in spans.values():
+            entry["mean"] = entry["total"]/entry["count"]
+        return spans
+
+    def faults(self):
+        """ faults: method
+            Gibt je Versuch (tag test) die Laufzeit von simulate_fault, die Laufzeit der PowerFactory-Befehle
+            (PF_COMMANDS) und die Differenz (Ablauf und Export im Skript) in s zurück.
+        """
+        faults = {}
+        for record in self.records:
+            test = record["tags"].get("test")
+            if test is None:
+                continue
+            entry = faults.setdefault(test, {"total": 0.0, "pf": 0.0})
+            if record["name"] == "simulate_fault":
+                entry["total"] += record["duration"]
+            elif record["name"] in PF_COMMANDS:
+                entry["pf"] += record["duration"]
+                entry[record["name"]] = entry.get(record["name"], 0.0) + record["duration"]
+        for entry in faults.values():
+            entry["overhead"] = max(entry["total"] - entry["pf"], 0.0)
+        return faults
+
+    def report(self, flag_records=True):
+        """ report: method
+            Gibt den Bericht als dictionary zurück (name, started, total, spans, faults, records, profile, memory).
+        """
+        total = self._total if self._total is not None else (perf_counter() - self._t0 if self._t0 is not None else None)
+        report = {"name": self.name, "started": self.started, "total": total,
+                  "spans": self.summary(), "faults": self.faults()}
+        if flag_records:
+            report["records"] = self.records
+        if self._profile_stats is not None:
+            report["profile"] = self._profile_stats
+        if self._memory_stats is not None:
+            report["memory"] = self._memory_stats
+        return report
+
+    def write_report(self, fname, flag_records=True):
+        """ write_report: method
+            Schreibt den Bericht als JSON-Datei fname.
+        """
+        with open(fname, "w") as f:
+            json.dump(self.report(flag_records=flag_records), f, indent=2, default=str)
+
+    def __repr__(self):
+        return "Instrumentation(name='{}', spans={})".format(self.name, len(self.records))
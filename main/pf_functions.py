@@ -1,5 +1,20 @@
+import os
+from functools import partial
+from time import time
 
-def set_grid(app, Faults_values, logger):
+from main.pf_index import ObjectIndex
+from main.pf_proxy import WriteCache, unwrap
+from main.instrumentation import Instrumentation, get_active, timed, span
+from main.result_store import ingest_exports
+from main.results import split_dat, decimate_dat, export_windows
+from main.result_cache import run_settings, fault_key
+from main.runtime_history import sim_duration, stage_durations, Progress
+
+# Ausgabeordner der Ergebnisexporte (ComRes)
+EXPORT_DIR = "C:\\Ausgabe_Skript"
+
+@timed()
+def set_grid(app, grid_model, logger, obj_index=None):
     """ Die Function "set_grid" stellt die durch die Klasse "Fault_values"
         berechneten Netzdaten in das Ersatzschaltbild des Netzes gemäß FGW TR8 ein. 
     
@@ -13,57 +28,63 @@ def set_grid(app, Faults_values, logger):
     ----------
     app: 
         PowerFactory Application Object
-    Faults_values: Class
-        Eine Klasse, die die Netzdaten gemäß VDE-AR-N 4110/4120 berechnet. 
-        Netzdaten sind als Klassenvariablen gespeichert.
+    grid_model: GridModel
+        Netzmodell des Laufs mit den gemäß VDE-AR-N 4110/4120 berechneten Netzdaten.
+        (Die Klasse Faults_values mit Netzdaten als Klassenvariablen wird ebenfalls akzeptiert.)
     logger: 
         logging.logger object
+    obj_index: ObjectIndex (optional)
+        Laufbezogener Objektindex (siehe pf_index). Default: None -> neuer Index für diesen Aufruf
     """
+    if obj_index is None:
+        obj_index = ObjectIndex(app)
     # GetCalcRelevantObjects aus Parkaufbau
-    term = app.GetCalcRelevantObjects('ideales Netz.ElmTerm')[0]
-    vac_gleich = app.GetCalcRelevantObjects('*gleich*.ElmVac')[0]
-    vac_vorg = app.GetCalcRelevantObjects('*vorg*.ElmVac')[0]
-    sind_gleich = app.GetCalcRelevantObjects('*gleich*.ElmSind')[0]
-    sind_vorg = app.GetCalcRelevantObjects('*vorg*.ElmSind')[0]
+    term = obj_index.get('ideales Netz.ElmTerm')[0]
+    vac_gleich = obj_index.get('*gleich*.ElmVac')[0]
+    vac_vorg = obj_index.get('*vorg*.ElmVac')[0]
+    sind_gleich = obj_index.get('*gleich*.ElmSind')[0]
+    sind_vorg = obj_index.get('*vorg*.ElmSind')[0]
     
     # TODO: Check if all Elements are found
     
     # Spannungsquelle gleiches Netz:
-    vac_gleich.Unom = Faults_values.grid_Un
-    vac_gleich.usetp = round(Faults_values.grid_Uc/Faults_values.grid_Un, 3)
-    vac_gleich.R1 = Faults_values.grid_Ra_gleich
-    vac_gleich.X1 = Faults_values.grid_Xa_gleich
-    vac_gleich.R0 = Faults_values.grid_R0
-    vac_gleich.X0 = Faults_values.grid_X0
-    vac_gleich.R2 = Faults_values.grid_Ra_gleich
-    vac_gleich.X2 = Faults_values.grid_Xa_gleich
-    logger.info("set_grid: Uc: {} kV; Un: {} kV; usetp: {} p.u.".format(Faults_values.grid_Uc, Faults_values.grid_Un, round(Faults_values.grid_Uc/Faults_values.grid_Un, 3)))
+    vac_gleich.Unom = grid_model.grid_Un
+    vac_gleich.usetp = round(grid_model.grid_Uc/grid_model.grid_Un, 3)
+    vac_gleich.R1 = grid_model.grid_Ra_gleich
+    vac_gleich.X1 = grid_model.grid_Xa_gleich
+    vac_gleich.R0 = grid_model.grid_R0
+    vac_gleich.X0 = grid_model.grid_X0
+    vac_gleich.R2 = grid_model.grid_Ra_gleich
+    vac_gleich.X2 = grid_model.grid_Xa_gleich
+    logger.info("set_grid: Uc: {} kV; Un: {} kV; usetp: {} p.u.".format(grid_model.grid_Uc, grid_model.grid_Un, round(grid_model.grid_Uc/grid_model.grid_Un, 3)))
     logger.info("set_grid: Spannungsquelle gleiches Netz parametriert")
     
     # Serieninduktivität gleiches Netz:
-    sind_gleich.ucn = Faults_values.grid_Un
-    sind_gleich.rrea = Faults_values.grid_Rb_gleich
-    sind_gleich.xrea = Faults_values.grid_Xb_gleich
+    sind_gleich.ucn = grid_model.grid_Un
+    sind_gleich.rrea = grid_model.grid_Rb_gleich
+    sind_gleich.xrea = grid_model.grid_Xb_gleich
     logger.info("set_grid: Serieninduktivität gleiches Netz parametriert")
     
     # Spannungsquelle vorgelagertes Netz:
-    vac_vorg.Unom = Faults_values.grid_Un
-    vac_vorg.usetp = round(Faults_values.grid_Uc/Faults_values.grid_Un, 3)
-    vac_vorg.R1 = Faults_values.grid_Ra_vorg
-    vac_vorg.X1 = Faults_values.grid_Xa_vorg
-    vac_vorg.R0 = Faults_values.grid_R0
-    vac_vorg.X0 = Faults_values.grid_X0
-    vac_vorg.R2 = Faults_values.grid_Ra_vorg
-    vac_vorg.X2 = Faults_values.grid_Xa_vorg
+    vac_vorg.Unom = grid_model.grid_Un
+    vac_vorg.usetp = round(grid_model.grid_Uc/grid_model.grid_Un, 3)
+    vac_vorg.R1 = grid_model.grid_Ra_vorg
+    vac_vorg.X1 = grid_model.grid_Xa_vorg
+    vac_vorg.R0 = grid_model.grid_R0
+    vac_vorg.X0 = grid_model.grid_X0
+    vac_vorg.R2 = grid_model.grid_Ra_vorg
+    vac_vorg.X2 = grid_model.grid_Xa_vorg
     logger.info("set_grid: Spannungsquelle vorgelagertes Netz parametriert")
     
     # Serieninduktivität vorgelagertes Netz:
-    sind_vorg.ucn = Faults_values.grid_Un
-    sind_vorg.rrea = Faults_values.grid_Rb_vorg
-    sind_vorg.xrea = Faults_values.grid_Xb_vorg
+    sind_vorg.ucn = grid_model.grid_Un
+    sind_vorg.rrea = grid_model.grid_Rb_vorg
+    sind_vorg.xrea = grid_model.grid_Xb_vorg
     logger.info("set_grid: Serieninduktivität vorgelagertes Netz parametriert")
+    # Gepufferte Änderungen schreiben (nur mit WriteCache relevant)
+    obj_index.flush()
 
-def del_faults(app, logger):
+def del_faults(app, logger, obj_index=None):
     """ Die Function "del_faults" greift auf den Ordner Fehlerfälle zu und löscht
         alle vorhandenen Fehlerfälle, wenn der String "Versuch_" im Namen enthalten ist.  
     
@@ -73,9 +94,13 @@ def del_faults(app, logger):
         PowerFactory Application Object
     logger: 
         logging.logger object
+    obj_index: ObjectIndex (optional)
+        Laufbezogener Objektindex (siehe pf_index). Default: None -> neuer Index für diesen Aufruf
     """
+    if obj_index is None:
+        obj_index = ObjectIndex(app)
     # Auf Ordner "Fehlerfälle" zugreifen und vorhandene Fehlerfaelle entfernen:
-    folder_events = app.GetFromStudyCase('IntEvt')
+    folder_events = obj_index.from_study_case('IntEvt')
     shc_events = folder_events.GetContents('Versuch_*.*')
     # app.PrintPlain("SHC_Events vorher: {}".format(shc_events))
     if shc_events[0]==[]:
@@ -87,7 +112,7 @@ def del_faults(app, logger):
     # app.PrintPlain("SHC_Events nacher: {}".format(shc_events))
     logger.info("del_faults: Vorhandene SHC_Events gelöscht.")
 
-def del_scenarios(app, logger):
+def del_scenarios(app, logger, obj_index=None):
     """ Die Function "del_scenarios" greift auf den Ordner "Betriebsfälle" zu und löscht
         alle vorhandenen Betriebsfälle, wenn der String "Versuch_" im Namen enthalten ist.  
     
@@ -97,23 +122,80 @@ def del_scenarios(app, logger):
         PowerFactory Application Object
     logger: 
         logging.logger object
+    obj_index: ObjectIndex (optional)
+        Laufbezogener Objektindex (siehe pf_index). Default: None -> neuer Index für diesen Aufruf
     """
+    if obj_index is None:
+        obj_index = ObjectIndex(app)
     # Auf Ordner "Betriebsfälle" zugreifen 
-    folder_scenario = app.GetProjectFolder('scen')
+    folder_scenario = obj_index.project_folder('scen')
     # Auf vorhandene Betriebsfälle zugreifen
     scenarios = folder_scenario.GetContents("Versuch_*.IntScenario")[0]
     # Wenn Betriebsfälle mit "Versuch_*.IntScenario" vorhanden sind, werden diese gelöscht
-    app.PrintPlain(scenarios)
+    app.PrintPlain(unwrap(scenarios))
     if not scenarios==[]:
         for del_scen in scenarios:
             del_scen.Delete()
     scenarios = folder_scenario.GetContents()
     logger.info("del_scenarios: Vorhandene Betriebsfälle gelöscht!")
 
-def create_faults_scenarios(app, logger, Faults):
+@timed()
+def create_faults_scenarios(app, logger, grid_model, obj_index=None):
     """ 
     Die Funktion "create_faults_scenarios" geht die List der ausgewählten Fehlerfälle durch
-    und erstellt Betriebs- und Fehlerfälle.
+    und erstellt Betriebs- und Fehlerfälle. Versuche mit gleichem Arbeitspunkt (operating_point)
+    teilen sich einen Betriebsfall (siehe scenario_names).
+    
+    Parameters
+    ----------
+    app: 
+        PowerFactory Application Object
+    logger: 
+        logging.logger object
+    grid_model: GridModel
+        Netzmodell des Laufs. grid_model.list_of_faults enthält die Fehlerereignisse,
+        deren Instanzen alle Parameter für ein Kurzschlussereignis in PowerFactory enthalten.
+    obj_index: ObjectIndex (optional)
+        Laufbezogener Objektindex (siehe pf_index). Default: None -> neuer Index für diesen Aufruf
+    """
+    if obj_index is None:
+        obj_index = ObjectIndex(app)
+    # Objekte des Parkaufbaus, Ordner Betriebsfälle und Simulationsereignisse
+    park = _get_park_objects(obj_index)
+    folder_scenario = obj_index.project_folder('scen')
+    folder_events = obj_index.from_study_case('IntEvt')
+    
+    # Schleife über alle gewählten Versuche nach 4110 oder 4120
+    for fault in grid_model.list_of_faults: 
+        # Kurzschlussereignis oder Schalterereignis erstellen: Versuch_XX_on, Versuch_XX_off
+        for name, class_name, attributes in _fault_event_specs(fault, park):
+            _create_event(folder_events, name, class_name, attributes)
+            logger.info("create_faults_scenarios: {} erstellt: {}".format(class_name, name))
+    
+    # Schleife über alle Arbeitspunkte: ein Betriebsfall je Arbeitspunkt
+    for name, faults in _scenario_groups(grid_model.list_of_faults).items():
+        # Betriebsfall anlegen und aktivieren
+        scenario = folder_scenario.CreateObject('IntScenario', name)[0]
+        logger.info("create_faults_scenarios: {}, Betriebsfall erstellt für Versuche {}".format(name, ", ".join(fault.test for fault in faults)))
+        scenario.Activate()
+        # Betriebsfalldaten einstellen (Spannungsquellen, Anlagenregler)
+        _set_scenario_data(app, logger, grid_model, faults[0], park, obj_index)
+        
+        # Scenario speichern und deaktivieren
+        scenario.Save()
+        scenario.Deactivate()  
+        logger.info("create_faults_scenarios: Betriebsfall gespeichert und deaktiviert: {}".format(scenario.loc_name))
+
+@timed()
+def sync_faults_scenarios(app, logger, grid_model, obj_index=None):
+    """ 
+    Die Funktion "sync_faults_scenarios" gleicht die vorhandenen Betriebs- und Fehlerfälle ("Versuch_*")
+    mit der Liste der ausgewählten Fehlerfälle ab. Im Gegensatz zu del_faults/del_scenarios und 
+    create_faults_scenarios werden nur die Unterschiede geschrieben:
+        - fehlende Betriebs-/Fehlerfälle werden erstellt
+        - vorhandene werden nur bei geänderten Attributen geschrieben (Betriebsfall nur dann gespeichert)
+        - nicht mehr benötigte Betriebs-/Fehlerfälle werden gelöscht
+    Versuche mit gleichem Arbeitspunkt teilen sich einen Betriebsfall (siehe scenario_names).
     
     Parameters
     ----------
@@ -121,163 +203,183 @@ def create_faults_scenarios(app, logger, Faults):
         PowerFactory Application Object
     logger: 
         logging.logger object
-    Faults: Class
-        Eine Instanz enthält alle Parameter für ein Kurzschlussereignis in PowerFactory enthält.
+    grid_model: GridModel
+        Netzmodell des Laufs. grid_model.list_of_faults enthält die Fehlerereignisse.
+    obj_index: ObjectIndex (optional)
+        Laufbezogener Objektindex (siehe pf_index). Ohne WriteCache wird für den Abgleich
+        ein eigener Index mit WriteCache verwendet. Default: None
+    """
+    if obj_index is None or obj_index.write_cache is None:
+        obj_index = ObjectIndex(app, write_cache=WriteCache())
+    cache = obj_index.write_cache
+    # Unbekannte Werte vor dem Schreiben aus PowerFactory lesen und nur Änderungen schreiben
+    flag_read_before_write = cache.read_before_write
+    cache.read_before_write = True
+    try:
+        park = _get_park_objects(obj_index)
+        folder_scenario = obj_index.project_folder('scen')
+        folder_events = obj_index.from_study_case('IntEvt')
+        
+        # Fehlerfälle abgleichen
+        events = {event.loc_name: event for event in folder_events.GetContents('Versuch_*.*')[0]}
+        num_created, num_updated = 0, 0
+        for fault in grid_model.list_of_faults:
+            for name, class_name, attributes in _fault_event_specs(fault, park):
+                event = events.pop(name, None)
+                # Klasse geändert (Kurzschluss-/Schalterereignis): Ereignis ersetzen
+                if event is not None and not event.GetClassName() == class_name:
+                    event.Delete()
+                    event = None
+                if event is None:
+                    _create_event(folder_events, name, class_name, attributes)
+                    num_created += 1
+                    logger.info("sync_faults_scenarios: {} erstellt: {}".format(class_name, name))
+                    continue
+                num_writes = cache.num_writes
+                for attribute, value in attributes.items():
+                    setattr(event, attribute, value)
+                cache.flush()
+                if cache.num_writes > num_writes:
+                    num_updated += 1
+                    logger.info("sync_faults_scenarios: {} aktualisiert: {}".format(class_name, name))
+        for name, event in events.items():
+            event.Delete()
+            logger.info("sync_faults_scenarios: Fehlerfall gelöscht: {}".format(name))
+        logger.info("sync_faults_scenarios: Fehlerfälle: {} erstellt, {} aktualisiert, {} gelöscht".format(num_created, num_updated, len(events)))
+        
+        # Betriebsfälle abgleichen
+        scenarios = {scenario.loc_name: scenario for scenario in folder_scenario.GetContents("Versuch_*.IntScenario")[0]}
+        num_created, num_updated = 0, 0
+        for name, faults in _scenario_groups(grid_model.list_of_faults).items():
+            scenario = scenarios.pop(name, None)
+            flag_new = scenario is None
+            if flag_new:
+                scenario = folder_scenario.CreateObject('IntScenario', name)[0]
+                num_created += 1
+                logger.info("sync_faults_scenarios: {}, Betriebsfall erstellt für Versuche {}".format(name, ", ".join(fault.test for fault in faults)))
+            scenario.Activate()
+            num_writes = cache.num_writes
+            _set_scenario_data(app, logger, grid_model, faults[0], park, obj_index, caller="sync_faults_scenarios")
+            cache.flush()
+            # Betriebsfall nur speichern, wenn neu oder geändert
+            if flag_new or cache.num_writes > num_writes:
+                scenario.Save()
+                if not flag_new:
+                    num_updated += 1
+                logger.info("sync_faults_scenarios: Betriebsfall gespeichert: {}".format(name))
+            else:
+                logger.info("sync_faults_scenarios: Betriebsfall unverändert: {}".format(name))
+            scenario.Deactivate()
+        for name, scenario in scenarios.items():
+            scenario.Delete()
+            logger.info("sync_faults_scenarios: Betriebsfall gelöscht: {}".format(name))
+        logger.info("sync_faults_scenarios: Betriebsfälle: {} erstellt, {} aktualisiert, {} gelöscht".format(num_created, num_updated, len(scenarios)))
+    finally:
+        cache.read_before_write = flag_read_before_write
+
+def _get_park_objects(obj_index):
+    """ Gibt die Objekte des Parkaufbaus für die Betriebs- und Fehlerfälle als dictionary zurück
+        und stellt die Leistungsschalter für den Spannungssprung (OVRT) auf offen. 
     """
-    # Auf Projekt zugreifen
+    park = {}
     # Klemmleiste ideales Netz
-    term = app.GetCalcRelevantObjects('ideales Netz.ElmTerm')[0]
+    park["term"] = obj_index.get('ideales Netz.ElmTerm')[0]
     # Klemmleiste NVP
-    term_nvp = app.GetCalcRelevantObjects('NVP.ElmTerm')[0]
+    park["term_nvp"] = obj_index.get('NVP.ElmTerm')[0]
     # Spannungsquelle gleiches Netz
-    vac_gleich = app.GetCalcRelevantObjects('*gleich*.ElmVac')[0]
+    park["vac_gleich"] = obj_index.get('*gleich*.ElmVac')[0]
     # Spannungsquelle vorgelagertes Netz
-    vac_vorg = app.GetCalcRelevantObjects('*vorg*.ElmVac')[0]
+    park["vac_vorg"] = obj_index.get('*vorg*.ElmVac')[0]
     # Serieninduktivität gleiches Netz
-    sind_gleich = app.GetCalcRelevantObjects('*gleich*.ElmSind')[0]
+    park["sind_gleich"] = obj_index.get('*gleich*.ElmSind')[0]
     # Serieninduktivität vorgelagertes Netz
-    sind_vorg = app.GetCalcRelevantObjects('*vorg*.ElmSind')[0]
-    # Ordner Betriebsfälle
-    folder_scenario = app.GetProjectFolder('scen')
-    # Ordner Simulationsereignisse
-    folder_events = app.GetFromStudyCase('IntEvt')
+    park["sind_vorg"] = obj_index.get('*vorg*.ElmSind')[0]
     # Spannungsquelle U_Sprung 
-    vac_sprung = app.GetCalcRelevantObjects('*sprung*.Elmvac')[0]
+    park["vac_sprung"] = obj_index.get('*sprung*.Elmvac')[0]
     # Leistungsschalter ls_sprung_sym 
-    ls_sprung_sym = app.GetCalcRelevantObjects('*ls_sprung_sym*.ElmCoup')[0]
-    ls_sprung_sym.on_off = 0 # Offen
-    ls_sprung_sym.nphase = 3 # Anzahl Phasen: 3
+    park["ls_sprung_sym"] = obj_index.get('*ls_sprung_sym*.ElmCoup')[0]
+    park["ls_sprung_sym"].on_off = 0 # Offen
+    park["ls_sprung_sym"].nphase = 3 # Anzahl Phasen: 3
     # Leistungsschalter ls_sprung_unsym
-    ls_sprung_unsym = app.GetCalcRelevantObjects('*ls_sprung_unsym*.ElmCoup')[0]
-    ls_sprung_unsym.on_off = 0 # Offen
-    ls_sprung_unsym.nphase = 2 # Anzahl Phasen: 3
+    park["ls_sprung_unsym"] = obj_index.get('*ls_sprung_unsym*.ElmCoup')[0]
+    park["ls_sprung_unsym"].on_off = 0 # Offen
+    park["ls_sprung_unsym"].nphase = 2 # Anzahl Phasen: 2
+    return park
+
+def _fault_event_specs(fault, park):
+    """ Gibt die Simulationsereignisse eines Versuchs als Liste von Tupeln (Name, Klasse, Attribute) zurück.
+        Wenn Rf=None -> OVRT-Versuch -> Schalterereignis (EvtSwitch)
+        Wenn Rf!=None -> LVRT-Versuch -> Kurzschlussereignis (EvtShc)
+        Alle Ereignisse werden außer Betrieb (outserv=1) angelegt und erst in execute_simulation aktiviert.
+    """
+    name = "Versuch_{}".format(fault.test.zfill(2))
+    if not fault.Rf == None: 
+        # time: Absolut s, i_shc: Fehlertyp (4: Fehler klären), R_f/X_f: Fehlerimpedanz Ohm, p_target: Objekt
+        shc_on = {"time": 1, "i_shc": fault.fault_type, "R_f": fault.Rf, "X_f": fault.Xf, "p_target": park["term"], "outserv": 1}
+        shc_off = {"time": 1 + fault.duration, "i_shc": 4, "p_target": park["term"], "outserv": 1}
+        return [(name+"_on", 'EvtShc', shc_on), (name+"_off", 'EvtShc', shc_off)]
+    # Schalterereignis: i_switch: Aktion Schließen (1)/Öffnen (0), hrtime/mtime/time: Absolut h/min/s
+    # Wenn unsymmetrisch, Schalterobjekt ls_sprung_unsym setzen
+    switch_on = {"i_switch": 1,
+                 "p_target": park["ls_sprung_unsym"] if not fault.phases==3 else park["ls_sprung_sym"],
+                 "hrtime": 0, "mtime": 0, "time": 1, "outserv": 1}
+    switch_off = {"i_switch": 0,
+                  "p_target": park["ls_sprung_unsym"] if fault.phases==2 else park["ls_sprung_sym"],
+                  "hrtime": 0, "mtime": 0, "time": 1 + fault.duration, "outserv": 1}
+    return [(name+"_on", 'EvtSwitch', switch_on), (name+"_off", 'EvtSwitch', switch_off)]
+
+def _create_event(folder_events, name, class_name, attributes):
+    """ Erstellt ein Simulationsereignis im Ordner folder_events und setzt die Attribute. """
+    event = folder_events.CreateObject(class_name, name)[0]
+    event.loc_name = name
+    for attribute, value in attributes.items():
+        setattr(event, attribute, value)
+    return event
+
+def _set_scenario_data(app, logger, grid_model, fault, park, obj_index, caller="create_faults_scenarios"):
+    """ Stellt die Betriebsfalldaten eines Versuchs im aktiven Betriebsfall ein:
+        Spannungsquelle U_Sprung (OVRT), Auswahl gleiches/vorgelagertes Netz, 
+        Vorfehlerspannung und Anlagenregler. caller: Name der aufrufenden Funktion für das Log.
+    """
+    if fault.Rf == None:
+        vac_sprung = park["vac_sprung"]
+        # Spannungsquelle U_Sprung: Nennspannung Leiter-Leiter /kV
+        vac_sprung.Unom = grid_model.grid_Un
+        # Spannungsquelle U_Sprung: Mitsystem Spannung, Betrag /p.u.
+        vac_sprung.usetp = round(fault.uf*(grid_model.grid_Uc/grid_model.grid_Un), 4)
+        logger.info("{}: Spannungsquelle Sprung eingestellt: Un={} kV, usetp={} p.u.".format(caller, vac_sprung.Unom, round(vac_sprung.usetp, 4)))
     
-    # Schleife über alle gewählten Versuche nach 4110 oder 4120
-    for fault in Faults.list_of_faults: 
-        # Betriebsfall anlegen und aktivieren
-        scenario = folder_scenario.CreateObject('IntScenario', 'Versuch_',fault.test.zfill(2))[0]
-        logger.info("create_faults_scenarios: {}, Betriebsfall erstellt:".format(scenario.loc_name))
-        scenario.Activate()
-        # Kurzschlussereignis oder Schalterereignis erstellen:
-        # Wenn Rf=None -> OVRT-Versuch -> Schalterereignis
-        # Wenn Rf!=None -> LVRT-Versuch -> Kurzschlussereignis
-        if not fault.Rf == None: 
-            # Kurzschlussereignisobjekt erstellen: Versuch_XX_on
-            shc_event_on = folder_events.CreateObject('EvtShc', 'shc_event')[0]
-            # KS-Ereignis: Name
-            shc_event_on.loc_name = "Versuch_{}_on".format(fault.test.zfill(2))
-            # KS-Ereignis: Absolut s
-            shc_event_on.time = 1
-            # KS-Ereignis: Fehlertyp         
-            shc_event_on.i_shc = fault.fault_type
-            # KS-Ereignis: Fehlerwiderstand Ohm
-            shc_event_on.R_f = fault.Rf  
-            # KS-Ereignis: Fehlerreaktanz Ohm            
-            shc_event_on.X_f = fault.Xf
-            # KS-Ereignis: Objekt    
-            shc_event_on.p_target = term	
-            # KS-Ereignis: außer Betrieb setzen
-            shc_event_on.outserv = 1
-            logger.info("create_faults_scenarios: Kurzschlussereignis erstellt: {}".format(shc_event_on.loc_name))
-            
-            # Kurzschlussereignisobjekt erstellen: Versuch_XX_off
-            shc_event_off = folder_events.CreateObject('EvtShc', 'shc_event')[0]
-            # KS-Ereignis: Name
-            shc_event_off.loc_name = "Versuch_{}_off".format(fault.test.zfill(2))
-            # KS-Ereignis: Absolut s            
-            shc_event_off.time = 1 + fault.duration
-            # KS-Ereignis: Fehlertyp 
-            shc_event_off.i_shc = 4
-            # KS-Ereignis: Objekt  
-            shc_event_off.p_target = term
-            # KS-Ereignis: außer Betrieb setzen
-            shc_event_off.outserv = 1
-            logger.info("create_faults_scenarios: Kurzschlussereignis erstellt: {}".format(shc_event_off.loc_name))
-        else: #  Schalterereignis (Switchevent)
-            # Switch-Event erstellen: Versuch_XX_on
-            switch_event_on = folder_events.CreateObject('EvtSwitch', 'switch_event')[0]
-            # Switch_Event: Name
-            switch_event_on.loc_name = "Versuch_{}_on".format(fault.test.zfill(2))
-            # Switch_Event: Aktion Schließen (1)
-            switch_event_on.i_switch = 1
-            # Switch_Event: LS-Schalter/Netzelement
-            # Wenn unsymmetrisch, Schalterobjekt ls_sprung_unsym setzen
-            if not fault.phases==3:
-                switch_event_on.p_target = ls_sprung_unsym
-            else: 
-                switch_event_on.p_target = ls_sprung_sym
-            # Switch_Event: Absolut h
-            switch_event_on.hrtime = 0
-            # Switch_Event: Absolut min
-            switch_event_on.mtime = 0
-            # Switch_Event: Absolut s
-            switch_event_on.time = 1
-            # Switch_Event: außer Betrieb setzen
-            switch_event_on.outserv = 1
-            logger.info("create_faults_scenarios: Schaltersereignis erstellt: {}".format(switch_event_on.loc_name))
-            # Spannungsquelle U_Sprung: Nennspannung Leiter-Leiter /kV
-            vac_sprung.Unom = fault.grid_Un
-            # Spannungsquelle U_Sprung: Mitsystem Spannung, Betrag /p.u.
-            vac_sprung.usetp = round(fault.uf*(fault.grid_Uc/fault.grid_Un), 4)
-            logger.info("create_faults_scenarios: Spannungsquelle Sprung eingestellt: Un={} kV, usetp={} p.u.".format(vac_sprung.Unom, round(vac_sprung.usetp, 4)))
-            
-            # Switch-Event erstellen: Versuch_XX_off
-            switch_event_off = folder_events.CreateObject('EvtSwitch', 'switch_event')[0]
-            # Switch_Event: Name
-            switch_event_off.loc_name = "Versuch_{}_off".format(fault.test.zfill(2))
-            # Switch_Event: Aktion öffnen (0)
-            switch_event_off.i_switch = 0            
-            # Switch_Event: LS-Schalter/Netzelement
-            # Wenn unsymmetrisch, Schalterobjekt ls_sprung_unsym setzen
-            if fault.phases==2:
-                switch_event_off.p_target = ls_sprung_unsym
-            else: 
-                switch_event_off.p_target = ls_sprung_sym
-            # Switch_Event: Absolut h    
-            switch_event_off.hrtime = 0
-            # Switch_Event: Absolut min
-            switch_event_off.mtime = 0
-            # Switch_Event: Absolut s
-            switch_event_off.time = 1 + fault.duration
-            # Switch_Event: außer Betrieb setzen
-            switch_event_off.outserv = 1
-            
-        # Spannungsquelle und Serieninduktivität auswählen:
-        if fault.grid == "g":
-            # Gleiches Netz wählen
-            vac_gleich.outserv = 0
-            vac_vorg.outserv = 1 
-            sind_gleich.outserv = 0
-            sind_vorg.outserv = 1
-            vac_on = vac_gleich
-            logger.info("create_faults_scenarios: Vorgelagerten Netzes deaktiviert, gleiches Netz aktiviert")
-        else:
-            # Vorgelagertes Netz wählen
-            vac_gleich.outserv = 1
-            vac_vorg.outserv = 0 
-            sind_gleich.outserv = 1
-            sind_vorg.outserv = 0
-            vac_on = vac_vorg
-            logger.info("create_faults_scenarios: Gleiches Netzes deaktiviert, vorgelagertes Netzes aktiviert")
-        
-        
-        # Vorfehlerspannung für bestimmte Versuche erhöht.
-        vac_on.contbar = term_nvp # geregelter Knoten NVP
-        vac_on.usetp = vac_on.usetp*fault.uv
-        logger.info("create_faults_scenarios: Test {}: Vorfehlerspannung auf {} p.u. gesetzt. Eingestellter Wert für usetp: {} p.u.".format(fault.test,fault.uv, round(vac_on.usetp,3)))
-        
-        # Anlagenregler einstellen
-        # Funktionsaufruf: set_load_flow_controller(app, logger, fault, flag_debug=False)
-        # Berechnet die Sollblindleistung für den Anlagenregler für den aktuellen Versuch
-        # anhand der Einstellung der EZE im Reiter Lastfluss für Wirkleistung und Blindleistung.  
-        set_load_flow_controller(app, logger, fault, flag_debug=False)
-        
-        # Scenario speichern und deaktivieren
-        scenario.Save()
-        scenario.Deactivate()  
-        logger.info("create_faults_scenarios: Betriebsfall gespeichert und deaktiviert: {}".format(scenario.loc_name))
+    # Spannungsquelle und Serieninduktivität auswählen:
+    if fault.grid == "g":
+        # Gleiches Netz wählen
+        park["vac_gleich"].outserv = 0
+        park["vac_vorg"].outserv = 1 
+        park["sind_gleich"].outserv = 0
+        park["sind_vorg"].outserv = 1
+        vac_on = park["vac_gleich"]
+        logger.info("{}: Vorgelagerten Netzes deaktiviert, gleiches Netz aktiviert".format(caller))
+    else:
+        # Vorgelagertes Netz wählen
+        park["vac_gleich"].outserv = 1
+        park["vac_vorg"].outserv = 0 
+        park["sind_gleich"].outserv = 1
+        park["sind_vorg"].outserv = 0
+        vac_on = park["vac_vorg"]
+        logger.info("{}: Gleiches Netzes deaktiviert, vorgelagertes Netzes aktiviert".format(caller))
+    
+    # Vorfehlerspannung für bestimmte Versuche erhöht.
+    # Bezogen auf die in set_grid eingestellte Sollspannung Uc/Un (unabhängig vom aktuellen Wert im Betriebsfall)
+    vac_on.contbar = park["term_nvp"] # geregelter Knoten NVP
+    vac_on.usetp = round(grid_model.grid_Uc/grid_model.grid_Un, 3)*fault.uv
+    logger.info("{}: Test {}: Vorfehlerspannung auf {} p.u. gesetzt. Eingestellter Wert für usetp: {} p.u.".format(caller, fault.test, fault.uv, round(vac_on.usetp,3)))
+    
+    # Anlagenregler einstellen
+    # Funktionsaufruf: set_load_flow_controller(app, logger, fault, flag_debug=False, obj_index)
+    # Berechnet die Sollblindleistung für den Anlagenregler für den aktuellen Versuch
+    # anhand der Einstellung der EZE im Reiter Lastfluss für Wirkleistung und Blindleistung.  
+    set_load_flow_controller(app, logger, fault, flag_debug=False, obj_index=obj_index)
 
-def del_res_vars(app, logger, flag_del=True):
+def del_res_vars(app, logger, flag_del=True, obj_index=None):
     """ Die Function "del_res_vars" greift auf die Variablenauswahl zu und löscht
         alle vorhandenen Variablenauswahlen, wenn der der Name NAP, EZE, MS, NS enthält.  
     
@@ -289,9 +391,13 @@ def del_res_vars(app, logger, flag_del=True):
         logging.logger object
     flag_del: Bool
         wenn flag aktiv, werden alle Variablen mit NAP, EZE, MS oder NS im Namen gelöscht. 
+    obj_index: ObjectIndex (optional)
+        Laufbezogener Objektindex (siehe pf_index). Default: None -> neuer Index für diesen Aufruf
     """
+    if obj_index is None:
+        obj_index = ObjectIndex(app)
     if flag_del:
-        allcalcs = app.GetFromStudyCase('*.ElmRes') #greife auf alle Berechnungsarten zu 
+        allcalcs = obj_index.from_study_case('*.ElmRes') #greife auf alle Berechnungsarten zu 
         int_mon = allcalcs.GetContents()
         for del_int_mon in int_mon: 
             if "NAP" or "EZE" or "MS" or "NS" in del_int_mon.loc_name:
@@ -323,7 +429,8 @@ def clear_vis(app, logger, flag_clear=True):
         logger.info("clear_vis: VIplots geleert!")
         
 
-def set_res_vars(app, logger, res_vars, flag_vis = False):
+@timed()
+def set_res_vars(app, logger, res_vars, flag_vis = False, obj_index=None):
     """ Die Function "set_res_vars" greift auf die Variablenauswahl zu und löscht
         alle vorhandenen Variablenauswahlen, wenn der der Name NAP, EZE, MS, NS enthält. 
     
@@ -345,77 +452,221 @@ def set_res_vars(app, logger, res_vars, flag_vis = False):
             Ausgabe: ['m:u1:bus1', 'm:I1:bus1', 'm:I1P:bus1', 'm:I1Q:bus1']
     flag_vis: Bool
         wenn flag aktiv, werden VIPages und VIPlots erstellt. 
+    obj_index: ObjectIndex (optional)
+        Laufbezogener Objektindex (siehe pf_index). Default: None -> neuer Index für diesen Aufruf
     """
-    allcalcs = app.GetFromStudyCase('*.ElmRes')
+    if obj_index is None:
+        obj_index = ObjectIndex(app)
+    allcalcs = obj_index.from_study_case('*.ElmRes')
     graphics_board = app.GetGraphicsBoard()
+    for key, name, object, vars in _res_var_specs(app, logger, res_vars, obj_index):
+        # Erstelle ein Set aus einzigartigen Variablen für jeden Messpunkt
+        set_vars = _unique_vars(vars)
+        logger.debug("set_res_vars: Variablenauswahl für {} ({}, {}): {}".format(object.loc_name, object.GetClassName(), key, vars))
+        
+        # Definiere Ergebnissvariablen
+        new_IntMon = allcalcs.CreateObject('IntMon', name)[0]
+        new_IntMon.loc_name = name
+        new_IntMon.obj_id = object
+        # Jede Variable des Sets zur Auswahl hinzufügen
+        for var in set_vars:
+            new_IntMon.AddVar(var)
+        logger.info("set_res_vars: Simulationsergebnisse festgelegt: {} ({}, {})".format(object.loc_name, object.GetClassName(), key))  
+        
+        # Erzeuge VIs, wenn flag_vis gesetzt
+        if flag_vis: 
+            _create_vi_page(logger, graphics_board, allcalcs, name, object, vars)
+
+@timed()
+def sync_res_vars(app, logger, res_vars, flag_vis = False, obj_index=None):
+    """ Die Function "sync_res_vars" gleicht die vorhandenen Variablenauswahlen (IntMon) mit der
+        Variablenauswahl aus res_vars ab. Im Gegensatz zu clear_vis/del_res_vars und set_res_vars
+        werden nur die Unterschiede geschrieben:
+            - fehlende Variablenauswahlen werden erstellt
+            - Variablenauswahlen mit anderem Objekt oder anderen Variablen werden aktualisiert
+            - Variablenauswahlen mit NAP, EZE, MS, NS (keys von res_vars) im Namen, die nicht mehr
+              benötigt werden, werden gelöscht
+        VIPages werden nur für neue oder geänderte Variablenauswahlen neu aufgebaut.
+    
+    Parameters
+    ----------
+    app: 
+        PowerFactory Application Object
+    logger: 
+        logging.logger object
+    res_vars: dict
+        Nested Dictionary mit Variablenauswahl für verschiedene Elemente (siehe set_res_vars)
+    flag_vis: Bool
+        wenn flag aktiv, werden VIPages und VIPlots für neue/geänderte Variablenauswahlen erstellt. 
+    obj_index: ObjectIndex (optional)
+        Laufbezogener Objektindex (siehe pf_index). Default: None -> neuer Index für diesen Aufruf
+    """
+    if obj_index is None:
+        obj_index = ObjectIndex(app)
+    allcalcs = obj_index.from_study_case('*.ElmRes')
+    graphics_board = app.GetGraphicsBoard()
+    monitors = {monitor.loc_name: monitor for monitor in allcalcs.GetContents('*.IntMon')[0]}
+    num_created, num_updated = 0, 0
+    for key, name, object, vars in _res_var_specs(app, logger, res_vars, obj_index):
+        set_vars = _unique_vars(vars)
+        monitor = monitors.pop(name, None)
+        if monitor is None:
+            monitor = allcalcs.CreateObject('IntMon', name)[0]
+            monitor.loc_name = name
+            monitor.obj_id = object
+            for var in set_vars:
+                monitor.AddVar(var)
+            num_created += 1
+            logger.info("sync_res_vars: Simulationsergebnisse festgelegt: {} ({}, {})".format(object.loc_name, object.GetClassName(), key))
+        elif not unwrap(monitor.obj_id) == unwrap(object) or not set(monitor.vars) == set_vars:
+            monitor.obj_id = object
+            monitor.ClearVars()
+            for var in set_vars:
+                monitor.AddVar(var)
+            num_updated += 1
+            logger.info("sync_res_vars: Simulationsergebnisse aktualisiert: {} ({}, {})".format(object.loc_name, object.GetClassName(), key))
+        else:
+            logger.debug("sync_res_vars: Variablenauswahl unverändert: {}".format(name))
+            continue
+        # VIs nur für neue/geänderte Variablenauswahlen neu aufbauen
+        if flag_vis:
+            _create_vi_page(logger, graphics_board, allcalcs, name, object, vars, flag_clear=True)
+    # Nicht mehr benötigte Variablenauswahlen löschen
+    num_deleted = 0
+    for name, monitor in monitors.items():
+        if any(key in name for key in res_vars.keys()):
+            monitor.Delete()
+            num_deleted += 1
+            logger.debug("sync_res_vars: Variablenauswahl gelöscht: {}".format(name))
+    obj_index.flush()
+    logger.info("sync_res_vars: Variablenauswahlen: {} erstellt, {} aktualisiert, {} gelöscht".format(num_created, num_updated, num_deleted))
+
+def _res_var_specs(app, logger, res_vars, obj_index):
+    """ Ermittelt die Messstellen des Parkaufbaus (xNAP, xEZE, xNS, xMS) und deren Variablenauswahl aus res_vars.
+        Gibt eine Liste von Tupeln (key, Name der Variablenauswahl, Objekt, Variablen je VIplot) zurück.
+    """
+    specs = []
     # Auswahlmöglichkeiten: NAP, MS, NS, EZE
     for key in res_vars.keys():
         # Durchsuche Parkaufbau nach Bezeichnung xNAP, xEZE, xNS, xMS
         search_str = "x"+key 
-        objects = app.GetCalcRelevantObjects("*{}*.*".format(search_str))
+        objects = obj_index.get("*{}*.*".format(search_str))
         for counter, object in enumerate(objects):
-            app.PrintPlain(object)
+            app.PrintPlain(unwrap(object))
+            vars = None
             # Variablenauswahl an der Leitung
             if object.GetClassName() == "ElmLne":
                 # Auswahl bus1 oder bus2
                 if "bus2" in object.loc_name and "bus2" in res_vars[key]["line"]:
                     vars = res_vars[key]["line"]["bus2"]
                     name = "{}{} Line bus2".format(key, counter)
-                    # logger.debug("Variablenauswahl für {} (Line bus2): {}".format(object.loc_name, vars))                
                 elif "bus1" in res_vars[key]["line"]: # Default für xNAP
                     vars = res_vars[key]["line"]["bus1"]
                     name = "{}{} Line bus1".format(key, counter)
-                    # logger.debug("Variablenauswahl für {} (Line bus1): {}".format(object.loc_name, vars))
                 else: # Default für xEZE
                     vars = res_vars[key]["line"]["bus2"]
                     name = "{}{} Line bus2".format(key, counter)
-                    # logger.debug("Variablenauswahl für {} (Line bus2): {}".format(object.loc_name, vars))
             # Variablenauswahl am Trafo       
             elif object.GetClassName() == "ElmTr2":
                 if key == "NS": #  Niederspannungsseitig
                     vars = res_vars[key]["trafo"]["buslv"]
                     name = "{}{} Trafo buslv".format(key, counter)
-                    # logger.debug("Variablenauswahl für {} (Trafo buslv): {}".format(object.loc_name, vars))
                 elif key == "MS": #  Mittelspannungsseitig
                     vars = res_vars[key]["trafo"]["bushv"]
                     name = "{}{} Trafo bushv".format(key, counter)
-                    # logger.debug("Variablenauswahl für {} (Trafo bushv): {}".format(object.loc_name, vars))
             # Variablenauswahl am Synchrongenerator
             elif object.GetClassName() == "ElmSym":
-                app.PrintPlain("ElmSym")
                 vars = res_vars[key]["ElmSym"]
-                app.PrintPlain(vars)
                 name = "{}{}".format(key, counter)
-                app.PrintPlain(name)
-                
-            # Erstelle ein Set aus einzigartigen Variablen für jeden Messpunkt
-            set_vars = set()
-            for i in vars.keys():
-                set_add = set(vars[i])
-                set_vars.update(set_add)     
-            logger.debug("set_res_vars: Variablenauswahl für {} ({}, {}): {}".format(object.loc_name, object.GetClassName(), key, vars))
-            
-            # Definiere Ergebnissvariablen
-            new_IntMon = allcalcs.CreateObject('IntMon', name)[0]
-            new_IntMon.loc_name = name
-            new_IntMon.obj_id = object
-            # Jede Variable des Sets zur Auswahl hinzufügen
-            for var in set_vars:
-                new_IntMon.AddVar(var)
-            logger.info("set_res_vars: Simulationsergebnisse festgelegt: {} ({}, {})".format(object.loc_name, object.GetClassName(), key))  
-            
-            # Erzeuge VIs, wenn flag_vis gesetzt
-            if flag_vis: 
-                vi_page = graphics_board.GetPage(name, 1)[0]
-                for vi_name in vars.keys():
-                    plot = vi_page.GetVI(vi_name, 'VisPlot', 1)[0]
-                    # Variablen hinzufügen
-                    for var in vars[vi_name]:
-                        plot.AddResVars(allcalcs, object, var)            
-                    logger.debug("set_res_vars: Plot {} auf Seite {} erstellt und Variablen hinzugefügt.".format(plot.loc_name, vi_page.loc_name))
-                logger.info("set_res_vars: VIpage {} angelegt!".format(vi_page.loc_name))
-
-def create_load_flow_controller(app, logger):
+            if vars is None:
+                logger.warning("set_res_vars: Keine Variablenauswahl für {} ({}, {})".format(object.loc_name, object.GetClassName(), key))
+                continue
+            specs.append((key, name, object, vars))
+    return specs
+
+def _nominal_voltage(object, key):
+    """ Gibt die Nennspannung in kV am Messpunkt einer Messstelle zurück (Leitung: uline, Trafo: Ober-/Unterspannung,
+        Synchrongenerator: ugn des Typs).
+    """
+    typ = object.typ_id
+    if object.GetClassName() == "ElmLne":
+        return typ.uline
+    elif object.GetClassName() == "ElmTr2":
+        return typ.utrn_l if key == "NS" else typ.utrn_h
+    return typ.ugn
+
+def rated_currents(app, logger, res_vars, obj_index=None):
+    """ Die Function "rated_currents" berechnet den Bemessungsstrom in kA je Messstelle (Bezugsgröße der
+        Ströme m:I1Q/m:I1P für die FRT-Auswertung, siehe frt_eval.extract_series):
+            I_r = S_r/(sqrt(3)*U_n)
+        mit S_r als Summe sgn*ngnum der Synchrongeneratoren (sgn des Typs) und statischen Generatoren.
+        An EZE-Messstellen wird S_r gleichmäßig auf die EZE-Messstellen aufgeteilt.
+
+    Parameters
+    ----------
+    app: object
+        PowerFactory Application Objekt
+    logger: object
+        Logging Objekt
+    res_vars: dict
+        Variablenauswahl je Messstelle (siehe set_res_vars)
+    obj_index: ObjectIndex (optional)
+
+    Returns
+    -------
+    i_base: dict
+        Bemessungsstrom in kA je Messstelle, Namen wie die Exportdateien (z.B. {"EZE": ..., "EZE1": ..., "NAP": ...})
+        ValueError, wenn Bemessungsleistung oder Nennspannung nicht ermittelt werden können
+    """
+    if obj_index is None:
+        obj_index = ObjectIndex(app)
+    s_rated = 0.0
+    for eze in obj_index.get('*.ElmSym') + obj_index.get('*.ElmGenstat'):
+        s_rated += (eze.typ_id.sgn if eze.GetClassName() == "ElmSym" else eze.sgn)*eze.ngnum
+    if not s_rated > 0:
+        raise ValueError("rated_currents: Keine Bemessungsleistung der EZE gefunden (sgn)")
+    specs = _res_var_specs(app, logger, res_vars, obj_index)
+    num_eze = sum(1 for key, name, object, vars in specs if key == "EZE")
+    i_base = {}
+    for key, name, object, vars in specs:
+        point = name.split(" ")[0]
+        # Exportdateien: erste Messstelle ohne Nummer (EZE0 -> EZE, siehe execute_export)
+        point = key if point == "{}0".format(key) else point
+        try:
+            u_n = _nominal_voltage(object, key)
+        except AttributeError:
+            u_n = None
+        if not u_n:
+            raise ValueError("rated_currents: Keine Nennspannung für Messstelle {} ({})".format(point, object.loc_name))
+        s = s_rated/num_eze if key == "EZE" else s_rated
+        i_base[point] = s/(3**0.5*u_n)
+        logger.info("rated_currents: {}: S_r={:.3f} MVA, U_n={} kV, I_r={:.4f} kA".format(point, s, u_n, i_base[point]))
+    return i_base
+
+def _unique_vars(vars):
+    """ Gibt die Menge der Variablen aller VIplots einer Messstelle zurück. """
+    set_vars = set()
+    for i in vars.keys():
+        set_vars.update(vars[i])
+    return set_vars
+
+def _create_vi_page(logger, graphics_board, allcalcs, name, object, vars, flag_clear=False):
+    """ Erstellt (oder übernimmt) die VIpage name mit einem VIplot je Eintrag in vars und fügt die Variablen hinzu.
+        flag_clear: vorhandene Kurven der VIplots vorher entfernen
+    """
+    vi_page = graphics_board.GetPage(name, 1)[0]
+    for vi_name in vars.keys():
+        plot = vi_page.GetVI(vi_name, 'VisPlot', 1)[0]
+        if flag_clear:
+            plot.Clear()
+        # Variablen hinzufügen
+        for var in vars[vi_name]:
+            plot.AddResVars(unwrap(allcalcs), unwrap(object), var)            
+        logger.debug("set_res_vars: Plot {} auf Seite {} erstellt und Variablen hinzugefügt.".format(plot.loc_name, vi_page.loc_name))
+    logger.info("set_res_vars: VIpage {} angelegt!".format(vi_page.loc_name))
+
+@timed()
+def create_load_flow_controller(app, logger, obj_index=None):
     """ 
     Die Function "create_load_flow_controller" erstellt einen Anlagenregler und nimmt die Voreinstellungen vor:
         - Geregelt an Feld zwischen Leitung NAP und Klemmleiste NVP
@@ -430,19 +681,24 @@ def create_load_flow_controller(app, logger):
         PowerFactory Application Object
     logger: 
         logging.logger object 
+    obj_index: ObjectIndex (optional)
+        Laufbezogener Objektindex (siehe pf_index). Default: None -> neuer Index für diesen Aufruf
     """    
+    if obj_index is None:
+        obj_index = ObjectIndex(app)
     # Klemmleiste NVP und dessen Anbindungen auswählen
-    term_nvp = app.GetCalcRelevantObjects('NVP.ElmTerm')[0]
+    term_nvp = obj_index.get('NVP.ElmTerm')[0]
     cubs_nvp = term_nvp.GetConnectedCubicles()
     # Synchrongeneratoren/statische Generatoren
-    eze_synchron = app.GetCalcRelevantObjects('*.ElmSym')
-    eze_stat = app.GetCalcRelevantObjects('*.ElmGenstat')
+    eze_synchron = obj_index.get('*.ElmSym')
+    eze_stat = obj_index.get('*.ElmGenstat')
     # Übernehme bestehende Anlagenregler
-    ldf_controller = app.GetCalcRelevantObjects('*.ElmStactrl')
+    ldf_controller = obj_index.get('*.ElmStactrl')
     # Bestehende Anlagenregler werden ersetzt
     for controller in ldf_controller:
         controller.Delete()
         logger.info('create_load_flow_controller: Anlagenregler: Bestehender Anlagenregeler gelöscht')
+    obj_index.invalidate('ElmStactrl')
     # Suche Feld zwischen Klemmleiste NVP und Leitung xNAP
     for cub in cubs_nvp:
         branch = cub.GetBranch()  # übergebe Verbindungszweig an Variable 'Leitung'
@@ -450,7 +706,7 @@ def create_load_flow_controller(app, logger):
             cub_nvp = cub  # übergebe Verbindung Klemmleiste NVP - Leitung NAP an Var 'Cub_NVP'
             logger.info('create_load_flow_controller: Anlagenregler: Verbindungsfeld = {}'.format(cub.loc_name))  
     # Übernehme Ordner 'Netzdaten' und dessen Inhalte
-    netdat = app.GetProjectFolder('netdat')
+    netdat = obj_index.project_folder('netdat')
     netdat_contents = netdat.GetContents('*.ElmNet')[0][0]
     # Erstelle neuen Anlagenregler
     ldf_controller = netdat_contents.CreateObject('ElmStactrl', 'Anlagenregelung')[0]
@@ -458,6 +714,7 @@ def create_load_flow_controller(app, logger):
     ldf_controller.i_ctrl = 1  # Regelmodus: Blindleistungsregelung
     ldf_controller.p_cub = cub_nvp #Q geregelt am Feld zwischen Klemmleiste NVP und Leitung xNAP
     ldf_controller.qsetp = 0 # Q=0 kvar
+    obj_index.invalidate('ElmStactrl')
     
     for eze in eze_synchron:
         if any(x in eze.loc_name.lower() for x in ["bdew","neu"]):
@@ -468,9 +725,11 @@ def create_load_flow_controller(app, logger):
         if any(x in eze.loc_name.lower() for x in ["bdew","neu"]):
             eze.c_pstac = ldf_controller
             logger.debug("create_load_flow_controller: EZE '{}' zu Anlagenregler hinzugefügt!".format(eze.loc_name))
+    # Gepufferte Änderungen schreiben (nur mit WriteCache relevant)
+    obj_index.flush()
 
 
-def set_load_flow_controller(app, logger, fault, flag_debug=False):
+def set_load_flow_controller(app, logger, fault, flag_debug=False, obj_index=None):
     """ 
     Die Function "set_load_flow_controller" berechnet die Sollblindleistung für den Anlagenregler 
     für den aktuellen Versuch anhand der Einstellung der EZE im Reiter Lastfluss für Wirkleistung
@@ -490,13 +749,17 @@ def set_load_flow_controller(app, logger, fault, flag_debug=False):
     flag_debug: bool
         True: Aktiviert die Debuggingausgabe in PowerFactory
         Default: False
+    obj_index: ObjectIndex (optional)
+        Laufbezogener Objektindex (siehe pf_index). Default: None -> neuer Index für diesen Aufruf
     """    
+    if obj_index is None:
+        obj_index = ObjectIndex(app)
     # Anlagenregler
-    ldf_controller = app.GetCalcRelevantObjects('*.ElmStactrl')[0]
+    ldf_controller = obj_index.get('*.ElmStactrl')[0]
     ldf_controller.outserv = 0
     # Synchrongeneratoren/statische Generatoren
-    eze_synchron = app.GetCalcRelevantObjects('*.ElmSym')
-    eze_stat = app.GetCalcRelevantObjects('*.ElmGenstat')
+    eze_synchron = obj_index.get('*.ElmSym')
+    eze_stat = obj_index.get('*.ElmGenstat')
     
     if flag_debug:
         app.PrintPlain(ldf_controller.loc_name)
@@ -510,6 +773,7 @@ def set_load_flow_controller(app, logger, fault, flag_debug=False):
     else:
         ldf_controller.qsetp = 0
         logger.info("Anlagenregler: 0 Mvar")
+        obj_index.flush()
         return
     
     # Initialisierungen
@@ -558,8 +822,14 @@ def set_load_flow_controller(app, logger, fault, flag_debug=False):
     logger.info("Anlagenregler: {} Mvar {}".format(round(Q_A,5), fault.qset))
     # Q-Sollwert des Anlagenreglers gleich berechneter Anlagenblindleistung setzen
     ldf_controller.qsetp = Q_A    
+    # Gepufferte Änderungen schreiben (nur mit WriteCache relevant)
+    obj_index.flush()
 
-def execute_simulation(app, logger, Faults, flag_load_flow_unsym, res_vars, t_sim):
+@timed()
+def execute_simulation(app, logger, grid_model, flag_load_flow_unsym, res_vars, t_sim, obj_index=None,
+                       export_dir=EXPORT_DIR, flag_store=False, flag_keep_dat=True, flag_single_export=False,
+                       decimation=None, result_cache=None, model_version="", journal=None, runtime_history=None,
+                       project="", tablename="", pipeline=None, flag_warm_start=False):
     """ 
     Die Function "execute_simulation" führt einen Lastfluss und Berechnung der Anfangsbedingungen durch.
     Die Simulation wird durchgeführt und die Exportfunktion aufgerufen. 
@@ -570,6 +840,8 @@ def execute_simulation(app, logger, Faults, flag_load_flow_unsym, res_vars, t_si
         PowerFactory Application Object
     logger: 
         logging.logger object 
+    grid_model: GridModel
+        Netzmodell des Laufs. grid_model.list_of_faults enthält die Fehlerereignisse.
     flag_load_flow_unsym: bool
         True: Alle Lastflüsse und Berechnung der Anfangsbedingungen werden unsymmetrisch ausgeführt.
         Default: False
@@ -583,19 +855,50 @@ def execute_simulation(app, logger, Faults, flag_load_flow_unsym, res_vars, t_si
         Beispiel: 
             Eingabe: res_vars["NAP"]["line"]["bus1"]["Sym"] 
             Ausgabe: ['m:u1:bus1', 'm:I1:bus1', 'm:I1P:bus1', 'm:I1Q:bus1']
+    obj_index: ObjectIndex (optional)
+        Laufbezogener Objektindex (siehe pf_index). Default: None -> neuer Index für diesen Aufruf
+    export_dir: str
+        Ausgabeordner der Exportdateien. Default: EXPORT_DIR
+    flag_store: bool
+        True: Exportdateien je Versuch in eine Ergebnisdatei (Versuch1.dynres, siehe result_store) übernehmen
+    flag_keep_dat: bool
+        False: Exportdateien nach der Übernahme in die Ergebnisdatei löschen (nur mit flag_store)
+    flag_single_export: bool
+        True: Ein ComRes-Aufruf je Versuch, Aufteilung in die Exportdateien in Python (siehe execute_export)
+    decimation: dictionary (optional)
+        Zeitfenster und Schrittweiten für den Export je Versuch (siehe execute_export). Default: None -> alle Zeitpunkte
+    result_cache: ResultCache (optional)
+        Ergebniscache (siehe result_cache): unveränderte Versuche werden aus dem Cache übernommen statt simuliert
+    model_version: str
+        Kennung des Modellstands für den Cache-Schlüssel (z.B. bei Änderungen an DSL-Modellen erhöhen)
+    journal: RunJournal (optional)
+        Laufjournal (siehe run_journal): abgeschlossene Versuche werden übersprungen, der Stand je Versuch gespeichert
+    runtime_history: RuntimeHistory (optional)
+        Laufzeithistorie (siehe runtime_history): gemessene Laufzeiten je Versuch speichern, Restlaufzeit im Log
+    project, tablename: str
+        Projekt und Fehlertabelle für die Laufzeithistorie
+    pipeline: Pipeline (optional)
+        Threadpool für die Nachbearbeitung der Exporte (siehe pipeline): Aufteilen/Dezimieren, Ergebnisdatei,
+        Ergebniscache und Laufjournal laufen parallel zur Simulation des nächsten Versuchs. execute_simulation
+        wartet am Ende auf alle Aufgaben.
+    flag_warm_start: bool
+        True: Versuche nach Arbeitspunkt (Netz, Blindleistung, Vorfehlerspannung, Symmetrie) gruppiert simulieren;
+        innerhalb einer Gruppe entfällt der separate Lastfluss und ComInc startet ohne Flachstart (siehe simulate_fault)
     """    
+    if obj_index is None:
+        obj_index = ObjectIndex(app)
     
     #Initialisierungen-------------------------------------------------------
-    folder_scenario = app.GetProjectFolder('scen')
+    folder_scenario = obj_index.project_folder('scen')
     scenario = folder_scenario.GetContents()
     #Resultfiles und Eventfiles auslesen
-    folder_events = app.GetFromStudyCase('IntEvt')
+    folder_events = obj_index.from_study_case('IntEvt')
     #Lastfluss
-    load_flow = app.GetFromStudyCase('ComLdf')
+    load_flow = obj_index.from_study_case('ComLdf')
     #Anfangsbedingungen
-    initial_conditions = app.GetFromStudyCase('ComInc')
+    initial_conditions = obj_index.from_study_case('ComInc')
     #Simulationsstart
-    start_simulation = app.GetFromStudyCase('ComSim')
+    start_simulation = obj_index.from_study_case('ComSim')
     
     #Simulationseinstellungen des Nutzers einlesen (RMS/EMT), sowie Schrittweite
     if initial_conditions.iopt_sim == 'rms':
@@ -603,93 +906,349 @@ def execute_simulation(app, logger, Faults, flag_load_flow_unsym, res_vars, t_si
     elif initial_conditions.iopt_sim == 'ins':
         logger.info("execute_simulation: EMT-Simulation, Schrittweite_EMT: {} s, maximale Schrittweite: {} s".format(initial_conditions.dtemt, initial_conditions.dtemt_max))
     logger.info("execute_simulation: Einstellung der Anfangsbedingungen aus PowerFactory-Dialog übernommen")
+    # Einstellungen für den Cache-Schlüssel einmal je Lauf bestimmen
+    if result_cache is not None:
+        cache_settings = run_settings(obj_index, flag_load_flow_unsym, t_sim, res_vars, decimation=decimation,
+                                      flag_store=flag_store, flag_keep_dat=flag_keep_dat, model_version=model_version)
+    
+    # Laufzeithistorie: Messpunkte je Versuch (eigene Instrumentation, wenn keine aktiv ist)
+    instrumentation = get_active()
+    flag_local_instrumentation = runtime_history is not None and instrumentation is None
+    if flag_local_instrumentation:
+        instrumentation = Instrumentation("execute_simulation").start()
+    if runtime_history is not None:
+        faults = journal.pending(grid_model.list_of_faults) if journal is not None else list(grid_model.list_of_faults)
+        progress = Progress({fault.test: runtime_history.predict(project, tablename, fault, t_sim, sim_mode=initial_conditions.iopt_sim)
+                             for fault in faults})
+    
+    # Warmstart: Versuche mit gleichem Arbeitspunkt nacheinander simulieren
+    faults = grid_model.list_of_faults
+    warm_start = None
+    if flag_warm_start:
+        faults = group_by_operating_point(faults, flag_load_flow_unsym)
+        warm_start = {}
+    
+    # Laut Laufjournal abgeschlossene Versuche überspringen
+    if journal is not None:
+        for fault in faults:
+            if journal.is_done(fault.test):
+                logger.info("execute_simulation: Versuch {} laut Laufjournal abgeschlossen, übersprungen".format(fault.test))
+        faults = journal.pending(faults)
+    
+    # Gemeinsame Betriebsfälle: aktiv lassen, wenn der nächste simulierte Versuch denselben Betriebsfall verwendet
+    names = scenario_names(grid_model.list_of_faults)
+    next_names = [names[fault.test] for fault in faults[1:]] + [None]
     
     #Schleife: Simulation der Versuche gemäß gewählter Richtlinie und Typ ausführen.
-    for fault in Faults.list_of_faults:
-        # Betriebsfall aktivieren
-        scenario = folder_scenario.GetContents('Versuch_{}.IntScenario'.format(fault.test.zfill(2)))[0][0]
+    try:
+        for fault, next_name in zip(faults, next_names):
+            cache_key = fault_key(grid_model, fault, cache_settings) if result_cache is not None else None
+            num_records = len(instrumentation.records) if instrumentation is not None else 0
+            tstart = time()
+            with span("simulate_fault", test=fault.test):
+                simulate_fault(app, logger, fault, flag_load_flow_unsym, res_vars, t_sim, obj_index=obj_index,
+                               export_dir=export_dir, flag_store=flag_store, flag_keep_dat=flag_keep_dat,
+                               flag_single_export=flag_single_export, decimation=decimation,
+                               result_cache=result_cache, cache_key=cache_key, journal=journal, pipeline=pipeline,
+                               warm_start=warm_start, scenario_name=names[fault.test],
+                               flag_keep_scenario=next_name == names[fault.test])
+            # Fehler der Nachbearbeitung vorheriger Versuche nicht erst am Ende melden
+            if pipeline is not None:
+                pipeline.check()
+            if runtime_history is not None:
+                runtime = time() - tstart
+                durations = stage_durations(instrumentation.records[num_records:], test=fault.test)
+                # Nur simulierte Versuche speichern (nicht aus dem Ergebniscache übernommene)
+                if "ComSim" in durations:
+                    runtime_history.record(project, tablename, fault.test, initial_conditions.iopt_sim,
+                                           sim_duration(fault, t_sim), runtime, durations)
+                progress.update(fault.test, runtime)
+                logger.info("execute_simulation: Versuch {} in {} s ({})".format(fault.test, round(runtime, 2), progress.message()))
+    finally:
+        # Lastfluss wieder mit Flachstart, auch wenn ein Versuch mit einer Exception abbricht
+        if warm_start and "iopt_noinit" in warm_start:
+            load_flow.iopt_noinit = warm_start["iopt_noinit"]
+            obj_index.flush()
+    # Betriebsfall, der nach einem übersprungenen Versuch aktiv geblieben ist, deaktivieren
+    active_scenario = app.GetActiveScenario()
+    if active_scenario is not None and active_scenario.loc_name in names.values():
+        active_scenario.Save()
+        active_scenario.Deactivate()
+    if pipeline is not None:
+        with span("pipeline_wait"):
+            pipeline.wait()
+    if flag_local_instrumentation:
+        instrumentation.stop()
+    if result_cache is not None:
+        logger.info("execute_simulation: {}".format(result_cache))
+
+def operating_point(fault):
+    """ operating_point: function
+        Gibt den Vorfehler-Arbeitspunkt eines Versuchs zurück, d.h. alle Größen, die _set_scenario_data in den
+        Betriebsfall schreibt: Netz (grid), Blindleistung (qset), Vorfehlerspannung (uv) und bei
+        Spannungssprüngen (Rf=None) die Spannung der Quelle U_Sprung (uf).
+    """
+    uf = fault.uf if getattr(fault, "Rf", None) is None else None
+    return (fault.grid, fault.qset, fault.uv, uf)
+
+
+def _scenario_groups(faults):
+    """ Gibt die Versuche je gemeinsamem Betriebsfall zurück: {"Versuch_AP01": [fault, ...], ...}. """
+    points = {}
+    for fault in faults:
+        points.setdefault(operating_point(fault), []).append(fault)
+    return {"Versuch_AP{:02d}".format(number): group for number, group in enumerate(points.values(), 1)}
+
+
+def scenario_names(faults):
+    """ scenario_names: function
+        Gibt je Versuch (test) den Namen seines Betriebsfalls zurück. Versuche mit gleichem Arbeitspunkt
+        (operating_point) teilen sich einen Betriebsfall "Versuch_AP01", "Versuch_AP02", ... (nummeriert in der
+        Reihenfolge ihres ersten Versuchs in faults, daher für alle Versuche eines Laufs einheitlich zu bestimmen).
+    """
+    return {fault.test: name for name, group in _scenario_groups(faults).items() for fault in group}
+
+
+def _flag_unsym(fault, flag_load_flow_unsym):
+    """ True: Lastfluss und Anfangsbedingungen des Versuchs unsymmetrisch (siehe simulate_fault). """
+    return bool(flag_load_flow_unsym) or not fault.phases == 3
+
+
+def group_by_operating_point(faults, flag_load_flow_unsym):
+    """ group_by_operating_point: function
+        Ordnet die Versuche so, dass Versuche mit gleichem Arbeitspunkt (operating_point) und gleicher
+        Symmetrie des Lastflusses direkt aufeinander folgen (Warmstart, siehe simulate_fault).
+        Die Gruppen stehen in der Reihenfolge ihres ersten Versuchs, innerhalb der Gruppe bleibt die Reihenfolge erhalten.
+    """
+    groups = {}
+    for fault in faults:
+        groups.setdefault((operating_point(fault), _flag_unsym(fault, flag_load_flow_unsym)), []).append(fault)
+    return [fault for group in groups.values() for fault in group]
+
+
+def simulate_fault(app, logger, fault, flag_load_flow_unsym, res_vars, t_sim, obj_index=None,
+                   export_dir=EXPORT_DIR, flag_store=False, flag_keep_dat=True, flag_single_export=False,
+                   decimation=None, result_cache=None, cache_key=None, journal=None, pipeline=None, warm_start=None,
+                   scenario_name=None, flag_keep_scenario=False):
+    """ 
+    Die Function "simulate_fault" simuliert einen Versuch: Betriebsfall und Fehlerereignisse aktivieren,
+    Lastfluss, Anfangsbedingungen, Simulation und Export. Die Versuche sind voneinander unabhängig und 
+    können daher auch in mehreren PowerFactory-Instanzen parallel simuliert werden (siehe runner).
+        
+    Parameters
+    ----------
+    app: 
+        PowerFactory Application Object
+    logger: 
+        logging.logger object 
+    fault: Instance of Class
+        Enthält die Fehlerdefinition für einen HVRT/LVRT-Versuch
+    flag_load_flow_unsym: bool
+        True: Lastfluss und Berechnung der Anfangsbedingungen werden unsymmetrisch ausgeführt.
+    res_vars: dict
+        Nested Dictionary mit Variablenauswahl für verschiedene Elemente (siehe execute_simulation)
+    t_sim: float
+        Simulationsdauer in s (mindestens 1 s + Fehlerdauer + 5 s)
+    obj_index: ObjectIndex (optional)
+        Laufbezogener Objektindex (siehe pf_index). Default: None -> neuer Index für diesen Aufruf
+    export_dir, flag_store, flag_keep_dat, flag_single_export, decimation, result_cache, journal, pipeline:
+        siehe execute_simulation
+    cache_key: str (optional)
+        Schlüssel des Versuchs im Ergebniscache (siehe result_cache.fault_key)
+    warm_start: dictionary (optional)
+        Zustand des Warmstarts über mehrere Aufrufe (siehe execute_simulation, flag_warm_start). Hat der zuletzt
+        simulierte Versuch denselben Arbeitspunkt und Lastfluss und Anfangsbedingungen waren erfolgreich, entfällt
+        der separate Lastfluss (ComLdf); ComInc rechnet den Lastfluss ohne Flachstart (ComLdf.iopt_noinit=1)
+        ausgehend vom vorhandenen Netzzustand. Schlägt ComInc fehl, wird mit Flachstart wiederholt.
+        Default: None -> jeder Versuch mit Flachstart
+    scenario_name: str (optional)
+        Name des Betriebsfalls (siehe scenario_names). Default: None -> eigener Betriebsfall "Versuch_XX"
+        (Projekte, die vor den gemeinsamen Betriebsfällen angelegt wurden)
+    flag_keep_scenario: bool
+        True: Betriebsfall nach dem Versuch aktiv lassen (der nächste Versuch verwendet denselben Betriebsfall).
+        Ist der Betriebsfall bereits aktiv, entfällt das Aktivieren.
+
+    Returns
+    -------
+    err: int
+        0: Lastfluss und Anfangsbedingungen erfolgreich, 1: Fehler bei Lastfluss oder Anfangsbedingungen
+    """
+    # Ergebnisse aus dem Cache übernehmen, wenn der Versuch unverändert ist
+    if result_cache is not None and cache_key is not None:
+        with span("result_cache", test=fault.test):
+            meta = result_cache.get(cache_key, export_dir)
+        if meta is not None:
+            logger.info("execute_simulation: Versuch {} aus dem Ergebniscache übernommen ({} Dateien)".format(fault.test, len(meta["files"])))
+            if journal is not None:
+                journal.mark(fault.test, "exported", meta["err"])
+            return meta["err"]
+    if obj_index is None:
+        obj_index = ObjectIndex(app)
+    folder_scenario = obj_index.project_folder('scen')
+    folder_events = obj_index.from_study_case('IntEvt')
+    load_flow = obj_index.from_study_case('ComLdf')
+    initial_conditions = obj_index.from_study_case('ComInc')
+    start_simulation = obj_index.from_study_case('ComSim')
+    # Betriebsfall aktivieren (nicht, wenn er vom vorherigen Versuch noch aktiv ist)
+    if scenario_name is None:
+        scenario_name = "Versuch_{}".format(fault.test.zfill(2))
+    scenario = folder_scenario.GetContents('{}.IntScenario'.format(scenario_name))[0][0]
+    active_scenario = app.GetActiveScenario()
+    if active_scenario is not None and active_scenario.loc_name == scenario.loc_name:
+        logger.info("execute_simulation: {} bereits aktiv".format(scenario.loc_name))
+    else:
+        # Anderer Betriebsfall noch aktiv (z.B. vorheriger Versuch aus dem Ergebniscache übernommen): erst speichern
+        if active_scenario is not None:
+            active_scenario.Save()
+            active_scenario.Deactivate()
+            logger.info("execute_simulation: Betriebsfall {} gespeichert und deaktiviert".format(active_scenario.loc_name))
         scenario.Activate()
         logger.info("execute_simulation: {} aktiviert".format(scenario.loc_name))
+    
+    # Fehlerereignisse aktivieren
+    events = folder_events.GetContents('Versuch_{}_o*.*'.format(fault.test.zfill(2)))[0]
+    for event in events:
+        app.PrintPlain(unwrap(event))
+        event.outserv = 0
+        logger.info("execute_simulation: Fehlerfall {} aktiviert".format(event.loc_name))
+    
+    # Lastfluss durchführen 
+    # load_flow.iopt_sim=0 - symmetrisch
+    # load_flow.iopt_sim=1 - unsymmetrisch
+    # Flag: Alle Versuche unsymmetrisch berechnen bzw. Fehlertyp ungleich 0: unsymmetrisch
+    flag_unsym = _flag_unsym(fault, flag_load_flow_unsym)
+    if flag_unsym:
+        load_flow.iopt_sim = 1
+        logger.info("execute_simulation: unsymmetrischer Lastfluss gewählt.")
+    else: 
+        load_flow.iopt_sim = 0
+        logger.info("execute_simulation: symmetrischer Lastfluss gewählt.")
         
-        # Fehlerereignisse aktivieren
-        events = folder_events.GetContents('Versuch_{}_o*.*'.format(fault.test.zfill(2)))[0]
-        for event in events:
-            app.PrintPlain(event)
-            event.outserv = 0
-            logger.info("execute_simulation: Fehlerfall {} aktiviert".format(event.loc_name))
-        
-        # Lastfluss durchführen 
-        # load_flow.iopt_sim=0 - symmetrisch
-        # load_flow.iopt_sim=1 - unsymmetrisch
-        # Flag: Alle Versuche unsymmetrisch berechnen
-        if flag_load_flow_unsym:
-            load_flow.iopt_sim = 1
-            logger.info("execute_simulation: unsymmetrischer Lastfluss gewählt.")
-        # Wenn Fehlertyp ungleich 0, unsymmetrisch:    
-        elif not fault.phases == 3:
-            load_flow.iopt_sim = 1
-            logger.info("execute_simulation: unsymmetrischer Lastfluss gewählt.")
-        else: 
-            load_flow.iopt_sim = 0
-            logger.info("execute_simulation: symmetrischer Lastfluss gewählt.")
-        err = load_flow.Execute()
-        if err == 1:
+    # Anfangsbedingungen berechnen
+    # iopt_sim="rms" - Effektivwerte
+    # iopt_sim="ins" - Momentanwerte
+    # iopt_net="sym" - symmetrisch 
+    # iopt_net="rst" - unsymmetrisch
+    # RMS-Simulation
+    if initial_conditions.iopt_sim=="rms": 
+        initial_conditions.iopt_net = "rst" if flag_unsym else "sym"
+    # EMT-Simulation        
+    elif initial_conditions.iopt_sim=="ins":
+        # initial_conditions.iopt_net = "rst" # immer unsymmetrisch
+        logger.debug("execute_simulation: EMT-Simulation bei der Berechnung der Anfangsbedingungen gewählt!")
+    
+    # Warmstart: gleicher Arbeitspunkt wie der zuletzt simulierte Versuch
+    key = (operating_point(fault), flag_unsym)
+    flag_warm = warm_start is not None and warm_start.get("key") == key and warm_start.get("err") == 0
+    if warm_start is not None:
+        warm_start.setdefault("iopt_noinit", load_flow.iopt_noinit)
+    if flag_warm:
+        load_flow.iopt_noinit = 1
+        err_ldf = 0
+        logger.info("execute_simulation: Warmstart, Arbeitspunkt wie Versuch {}: Lastfluss ohne Flachstart in ComInc".format(warm_start["test"]))
+        with span("ComInc", test=fault.test):
+            err_inc = initial_conditions.Execute()
+        if err_inc == 1:
+            logger.warning("execute_simulation: Warmstart fehlgeschlagen, Wiederholung mit Flachstart")
+            flag_warm = False
+    if not flag_warm:
+        if warm_start is not None:
+            load_flow.iopt_noinit = warm_start["iopt_noinit"]
+        with span("ComLdf", test=fault.test):
+            err_ldf = load_flow.Execute()
+        if err_ldf == 1:
             logger.error("execute_simulation: Fehler bei der Lastflussberechnung!")
         else:
             logger.info("execute_simulation: Lastflussberechnung erfolgreich durchgeführt.")
-            
-        # Anfangsbedingungen berechnen
-        # iopt_sim="rms" - Effektivwerte
-        # iopt_sim="ins" - Momentanwerte
-        # iopt_net="sym" - symmetrisch 
-        # iopt_net="rst" - unsymmetrisch
-        # RMS-Simulation
-        if initial_conditions.iopt_sim=="rms": 
-            # Flag: Alle Versuche unsymmetrisch berechnen
-            if flag_load_flow_unsym:
-                initial_conditions.iopt_net = "rst"
-            # Wenn Fehlertyp ungleich 0, unsymmetrisch:
-            elif not fault.phases == 3:
-                initial_conditions.iopt_net = "rst"
-            else: 
-                initial_conditions.iopt_net = "sym"
-        # EMT-Simulation        
-        elif initial_conditions.iopt_sim=="ins":
-            # initial_conditions.iopt_net = "rst" # immer unsymmetrisch
-            logger.debug("execute_simulation: EMT-Simulation bei der Berechnung der Anfangsbedingungen gewählt!")
-        err = initial_conditions.Execute()        
-        if err == 1:
-            logger.error("execute_simulation: Fehler bei der Berechnung der Anfangsbedingungen!")
-        else:
-            logger.info("execute_simulation: Anfangsbedingungenerfolgreich berechnet.")
-        
-        start_simulation.tstop = t_sim
-        tmin = 1 + fault.duration + 5
-        # Simulation starten 
-        if start_simulation.tstop < tmin: 
-            start_simulation.tstop = tmin
-            # "tstop" - Stopp-Zeitpunkt absolut
-            logger.info("execute_simulation: minimale Simulationsdauer von {} s gewählt".format(tmin))
-        else:
-            logger.info("execute_simulation: Simulationsdauer gemäß Einstellung im ComSim-Dialog auf {} s gesetzt".format(start_simulation.tstop))
+        with span("ComInc", test=fault.test):
+            err_inc = initial_conditions.Execute()
+    if err_inc == 1:
+        logger.error("execute_simulation: Fehler bei der Berechnung der Anfangsbedingungen!")
+    else:
+        logger.info("execute_simulation: Anfangsbedingungenerfolgreich berechnet.")
+    if warm_start is not None:
+        warm_start.update(key=key, test=fault.test, err=1 if err_ldf == 1 or err_inc == 1 else 0)
+    if journal is not None:
+        journal.mark(fault.test, "load_flow", 1 if err_ldf == 1 or err_inc == 1 else 0)
+    
+    start_simulation.tstop = t_sim
+    tmin = 1 + fault.duration + 5
+    # Simulation starten 
+    if start_simulation.tstop < tmin: 
+        start_simulation.tstop = tmin
+        # "tstop" - Stopp-Zeitpunkt absolut
+        logger.info("execute_simulation: minimale Simulationsdauer von {} s gewählt".format(tmin))
+    else:
+        logger.info("execute_simulation: Simulationsdauer gemäß Einstellung im ComSim-Dialog auf {} s gesetzt".format(start_simulation.tstop))
+    with span("ComSim", test=fault.test):
         start_simulation.Execute()
-        
-        # Funktionsaufruf: execute_export(app, logger, res_vars, fault) 
-        # Die Function "execute_export" exportiert die Simulationsergebnisse 
-        logger.info("execute_simulation: Aufruf function execute_export")
-        execute_export(app, logger, res_vars, fault)
-        
-        # Fehlerereignisse aktivieren
-        for event in events: 
-            event.outserv = 1
-            logger.info("execute_simulation: Fehlerfall {} deaktiviert".format(event.loc_name))
-        
-        #Betriebsfälle speichern und deaktivieren
+    if journal is not None:
+        journal.mark(fault.test, "simulated", 1 if err_ldf == 1 or err_inc == 1 else 0)
+    
+    # Funktionsaufruf: execute_export(app, logger, res_vars, fault, obj_index, export_dir, flag_single_export) 
+    # Die Function "execute_export" exportiert die Simulationsergebnisse 
+    logger.info("execute_simulation: Aufruf function execute_export")
+    exports, post = execute_export(app, logger, res_vars, fault, obj_index=obj_index, export_dir=export_dir,
+                                   flag_single_export=flag_single_export, decimation=decimation, flag_defer=True)
+    err = 1 if err_ldf == 1 or err_inc == 1 else 0
+    # Nachbearbeitung der Exportdateien (ohne PowerFactory): mit Pipeline parallel zum nächsten Versuch
+    finish = partial(_finish_exports, logger, fault, exports, post, err, export_dir=export_dir, flag_store=flag_store,
+                     flag_keep_dat=flag_keep_dat, meta=_store_meta(fault, initial_conditions),
+                     result_cache=result_cache, cache_key=cache_key, journal=journal)
+    if pipeline is None:
+        finish()
+    else:
+        pipeline.submit("Versuch{}".format(fault.test), finish)
+    
+    # Fehlerereignisse aktivieren
+    for event in events: 
+        event.outserv = 1
+        logger.info("execute_simulation: Fehlerfall {} deaktiviert".format(event.loc_name))
+    
+    #Betriebsfälle speichern und deaktivieren
+    if not flag_keep_scenario:
         scenario.Save()
         scenario.Deactivate()
         logger.info("execute_simulation: Betriebsfall {} gespeichert und deaktiviert".format(scenario.loc_name))
+    return err
+
+def _finish_exports(logger, fault, exports, post, err, export_dir=EXPORT_DIR, flag_store=False, flag_keep_dat=True,
+                    meta=None, result_cache=None, cache_key=None, journal=None):
+    """ _finish_exports: function
+        Nachbearbeitung der Exportdateien eines Versuchs nach ComRes: Aufteilen/Dezimieren (post),
+        Ergebnisdatei, Ergebniscache und Laufjournal. Greift nicht auf PowerFactory zu.
+    """
+    if post is not None:
+        post()
+    # Exportdateien in die Ergebnisdatei des Versuchs übernehmen
+    if flag_store and exports:
+        fname_store = os.path.join(export_dir, "Versuch{}.dynres".format(fault.test))
+        with span("result_store", test=fault.test):
+            ingest_exports(fname_store, exports, meta=meta, flag_keep_dat=flag_keep_dat)
+        logger.info("execute_simulation: Ergebnisdatei {} geschrieben".format(fname_store))
+    # Nur fehlerfreie Versuche in den Ergebniscache übernehmen
+    if result_cache is not None and cache_key is not None and err == 0:
+        fnames = [export["fname"] for export in exports if os.path.isfile(export["fname"])]
+        if flag_store and exports:
+            fnames.append(fname_store)
+        with span("result_cache", test=fault.test):
+            result_cache.put(cache_key, sorted(set(fnames)), meta={"test": fault.test, "err": err})
+    if journal is not None:
+        journal.mark(fault.test, "exported", err)
 
-def execute_export(app, logger, res_vars, fault):
+def _store_meta(fault, initial_conditions):
+    """ _store_meta: function
+        Gibt die Metadaten eines Versuchs für die Ergebnisdatei zurück.
+    """
+    meta = {"test": fault.test, "sim_mode": initial_conditions.iopt_sim}
+    for name in ("fault_type", "phases", "duration", "uf", "grid", "qset", "uv"):
+        value = getattr(fault, name, None)
+        meta[name] = value.item() if hasattr(value, "item") else value
+    return meta
+
+@timed()
+def execute_export(app, logger, res_vars, fault, obj_index=None, export_dir=EXPORT_DIR, flag_single_export=False,
+                   decimation=None, flag_defer=False):
     """ 
     Die Function "execute_export" exportiert die Simulationsergebnisse 
         
@@ -711,15 +1270,39 @@ def execute_export(app, logger, res_vars, fault):
             Ausgabe: ['m:u1:bus1', 'm:I1:bus1', 'm:I1P:bus1', 'm:I1Q:bus1']
     fault: Instance of Class
         Enthält die Fehlerdefinition für einen HVRT/LVRT-Versuch
+    obj_index: ObjectIndex (optional)
+        Laufbezogener Objektindex (siehe pf_index). Default: None -> neuer Index für diesen Aufruf
+    export_dir: str
+        Ausgabeordner der Exportdateien. Default: EXPORT_DIR
+    flag_single_export: bool
+        True: Ein ComRes-Aufruf je Versuch in eine Sammeldatei, die anschließend in die Exportdateien
+        je Messstelle und var_type aufgeteilt wird (gleiche Dateinamen und Spalten wie einzelne Exporte)
+    decimation: dictionary (optional)
+        Zeitfenster für den Export (Parameter von results.export_windows, z.B. {"t_before": 0.1, "t_after": 0.5,
+        "dt_steady": 0.01}; {} -> Defaults). Volle Auflösung um Fehlereintritt und -klärung des Versuchs, außerhalb
+        Schrittweite dt_steady. Default: None -> alle Zeitpunkte
+    flag_defer: bool
+        True: Nur die ComRes-Exporte ausführen. Das Aufteilen/Dezimieren der Exportdateien wird als Funktion
+        zurückgegeben (z.B. für die Pipeline, siehe pipeline)
+
+    Returns
+    -------
+    exports: list
+        Ein dictionary je Exportdatei: fname (Pfad), point (Messstelle, z.B. "EZE1"), var_type (Sym, Unsym, ULE)
+    post: callable or None
+        Nur mit flag_defer: Nachbearbeitung der Exportdateien (None: keine)
     """       
+    if obj_index is None:
+        obj_index = ObjectIndex(app)
+    specs = []
     
     #Anfangsbedingungen auslesen für Exportunterscheidung    
-    initial_conditions = app.GetFromStudyCase('ComInc')
+    initial_conditions = obj_index.from_study_case('ComInc')
     #greife auf alle Berechnungsarten zu
-    allcalcs = app.GetFromStudyCase('*.ElmRes')
+    allcalcs = obj_index.from_study_case('*.ElmRes')
     resultobjects = allcalcs.GetContents("*.IntMon")
     #Exportdialog übernehmen
-    export = app.GetFromStudyCase('ComRes')
+    export = obj_index.from_study_case('ComRes')
     
     for resultobject in resultobjects[0]:
         # String Formatting
@@ -775,21 +1358,6 @@ def execute_export(app, logger, res_vars, fault):
                 logger.debug("execute_export: var_type=ULE, fault_type=0, Export überspringen")
                 continue
             
-            # Ausgabevariablen zur Zeit (b:tnow) hinzufügen
-            cvariable = ["b:tnow"]
-            objs, elements = [allcalcs], [allcalcs]
-            for var in vars[var_type]:
-                cvariable.append(var)
-                elements.append(resultobject.obj_id)
-                objs.append(allcalcs)
-            logger.debug("execute_export: export.cvariable: {}".format(cvariable))
-            logger.debug("execute_export: export.element: {}".format([x.loc_name for x in elements]))
-            logger.debug("execute_export: export.resultobj: {}".format([x.loc_name for x in objs]))
-            # Exportieren von: Ergebnisobjekt
-            export.pResult = allcalcs
-            # Exportieren nach: Textdatei
-            export.iopt_exp = 4
-            
             # Dateinamen formatieren
             # Für erste Messstelle keine Zahl ausgeben: Versuch1_EZE.dat
             if number_strip[0]==0:
@@ -805,13 +1373,83 @@ def execute_export(app, logger, res_vars, fault):
             if var_type == "ULE":
                 fname_split = fname.split(".")
                 fname = "{}_ULE.{}".format(fname_split[0], fname_split[1])
-               
-            export.f_name = "C:\\Ausgabe_Skript\\{}".format(fname) # Dateiname     
-            export.iopt_csel = 1 # Nur ausgewählte Variablen exportieren
-            export.resultobj = objs # Ergebnisobjekt
-            export.element = elements # Element
-            export.cvariable = cvariable # Variable
-            export.iopt_tsel = 0 # Benutzerdefinitertes Intervall off
-            export.Execute() # Export ausführen
-            logger.debug("execute_export: Datei {} exportiert".format(fname))
-            
+            specs.append({"fname": os.path.join(export_dir, fname), "point": name_split[0], "var_type": var_type,
+                          "element": resultobject.obj_id, "vars": list(vars[var_type])})
+
+    # Exportieren von: Ergebnisobjekt
+    export.pResult = allcalcs
+    # Exportieren nach: Textdatei
+    export.iopt_exp = 4
+    export.iopt_csel = 1 # Nur ausgewählte Variablen exportieren
+    export.iopt_tsel = 0 # Benutzerdefinitertes Intervall off
+    # Zeitfenster aus der Fehlerdauer des Versuchs
+    windows = export_windows(fault, **decimation) if decimation is not None else None
+    if flag_single_export:
+        post = _export_single(logger, export, allcalcs, specs, fault, export_dir, windows=windows)
+    else:
+        for spec in specs:
+            _export_columns(logger, export, allcalcs, [(spec["element"], var) for var in spec["vars"]], spec["fname"], fault)
+        post = partial(_decimate_exports, [spec["fname"] for spec in specs], fault, windows) if windows is not None else None
+    exports = [{"fname": spec["fname"], "point": spec["point"], "var_type": spec["var_type"]} for spec in specs]
+
+    if flag_defer:
+        return exports, post
+    if post is not None:
+        post()
+    return exports
+
+def _decimate_exports(fnames, fault, windows):
+    """ Dezimiert die Exportdateien fnames auf die Zeitfenster windows (siehe results.decimate_dat).
+        ComRes exportiert weiterhin mit voller Auflösung (eine Zeitbereichsauswahl iopt_tsel gilt nur für ein
+        Intervall ohne Schrittweite): die Dezimierung verkleinert nur die abgelegten Dateien (Ausgabeordner, Cache,
+        Ergebnisdatei), nicht den Schreibaufwand von PowerFactory.
+    """
+    with span("decimate_export", test=fault.test):
+        for fname in fnames:
+            decimate_dat(fname, windows)
+
+def _export_columns(logger, export, allcalcs, columns, fname, fault):
+    """ Exportiert die Spalten columns (Liste von Tupeln (Element, Variable)) und die Zeit (b:tnow) mit ComRes in die Datei fname. """
+    # Ausgabevariablen zur Zeit (b:tnow) hinzufügen
+    cvariable = ["b:tnow"]
+    objs, elements = [allcalcs], [allcalcs]
+    for element, var in columns:
+        cvariable.append(var)
+        elements.append(element)
+        objs.append(allcalcs)
+    logger.debug("execute_export: export.cvariable: {}".format(cvariable))
+    logger.debug("execute_export: export.element: {}".format([x.loc_name for x in elements]))
+    logger.debug("execute_export: export.resultobj: {}".format([x.loc_name for x in objs]))
+    export.f_name = fname # Dateiname
+    export.resultobj = objs # Ergebnisobjekt
+    export.element = elements # Element
+    export.cvariable = cvariable # Variable
+    with span("ComRes", test=fault.test):
+        export.Execute() # Export ausführen
+    logger.debug("execute_export: Datei {} exportiert".format(os.path.basename(fname)))
+
+def _export_single(logger, export, allcalcs, specs, fault, export_dir, windows=None):
+    """ Exportiert alle Variablen eines Versuchs mit einem ComRes-Aufruf in eine Sammeldatei und gibt die Funktion
+        zurück, die diese in die Exportdateien je Messstelle und var_type (specs) aufteilt und danach löscht.
+        windows: nur die Zeitpunkte dieser Zeitfenster übernehmen (siehe results.export_windows)
+    """
+    columns, outputs = [], {}
+    for spec in specs:
+        positions = [0]
+        for var in spec["vars"]:
+            column = (spec["element"], var)
+            if column not in columns:
+                columns.append(column)
+            positions.append(columns.index(column) + 1)
+        # Gleicher Dateiname: letzte Variablenauswahl gilt (wie beim Überschreiben mit einzelnen Exporten)
+        outputs[spec["fname"]] = positions
+    fname_all = os.path.join(export_dir, "Versuch{}_Export.dat".format(fault.test))
+    _export_columns(logger, export, allcalcs, columns, fname_all, fault)
+    return partial(_split_export, logger, fname_all, list(outputs.items()), fault, windows)
+
+def _split_export(logger, fname_all, outputs, fault, windows):
+    """ Teilt die Sammeldatei fname_all in die Exportdateien outputs auf und löscht sie (siehe _export_single). """
+    with span("split_export", test=fault.test):
+        split_dat(fname_all, outputs, windows=windows)
+    os.remove(fname_all)
+    logger.debug("execute_export: Sammeldatei in {} Dateien aufgeteilt".format(len(outputs)))
@@ -0,0 +1,166 @@
+""" pf_index.py
+
+Objektindex für die berechnungsrelevanten Objekte eines PowerFactory-Projekts.
+
+Die Suche mit app.GetCalcRelevantObjects über Platzhalter ist bei Parks mit vielen
+Erzeugungseinheiten teuer. ObjectIndex lädt die Objekte je Klasse einmal und filtert
+Namensmuster anschließend in Python. Nach dem Erstellen oder Löschen von Objekten
+muss der Index für die betroffene Klasse mit invalidate zurückgesetzt werden.
+
+Optional gibt der Index die Objekte als ObjectProxy eines WriteCache zurück (siehe pf_proxy),
+sodass unveränderte Schreibzugriffe übersprungen und Änderungen gebündelt geschrieben werden.
+"""
+from fnmatch import fnmatchcase
+
+
+class ObjectIndex:
+    """ ObjectIndex: class
+
+    Laufbezogener Cache für GetCalcRelevantObjects, GetFromStudyCase und GetProjectFolder.
+
+    Attributes:
+    ----------
+    app:
+        PowerFactory Application Object
+    write_cache: WriteCache or None
+        Schreibpuffer für die zurückgegebenen Objekte (None: Objekte werden direkt zurückgegeben)
+    num_queries: int
+        Anzahl der an PowerFactory weitergegebenen Abfragen
+    num_hits: int
+        Anzahl der aus dem Index beantworteten Abfragen
+
+    Methods:
+    -------
+    get:
+        Ersetzt app.GetCalcRelevantObjects(pattern), z.B. get('*gleich*.ElmVac')
+    by_class:
+        Alle berechnungsrelevanten Objekte einer Klasse, z.B. by_class('ElmSym')
+    from_study_case:
+        Ersetzt app.GetFromStudyCase(name)
+    project_folder:
+        Ersetzt app.GetProjectFolder(name)
+    invalidate:
+        Setzt den Index (für eine Klasse) zurück
+    flush:
+        Schreibt die gepufferten Änderungen des WriteCache nach PowerFactory
+    """
+
+    def __init__(self, app, write_cache=None):
+        """
+        Parameters
+        ----------
+        app:
+            PowerFactory Application Object
+        write_cache: WriteCache (optional)
+            Wenn angegeben, werden alle Objekte als ObjectProxy dieses Schreibpuffers zurückgegeben.
+        """
+        self.app = app
+        self.write_cache = write_cache
+        self.num_queries = 0
+        self.num_hits = 0
+        self._by_class = {}
+        self._by_pattern = {}
+        self._study_case = {}
+        self._project_folder = {}
+
+    def by_class(self, class_name):
+        """ by_class: method
+            Gibt alle berechnungsrelevanten Objekte der Klasse class_name zurück.
+            Die Objekte werden beim ersten Aufruf mit GetCalcRelevantObjects('*.<class_name>') geladen.
+        """
+        key = class_name.lower()
+        if key in self._by_class:
+            self.num_hits += 1
+        else:
+            self.num_queries += 1
+            self._by_class[key] = self._wrap(list(self.app.GetCalcRelevantObjects("*.{}".format(class_name))))
+        return list(self._by_class[key])
+
+    def get(self, pattern):
+        """ get: method
+            Gibt wie app.GetCalcRelevantObjects(pattern) eine Liste der passenden Objekte zurück.
+
+        Parameters
+        ----------
+        pattern: str
+            Suchmuster "<Name>.<Klasse>" mit Platzhaltern im Namen, z.B. '*vorg*.ElmSind'.
+            Groß-/Kleinschreibung wird wie in PowerFactory ignoriert.
+            Enthält die Klasse Platzhalter (z.B. '*xNAP*.*'), wird die Abfrage
+            direkt an PowerFactory weitergegeben und das Ergebnis gespeichert.
+        """
+        key = pattern.lower()
+        if key in self._by_pattern:
+            self.num_hits += 1
+            return list(self._by_pattern[key])
+        name, _, class_name = key.rpartition(".")
+        if any(x in class_name for x in "*?["):
+            self.num_queries += 1
+            objects = self._wrap(list(self.app.GetCalcRelevantObjects(pattern)))
+        else:
+            objects = [obj for obj in self.by_class(class_name) if fnmatchcase(obj.loc_name.lower(), name)]
+        self._by_pattern[key] = objects
+        return list(objects)
+
+    def from_study_case(self, name):
+        """ from_study_case: method
+            Gibt wie app.GetFromStudyCase(name) das Objekt aus dem aktiven Berechnungsfall zurück.
+        """
+        if name in self._study_case:
+            self.num_hits += 1
+        else:
+            self.num_queries += 1
+            self._study_case[name] = self._wrap(self.app.GetFromStudyCase(name))
+        return self._study_case[name]
+
+    def project_folder(self, name):
+        """ project_folder: method
+            Gibt wie app.GetProjectFolder(name) den Projektordner zurück.
+        """
+        if name in self._project_folder:
+            self.num_hits += 1
+        else:
+            self.num_queries += 1
+            self._project_folder[name] = self._wrap(self.app.GetProjectFolder(name))
+        return self._project_folder[name]
+
+    def _wrap(self, value):
+        if self.write_cache is None:
+            return value
+        return self.write_cache.wrap(value)
+
+    def flush(self):
+        """ flush: method
+            Schreibt die gepufferten Änderungen nach PowerFactory (ohne WriteCache wirkungslos).
+        """
+        if self.write_cache is not None:
+            self.write_cache.flush()
+
+    def invalidate(self, class_name=None):
+        """ invalidate: method
+            Setzt den Index zurück. Muss nach dem Erstellen oder Löschen von Objekten aufgerufen werden.
+
+        Parameters
+        ----------
+        class_name: str (optional)
+            Nur die Einträge dieser Klasse (und Abfragen mit Platzhalter in der Klasse) zurücksetzen.
+            Default: None -> gesamter Index inkl. Berechnungsfall und Projektordner sowie die bekannten
+            Werte des WriteCache
+        """
+        if class_name is None:
+            self._by_class.clear()
+            self._by_pattern.clear()
+            self._study_case.clear()
+            self._project_folder.clear()
+            # Bekannte Werte des Schreibpuffers gelten nicht mehr (z.B. nach dem Wechsel des Projekts)
+            if self.write_cache is not None:
+                self.write_cache.invalidate()
+            return
+        class_name = class_name.lower()
+        self._by_class.pop(class_name, None)
+        for key in list(self._by_pattern.keys()):
+            pattern_class = key.rpartition(".")[2]
+            if pattern_class == class_name or any(x in pattern_class for x in "*?["):
+                del self._by_pattern[key]
+
+    def __repr__(self):
+        return "ObjectIndex(classes={}, queries={}, hits={})".format(sorted(self._by_class.keys()), self.num_queries, self.num_hits)
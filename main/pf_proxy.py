@@ -0,0 +1,225 @@
+""" pf_proxy.py
+
+Schreibpuffer für Attribute von PowerFactory-Objekten.
+
+Jeder Schreibzugriff auf ein Attribut eines PowerFactory-Objekts ist ein teurer Aufruf
+über die Schnittstelle und markiert den aktiven Betriebsfall als geändert. ObjectProxy
+merkt sich die zuletzt geschriebenen Werte, überspringt Schreibzugriffe ohne Änderung und
+sammelt die übrigen, bis sie mit WriteCache.flush geschrieben werden. Vor jedem
+Methodenaufruf über einen Proxy (z.B. Execute, Save, Activate, GetContents) werden alle
+gesammelten Änderungen geschrieben, sodass PowerFactory immer den aktuellen Stand sieht.
+
+Bekannt sind nur die über den Proxy geschriebenen Werte; Lesezugriffe gehen (außer für noch
+nicht geschriebene Änderungen) immer an PowerFactory. Die Proxies werden je PowerFactory-Objekt
+schwach referenziert und verworfen, sobald sie nicht mehr verwendet werden.
+"""
+import weakref
+
+
+def unwrap(value):
+    """ unwrap: function
+        Gibt für einen ObjectProxy das PowerFactory-Objekt zurück. Listen und Tupel werden
+        elementweise entpackt, alle anderen Werte unverändert zurückgegeben.
+    """
+    if isinstance(value, ObjectProxy):
+        return object.__getattribute__(value, "_obj")
+    if isinstance(value, list):
+        return [unwrap(x) for x in value]
+    if isinstance(value, tuple):
+        return tuple(unwrap(x) for x in value)
+    return value
+
+
+class WriteCache:
+    """ WriteCache: class
+
+    Laufbezogener Schreibpuffer für PowerFactory-Objekte.
+
+    Attributes:
+    ----------
+    num_writes: int
+        Anzahl der an PowerFactory weitergegebenen Schreibzugriffe
+    num_skipped: int
+        Anzahl der übersprungenen Schreibzugriffe (Wert unverändert)
+    num_flushes: int
+        Anzahl der Aufrufe von flush mit mindestens einem Schreibzugriff
+    scenario_classes: tuple
+        Klassen(präfixe), deren Attribute im Betriebsfall gespeichert werden. Für diese Objekte
+        werden die bekannten Werte beim Aktivieren/Deaktivieren eines Betriebsfalls verworfen.
+    read_before_write: bool
+        True: Ist der Wert eines Attributs unbekannt, wird er vor dem Schreiben aus PowerFactory
+        gelesen und der Schreibzugriff bei gleichem Wert übersprungen (Abgleich vorhandener Objekte).
+        Der gelesene Wert wird nicht gemerkt.
+
+    Methods:
+    -------
+    wrap:
+        Gibt den ObjectProxy für ein PowerFactory-Objekt zurück
+    flush:
+        Schreibt alle gesammelten Änderungen nach PowerFactory
+    invalidate:
+        Verwirft die bekannten Werte (z.B. nach dem Wechsel des Betriebsfalls)
+    """
+
+    def __init__(self, scenario_classes=("Elm",), read_before_write=False):
+        """
+        Parameters
+        ----------
+        scenario_classes: tuple
+            Default: ("Elm",) -> alle Netzelemente
+        read_before_write: bool
+            Default: False -> unbekannte Werte werden ohne Vergleich geschrieben
+        """
+        self.scenario_classes = scenario_classes
+        self.read_before_write = read_before_write
+        self.num_writes = 0
+        self.num_skipped = 0
+        self.num_flushes = 0
+        self._proxies = weakref.WeakValueDictionary()
+        self._dirty = {}
+
+    def wrap(self, value):
+        """ wrap: method
+            Gibt für ein PowerFactory-Objekt den zugehörigen ObjectProxy zurück (je Objekt genau einer).
+            Listen und Tupel werden elementweise verarbeitet, andere Werte unverändert zurückgegeben.
+        """
+        if isinstance(value, ObjectProxy):
+            return value
+        if isinstance(value, list):
+            return [self.wrap(x) for x in value]
+        if isinstance(value, tuple):
+            return tuple(self.wrap(x) for x in value)
+        if not hasattr(value, "GetClassName"):
+            return value
+        # Schlüssel ist das Objekt selbst (nicht id(), die nach dem Freigeben neu vergeben werden kann)
+        proxy = self._proxies.get(value)
+        if proxy is None:
+            proxy = ObjectProxy(value, self)
+            self._proxies[value] = proxy
+        return proxy
+
+    def flush(self):
+        """ flush: method
+            Schreibt alle gesammelten Änderungen in der Reihenfolge ihres Auftretens nach PowerFactory.
+        """
+        if not self._dirty:
+            return
+        dirty = list(self._dirty.values())
+        self._dirty.clear()
+        for proxy in dirty:
+            proxy._flush()
+        self.num_flushes += 1
+
+    def invalidate(self, scenario_only=False):
+        """ invalidate: method
+            Verwirft die bekannten (zuletzt geschriebenen) Werte. Gesammelte Änderungen werden vorher geschrieben.
+
+        Parameters
+        ----------
+        scenario_only: bool
+            True: nur Objekte der Klassen scenario_classes (Betriebsfalldaten)
+        """
+        self.flush()
+        for proxy in list(self._proxies.values()):
+            if not scenario_only or proxy._class_name().startswith(self.scenario_classes):
+                object.__getattribute__(proxy, "_known").clear()
+
+    def stats(self):
+        """ stats: method
+            Gibt die Zähler als dictionary zurück.
+        """
+        return {"writes": self.num_writes, "skipped": self.num_skipped, "flushes": self.num_flushes}
+
+    def __repr__(self):
+        return "WriteCache(writes={}, skipped={}, flushes={})".format(self.num_writes, self.num_skipped, self.num_flushes)
+
+
+class ObjectProxy:
+    """ ObjectProxy: class
+
+    Stellvertreter für ein PowerFactory-Objekt (DataObject). Lesezugriffe und Methodenaufrufe
+    werden an das Objekt weitergegeben, Schreibzugriffe über den WriteCache gepuffert.
+    """
+    __slots__ = ("_obj", "_cache", "_known", "_pending", "_cls", "__weakref__")
+
+    # Methoden, nach denen sich die Betriebsfalldaten der Netzelemente ändern können
+    SCENARIO_METHODS = ("Activate", "Deactivate")
+
+    def __init__(self, obj, cache):
+        object.__setattr__(self, "_obj", obj)
+        object.__setattr__(self, "_cache", cache)
+        object.__setattr__(self, "_known", {})
+        object.__setattr__(self, "_pending", {})
+        object.__setattr__(self, "_cls", None)
+
+    def _class_name(self):
+        cls = object.__getattribute__(self, "_cls")
+        if cls is None:
+            cls = object.__getattribute__(self, "_obj").GetClassName()
+            object.__setattr__(self, "_cls", cls)
+        return cls
+
+    def _flush(self):
+        obj = object.__getattribute__(self, "_obj")
+        cache = object.__getattribute__(self, "_cache")
+        known = object.__getattribute__(self, "_known")
+        pending = object.__getattribute__(self, "_pending")
+        for name, value in pending.items():
+            setattr(obj, name, value)
+            known[name] = value
+            cache.num_writes += 1
+        pending.clear()
+
+    def __getattr__(self, name):
+        pending = object.__getattribute__(self, "_pending")
+        if name in pending:
+            return pending[name]
+        value = getattr(object.__getattribute__(self, "_obj"), name)
+        if callable(value):
+            return self._method(name, value)
+        return value
+
+    def _method(self, name, method):
+        cache = object.__getattribute__(self, "_cache")
+
+        def call(*args, **kwargs):
+            cache.flush()
+            result = method(*unwrap(args), **{key: unwrap(x) for key, x in kwargs.items()})
+            if name in ObjectProxy.SCENARIO_METHODS:
+                cache.invalidate(scenario_only=True)
+            return cache.wrap(result)
+        return call
+
+    def __setattr__(self, name, value):
+        value = unwrap(value)
+        cache = object.__getattribute__(self, "_cache")
+        pending = object.__getattribute__(self, "_pending")
+        known = object.__getattribute__(self, "_known")
+        if name not in pending and name in known and known[name] == value:
+            cache.num_skipped += 1
+            return
+        if name not in pending and name not in known and cache.read_before_write:
+            # Vergleich mit dem aktuellen Wert in PowerFactory (der gelesene Wert wird nicht gemerkt)
+            try:
+                flag_equal = getattr(object.__getattribute__(self, "_obj"), name) == value
+            except AttributeError:
+                flag_equal = False
+            if flag_equal:
+                cache.num_skipped += 1
+                return
+        if name in pending:
+            cache.num_skipped += 1
+        pending[name] = value
+        cache._dirty[id(self)] = self
+
+    def __eq__(self, other):
+        return unwrap(self) == unwrap(other)
+
+    def __hash__(self):
+        return hash(object.__getattribute__(self, "_obj"))
+
+    def __str__(self):
+        return str(object.__getattribute__(self, "_obj"))
+
+    def __repr__(self):
+        return "ObjectProxy({!r})".format(object.__getattribute__(self, "_obj"))
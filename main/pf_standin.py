@@ -0,0 +1,586 @@
+""" pf_standin.py
+
+Ersatz für das PowerFactory Application Object (app) für Läufe ohne PowerFactory.
+
+StandinApp bildet den von pf_functions verwendeten Teil der Schnittstelle nach
+(GetCalcRelevantObjects, GetFromStudyCase, GetProjectFolder, CreateObject, GetContents,
+Execute von ComLdf/ComInc/ComSim/ComRes, Activate/Save/Deactivate von Betriebsfällen, ...)
+und enthält einen Parkaufbau mit dem Ersatzschaltbild gemäß FGW TR8. Die Laufzeit je
+Aufruf ist einstellbar, die Simulation erzeugt synthetische Ergebnisse (Spannungseinbruch/
+-erhöhung je nach aktivem Fehlerereignis), die mit ComRes als Textdatei exportiert werden.
+
+Damit lassen sich Ablauf, Parallelisierung und Caching unter Linux reproduzierbar messen.
+Die Ergebnisse sind plausibel, aber kein Ersatz für eine Simulation in PowerFactory.
+"""
+import os
+import re
+from fnmatch import fnmatchcase
+from time import sleep
+
+import numpy as np
+
+# Voreinstellungen der Attribute je Klasse (nicht aufgeführte Attribute müssen vor dem Lesen gesetzt werden)
+CLASS_DEFAULTS = {
+    "ElmVac": {"Unom": 20.0, "usetp": 1.0, "R1": 0.0, "X1": 1.0, "R0": 0.0, "X0": 1.0, "R2": 0.0, "X2": 1.0, "contbar": None},
+    "ElmSind": {"ucn": 20.0, "rrea": 0.0, "xrea": 0.0},
+    "ElmCoup": {"on_off": 0, "nphase": 3},
+    "ElmSym": {"pgini": 1.0, "qgini": 0.0, "ngnum": 1, "c_pstac": None},
+    "ElmGenstat": {"pgini": 1.0, "qgini": 0.0, "ngnum": 1, "c_pstac": None},
+    "ElmStactrl": {"i_ctrl": 0, "p_cub": None, "qsetp": 0.0},
+    "EvtShc": {"time": 0.0, "i_shc": 0, "R_f": 0.0, "X_f": 0.0, "p_target": None},
+    "EvtSwitch": {"time": 0.0, "hrtime": 0, "mtime": 0, "i_switch": 0, "p_target": None},
+    "IntMon": {"obj_id": None},
+    "ComLdf": {"iopt_sim": 0, "iopt_noinit": 0},
+    "ComInc": {"iopt_sim": "rms", "iopt_net": "sym", "dtgrd": 0.01, "dtgrd_max": 0.01, "dtemt": 0.0001, "dtemt_max": 0.0001, "p_resvar": None},
+    "ComSim": {"tstop": 10.0},
+    "ComRes": {"pResult": None, "iopt_exp": 4, "f_name": "", "iopt_csel": 0, "resultobj": [], "element": [],
+               "cvariable": [], "iopt_tsel": 0},
+}
+
+# Phasenlage der Leiter A, B, C in rad
+PHASE_ANGLE = {"A": 0.0, "B": -2*np.pi/3, "C": 2*np.pi/3}
+
+
+def _match(obj, pattern):
+    """ Prüft, ob obj dem PowerFactory-Suchmuster "<Name>.<Klasse>" oder "<Name>" entspricht (ohne Groß-/Kleinschreibung). """
+    pattern = pattern.lower()
+    if "." in pattern:
+        name, _, class_name = pattern.rpartition(".")
+        return fnmatchcase(obj.GetClassName().lower(), class_name) and fnmatchcase(obj.loc_name.lower(), name)
+    return fnmatchcase(obj.loc_name.lower(), pattern)
+
+
+class DataObject:
+    """ DataObject: class
+
+    Ersatz für ein PowerFactory-Objekt. Attribute werden in einem dictionary gehalten, damit
+    Lese-/Schreibzugriffe gezählt, verzögert und im aktiven Betriebsfall aufgezeichnet werden können.
+    """
+
+    def __init__(self, app, class_name, loc_name, parent=None, **attributes):
+        object.__setattr__(self, "_app", app)
+        object.__setattr__(self, "_cls", class_name)
+        object.__setattr__(self, "_parent", parent)
+        object.__setattr__(self, "_children", [])
+        values = dict(CLASS_DEFAULTS.get(class_name, {}))
+        values.update(outserv=0, loc_name=loc_name)
+        values.update(attributes)
+        object.__setattr__(self, "_attrs", values)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        attrs = object.__getattribute__(self, "_attrs")
+        self._app._tick("get")
+        if name not in attrs:
+            raise AttributeError("{} has no attribute '{}'".format(self._cls, name))
+        return attrs[name]
+
+    def __setattr__(self, name, value):
+        self._app._tick("set")
+        scenario = self._app._active_scenario
+        if scenario is not None and self._cls.startswith("Elm") and not name == "loc_name":
+            scenario._record(self, name)
+        self._attrs[name] = value
+
+    def __dir__(self):
+        # Wie PowerFactory: dir() listet die Parameter des Objekts
+        return list(self._attrs) + ["GetClassName", "GetParent", "GetFullName", "GetContents"]
+
+    def _set_raw(self, name, value):
+        self._attrs[name] = value
+
+    def __repr__(self):
+        return "{}.{}".format(self._attrs["loc_name"], self._cls)
+
+    def GetClassName(self):
+        return self._cls
+
+    def GetParent(self):
+        return self._parent
+
+    def GetFullName(self):
+        if self._parent is None:
+            return "\\{}".format(self)
+        return "{}\\{}".format(self._parent.GetFullName(), self)
+
+    def GetContents(self, pattern="*", recursive=0):
+        self._app._tick("GetContents")
+        objects = []
+        for child in self._children:
+            if _match(child, pattern):
+                objects.append(child)
+            if recursive:
+                objects.extend(child.GetContents(pattern, recursive)[0])
+        return [objects]
+
+    def CreateObject(self, class_name, *name):
+        self._app._tick("CreateObject")
+        obj = CLASSES.get(class_name, DataObject)(self._app, class_name, "".join(str(x) for x in name), parent=self)
+        self._children.append(obj)
+        return [obj]
+
+    def Delete(self):
+        self._app._tick("Delete")
+        if self._parent is not None and self in self._parent._children:
+            self._parent._children.remove(self)
+        return 0
+
+
+class IntScenario(DataObject):
+    """ Betriebsfall: speichert die im aktiven Zustand geänderten Attribute der Netzelemente (Elm*). """
+
+    def __init__(self, *args, **kwargs):
+        DataObject.__init__(self, *args, **kwargs)
+        object.__setattr__(self, "_saved", {})
+        object.__setattr__(self, "_changes", {})
+        object.__setattr__(self, "_backup", {})
+
+    def _record(self, obj, name):
+        # Grundwert vor der ersten Änderung sichern, Änderung merken
+        key = (obj, name)
+        if key not in self._backup:
+            self._backup[key] = obj._attrs.get(name)
+        self._changes[key] = True
+
+    def Activate(self):
+        self._app._tick("Activate")
+        if self._app._active_scenario is not None:
+            self._app._active_scenario.Deactivate()
+        for (obj, name), value in self._saved.items():
+            self._backup.setdefault((obj, name), obj._attrs.get(name))
+            obj._set_raw(name, value)
+        object.__setattr__(self._app, "_active_scenario", self)
+        return 0
+
+    def Save(self):
+        self._app._tick("Save")
+        for obj, name in self._changes:
+            self._saved[(obj, name)] = obj._attrs.get(name)
+        self._changes.clear()
+        return 0
+
+    def Deactivate(self):
+        self._app._tick("Deactivate")
+        for (obj, name), value in self._backup.items():
+            obj._set_raw(name, value)
+        self._backup.clear()
+        self._changes.clear()
+        if self._app._active_scenario is self:
+            object.__setattr__(self._app, "_active_scenario", None)
+        return 0
+
+
+class IntMon(DataObject):
+    """ Variablenauswahl eines Ergebnisobjekts. """
+
+    def __init__(self, *args, **kwargs):
+        DataObject.__init__(self, *args, **kwargs)
+        self._set_raw("vars", [])
+
+    def AddVar(self, var):
+        self._app._tick("AddVar")
+        if var not in self._attrs["vars"]:
+            self._attrs["vars"].append(var)
+        return 0
+
+    def ClearVars(self):
+        self._app._tick("ClearVars")
+        self._set_raw("vars", [])
+        return 0
+
+
+class ElmTerm(DataObject):
+    def GetConnectedCubicles(self):
+        self._app._tick("GetConnectedCubicles")
+        return [x for x in self._children if x.GetClassName() == "StaCubic"]
+
+
+class StaCubic(DataObject):
+    def GetBranch(self):
+        self._app._tick("GetBranch")
+        return self._attrs.get("obj_id")
+
+
+class SetDesktop(DataObject):
+    def GetPage(self, name, create=0):
+        self._app._tick("GetPage")
+        pages = self.GetContents("{}.SetVipage".format(name))[0]
+        if not pages and create:
+            pages = self.CreateObject("SetVipage", name)
+        return pages
+
+
+class SetVipage(DataObject):
+    def GetVI(self, name, class_name="VisPlot", create=0):
+        self._app._tick("GetVI")
+        plots = self.GetContents("{}.{}".format(name, class_name))[0]
+        if not plots and create:
+            plots = self.CreateObject(class_name, name)
+        return plots
+
+
+class VisPlot(DataObject):
+    def __init__(self, *args, **kwargs):
+        DataObject.__init__(self, *args, **kwargs)
+        self._set_raw("curves", [])
+
+    def AddResVars(self, result, element, *variables):
+        self._app._tick("AddResVars")
+        for var in variables:
+            self._attrs["curves"].append((result, element, var))
+        return 0
+
+    def Clear(self):
+        self._app._tick("Clear")
+        self._set_raw("curves", [])
+        return 0
+
+
+class ElmRes(DataObject):
+    """ Ergebnisobjekt: enthält nach ComSim.Execute den Zustand der letzten Simulation (_data). """
+
+    def __init__(self, *args, **kwargs):
+        DataObject.__init__(self, *args, **kwargs)
+        object.__setattr__(self, "_data", None)
+
+
+class ComLdf(DataObject):
+    def Execute(self):
+        self._app._command("ComLdf")
+        return 0
+
+
+class ComInc(DataObject):
+    def Execute(self):
+        self._app._command("ComInc")
+        return 0
+
+
+class ComSim(DataObject):
+    def Execute(self):
+        app = self._app
+        initial_conditions = app.GetFromStudyCase("ComInc")
+        flag_emt = initial_conditions.iopt_sim == "ins"
+        dt = initial_conditions.dtemt if flag_emt else initial_conditions.dtgrd
+        result = initial_conditions.p_resvar or app.GetFromStudyCase("*.ElmRes")
+        data = app._fault_state()
+        data["t"] = np.arange(0.0, self.tstop + dt/2, dt)
+        data["flag_emt"] = flag_emt
+        object.__setattr__(result, "_data", data)
+        app._command("ComSim", sim_time=self.tstop)
+        return 0
+
+
+class ComRes(DataObject):
+    def Execute(self):
+        app = self._app
+        result = self.pResult
+        if result is None or result._data is None:
+            return 1
+        data = result._data
+        columns, header_obj, header_var = [], [], []
+        for element, var in zip(self.element, self.cvariable):
+            if var == "b:tnow":
+                columns.append(data["t"])
+                header_obj.append(element.loc_name)
+                header_var.append("b:tnow in s")
+            else:
+                columns.append(synthetic_signal(var, data))
+                header_obj.append(element.loc_name)
+                header_var.append(var)
+        fname = self.f_name
+        if app.output_dir is not None:
+            fname = os.path.join(app.output_dir, re.split(r"[\\/]", fname)[-1])
+        with open(fname, "w") as f:
+            f.write("\t".join(header_obj) + "\n")
+            f.write("\t".join(header_var) + "\n")
+            np.savetxt(f, np.column_stack(columns), fmt="%.6f", delimiter="\t")
+        app._command("ComRes")
+        app.exported.append(fname)
+        return 0
+
+
+CLASSES = {"IntScenario": IntScenario, "IntMon": IntMon, "ElmTerm": ElmTerm, "StaCubic": StaCubic,
+           "SetDesktop": SetDesktop, "SetVipage": SetVipage, "VisPlot": VisPlot, "ElmRes": ElmRes,
+           "ComLdf": ComLdf, "ComInc": ComInc, "ComSim": ComSim, "ComRes": ComRes}
+
+
+def _recovery(t, t_off, pre, fault, tau):
+    """ Verlauf: pre bis zum Fehlereintritt, fault während des Fehlers, danach exponentiell zurück auf pre. """
+    return np.where(t < t_off, fault, pre + (fault - pre)*np.exp(-(t - t_off)/tau))
+
+
+def synthetic_signal(var, data):
+    """ synthetic_signal: function
+        Berechnet den synthetischen Verlauf der Variable var (z.B. 'm:u1:bus1', 'n:ul:bus1:A', 'm:I1Q:bus2')
+        aus dem Zustand der Simulation data (siehe StandinApp._fault_state).
+    """
+    t = data["t"]
+    parts = var.split(":")
+    quantity = parts[1] if len(parts) > 1 else var
+    phase = parts[3] if len(parts) > 3 else None
+    t_on, t_off = data["t_on"], data["t_off"]
+    u_pre, u_fault = data["u_pre"], data["u_fault"]
+    during = (t >= t_on) & (t < t_off)
+    after = t >= t_off
+
+    def voltage(flag_affected):
+        u = np.full(t.shape, u_pre)
+        if flag_affected:
+            u[during] = u_fault
+            u[after] = _recovery(t[after], t_off, u_pre, u_fault, 0.02)
+        return u
+
+    # Spannungen
+    if quantity in ("u", "ul", "u1"):
+        if quantity == "u1":
+            # Mitsystem: Mittelwert der Leiterspannungen
+            u = sum(voltage(x in data["phases"]) for x in "ABC")/3
+        else:
+            u = voltage(phase in data["phases"])
+        if data["flag_emt"] and phase is not None:
+            return u*np.sqrt(2)*np.sin(2*np.pi*50*t + PHASE_ANGLE.get(phase, 0.0))
+        return u
+    # Ströme: Blindstrom proportional zur Spannungsabweichung (k=2), Wirkstrom auf 1.1 p.u. begrenzt
+    if quantity in ("I", "I1", "I1P", "I1Q"):
+        u1 = sum(voltage(x in data["phases"]) for x in "ABC")/3
+        iq = np.clip(data["q_pre"] + 2*(u_pre - u1), -1.1, 1.1)
+        ip = np.minimum(data["p_pre"], np.sqrt(1.1**2 - iq**2))
+        if quantity == "I1P":
+            return ip
+        if quantity == "I1Q":
+            return iq
+        i = np.sqrt(ip**2 + iq**2)
+        if data["flag_emt"] and phase is not None:
+            return i*np.sqrt(2)*np.sin(2*np.pi*50*t + PHASE_ANGLE.get(phase, 0.0) - np.arctan2(iq, ip))
+        return i
+    # Polradwinkel der Synchronmaschine: Anstieg während des Fehlers, gedämpfte Pendelung danach
+    if quantity.startswith("fi"):
+        fi = np.full(t.shape, 30.0)
+        fi[during] += 20*(1 - u_fault)*(t[during] - t_on)/max(t_off - t_on, 1e-6)
+        fi[after] += 20*(1 - u_fault)*np.exp(-(t[after] - t_off)/0.5)*np.cos(2*np.pi*1.5*(t[after] - t_off))
+        return fi
+    return np.zeros(t.shape)
+
+
+class StandinScript:
+    """ Ersatz für app.GetCurrentScript(): Eingabeparameter als Attribute. """
+
+    def __init__(self, **params):
+        self.__dict__.update(params)
+
+
+class StandinApp:
+    """ StandinApp: class
+
+    Ersatz für das PowerFactory Application Object mit Parkaufbau gemäß FGW TR8.
+
+    Attributes:
+    ----------
+    output_dir: str or None
+        Verzeichnis für die mit ComRes exportierten Dateien. Der Pfad in ComRes.f_name wird durch
+        dieses Verzeichnis ersetzt (nur der Dateiname wird übernommen). None: f_name unverändert.
+    call_latency: float
+        Wartezeit in s je Aufruf (Lese-/Schreibzugriff und Methodenaufruf)
+    command_latency: dict
+        Wartezeit in s je Ausführung eines Befehls, z.B. {"ComLdf": 0.2, "ComInc": 0.5, "ComRes": 0.05}
+    sim_factor: float
+        Wartezeit von ComSim in s je simulierter Sekunde (z.B. 0.1 -> 60 s-Versuch dauert 6 s)
+    num_calls: dict
+        Anzahl der Aufrufe je Methode ('get', 'set', 'GetContents', 'ComSim', ...)
+    exported: list
+        Pfade der exportierten Dateien
+    """
+
+    def __init__(self, output_dir=None, call_latency=0.0, command_latency=None, sim_factor=0.0,
+                 num_eze=2, script_params=None, flag_print=False):
+        """
+        Parameters
+        ----------
+        output_dir, call_latency, command_latency, sim_factor:
+            siehe Attributes
+        num_eze: int
+            Anzahl der statischen Generatoren (EZE) mit Anschlussleitung xEZE im Parkaufbau
+        script_params: dict (optional)
+            Eingabeparameter für GetCurrentScript (projektnummer, vde, type, t_sim, ...)
+        flag_print: bool
+            True: PrintPlain/PrintInfo/PrintWarn/PrintError werden mit print ausgegeben
+        """
+        object.__setattr__(self, "_active_scenario", None)
+        self.output_dir = output_dir
+        self.call_latency = call_latency
+        self.command_latency = dict(command_latency or {})
+        self.sim_factor = sim_factor
+        self.flag_print = flag_print
+        self.num_calls = {}
+        self.exported = []
+        self.output = []
+        self._script = StandinScript(**(script_params or {}))
+        self._build_project(num_eze)
+
+    def _tick(self, name):
+        self.num_calls[name] = self.num_calls.get(name, 0) + 1
+        if self.call_latency:
+            sleep(self.call_latency)
+
+    def _command(self, class_name, sim_time=0.0):
+        self._tick(class_name)
+        latency = self.command_latency.get(class_name, 0.0) + self.sim_factor*sim_time
+        if latency:
+            sleep(latency)
+
+    def _build_project(self, num_eze):
+        """ Erstellt Projektordner, Berechnungsfall und Parkaufbau (Ersatzschaltbild gemäß FGW TR8). """
+        self.project = DataObject(self, "IntPrj", "Standin")
+        self.folders = {}
+        for name in ["scen", "netdat", "study"]:
+            self.folders[name] = self.project.CreateObject("IntPrjfolder", name)[0]
+        self.study_case = self.folders["study"].CreateObject("IntCase", "Study Case")[0]
+        grid = self.folders["netdat"].CreateObject("ElmNet", "Park")[0]
+
+        term = grid.CreateObject("ElmTerm", "ideales Netz")[0]
+        term_nvp = grid.CreateObject("ElmTerm", "NVP")[0]
+        for name in ["vac_gleich", "vac_vorg", "vac_sprung"]:
+            grid.CreateObject("ElmVac", name)[0]._set_raw("bus1", term)
+        for name in ["sind_gleich", "sind_vorg"]:
+            grid.CreateObject("ElmSind", name)
+        for name, nphase in [("ls_sprung_sym", 3), ("ls_sprung_unsym", 2)]:
+            grid.CreateObject("ElmCoup", name)[0]._set_raw("nphase", nphase)
+        line_nap = grid.CreateObject("ElmLne", "xNAP")[0]
+        cub = term_nvp.CreateObject("StaCubic", "Cub_1")[0]
+        cub._set_raw("obj_id", line_nap)
+        grid.CreateObject("ElmLne", "xMS")
+        grid.CreateObject("ElmTr2", "xNS")
+        for i in range(num_eze):
+            grid.CreateObject("ElmLne", "xEZE{} bus2".format(i + 1))
+            grid.CreateObject("ElmGenstat", "EZE{} Neu".format(i + 1))[0]._set_raw("pgini", 2.0)
+        grid.CreateObject("ElmSym", "xVKM BDEW")
+
+        for class_name, name in [("IntEvt", "Simulation Events/Fault"), ("ElmRes", "All calculations"),
+                                 ("ComLdf", "Load Flow Calculation"), ("ComInc", "Calculation of initial conditions"),
+                                 ("ComSim", "Run Simulation"), ("ComRes", "Result Export")]:
+            self.study_case.CreateObject(class_name, name)
+        self.graphics_board = self.study_case.CreateObject("SetDesktop", "Graphics Board")[0]
+
+    def _fault_state(self):
+        """ Ermittelt aus den aktiven Fehlerereignissen und dem Ersatzschaltbild den Zustand für synthetic_signal. """
+        vacs = [x for x in self.GetCalcRelevantObjects("*.ElmVac") if "sprung" not in x.loc_name.lower()]
+        vac_on = next((x for x in vacs if not x.outserv), vacs[0])
+        u_pre = vac_on.usetp
+        state = {"t_on": np.inf, "t_off": np.inf, "u_pre": u_pre, "u_fault": u_pre, "phases": "ABC"}
+        events = self.GetFromStudyCase("IntEvt").GetContents("*.Evt*")[0]
+        for event in events:
+            if event.outserv:
+                continue
+            if event.GetClassName() == "EvtShc":
+                if event.i_shc == 4:
+                    state["t_off"] = event.time
+                    continue
+                state["t_on"] = event.time
+                Zf = complex(event.R_f, event.X_f)
+                Za = complex(vac_on.R1, vac_on.X1)
+                state["u_fault"] = u_pre*abs(Zf)/abs(Za + Zf) if abs(Za + Zf) > 0 else 0.0
+                state["phases"] = {0: "ABC", 1: "AB", 2: "A", 3: "AB"}.get(event.i_shc, "ABC")
+            elif event.GetClassName() == "EvtSwitch":
+                if event.i_switch == 0:
+                    state["t_off"] = event.time
+                    continue
+                state["t_on"] = event.time
+                state["u_fault"] = self.GetCalcRelevantObjects("*sprung*.ElmVac")[0].usetp
+                nphase = event.p_target.nphase if event.p_target is not None else 3
+                state["phases"] = "ABC" if nphase == 3 else "AB"
+        # Blindleistung vor dem Fehler aus dem Sollwert des Anlagenreglers (bezogen auf die Anlagenwirkleistung)
+        eze = self.GetCalcRelevantObjects("*.ElmGenstat") + self.GetCalcRelevantObjects("*.ElmSym")
+        p_sum = sum(x.pgini*x.ngnum for x in eze)
+        controller = self.GetCalcRelevantObjects("*.ElmStactrl")
+        q_set = controller[0].qsetp if controller and not controller[0].outserv else 0.0
+        state["p_pre"] = 1.0
+        state["q_pre"] = float(np.clip(q_set/p_sum, -1.0, 1.0)) if p_sum else 0.0
+        return state
+
+    # Schnittstelle des Application Object
+    def GetCalcRelevantObjects(self, pattern="*.*"):
+        self._tick("GetCalcRelevantObjects")
+        objects = self.folders["netdat"].GetContents("*", 1)[0]
+        return [x for x in objects if x.GetClassName().startswith("Elm") and not x.GetClassName() == "ElmNet" and _match(x, pattern)]
+
+    def GetFromStudyCase(self, name):
+        self._tick("GetFromStudyCase")
+        pattern = name if "." in name else "*.{}".format(name)
+        objects = self.study_case.GetContents(pattern)[0]
+        if objects:
+            return objects[0]
+        # PowerFactory erstellt das Objekt, wenn es im Berechnungsfall nicht vorhanden ist
+        class_name = pattern.rpartition(".")[2]
+        return self.study_case.CreateObject(class_name, name.rpartition(".")[0].strip("*") or class_name)[0]
+
+    def GetProjectFolder(self, name):
+        self._tick("GetProjectFolder")
+        return self.folders.get(name)
+
+    def GetActiveProject(self):
+        return self.project
+
+    def GetActiveScenario(self):
+        return self._active_scenario
+
+    def ActivateProject(self, name):
+        self._tick("ActivateProject")
+        return 0
+
+    def GetCurrentScript(self):
+        return self._script
+
+    def GetGraphicsBoard(self):
+        return self.graphics_board
+
+    def EchoOff(self):
+        pass
+
+    def EchoOn(self):
+        pass
+
+    def ClearOutputWindow(self):
+        self.output.clear()
+
+    def _print(self, text):
+        self.output.append(str(text))
+        if self.flag_print:
+            print(text)
+
+    def PrintPlain(self, text):
+        self._print(text)
+
+    def PrintInfo(self, text):
+        self._print(text)
+
+    def PrintWarn(self, text):
+        self._print(text)
+
+    def PrintError(self, text):
+        self._print(text)
+
+    def __repr__(self):
+        return "StandinApp(output_dir={}, calls={})".format(self.output_dir, sum(self.num_calls.values()))
+
+
+class StandinEngine:
+    """ StandinEngine: class
+
+    Picklebare Fabrik für StandinApp, z.B. als engine_factory für runner.run_parallel.
+    Die Argumente werden an StandinApp übergeben.
+    """
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+
+    def __call__(self, worker=0):
+        return StandinApp(**self.kwargs)
+
+    def activate(self, app, worker=0):
+        # Jede StandinApp enthält genau ein Projekt
+        return app
+
+    def __repr__(self):
+        return "StandinEngine({})".format(self.kwargs)
@@ -0,0 +1,126 @@
+""" pipeline.py
+
+Überlappende Nachbearbeitung der Exporte mit der Simulation des nächsten Versuchs.
+
+Ohne Pipeline läuft je Versuch strikt nacheinander: Simulation, Export (ComRes), Aufteilen/Dezimieren
+der Exportdateien, Ergebnisdatei, Ergebniscache, nächster Versuch. PowerFactory wartet dabei auf die
+Dateiverarbeitung in Python. Mit Pipeline bleibt nur ComRes im Ablauf des Versuchs (die Ergebnisse im
+ElmRes werden von der nächsten Simulation überschrieben); die Verarbeitung der Exportdateien wird an
+einen Threadpool übergeben und läuft parallel zur Simulation des nächsten Versuchs.
+
+Threads statt Prozesse: die Nachbearbeitung besteht aus Datei-I/O sowie pandas/numpy und gibt den
+GIL weitgehend frei; die Daten müssen nicht zwischen Prozessen kopiert werden.
+Ist im aufrufenden Thread eine Instrumentation aktiv, werden die Messpunkte der Aufgaben mit aufgezeichnet.
+
+Beispiel:
+    with Pipeline(max_workers=2) as pipeline:
+        execute_simulation(..., pipeline=pipeline)
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from main.instrumentation import get_active
+
+
+class Pipeline:
+    """ Pipeline: class
+
+    Threadpool für die Nachbearbeitung der Versuche mit begrenzter Anzahl offener Aufgaben.
+
+    Attributes:
+    ----------
+    max_workers: int
+        Anzahl der Threads
+    max_pending: int
+        Maximale Anzahl offener Aufgaben. submit wartet, bis eine Aufgabe abgeschlossen ist
+        (begrenzt den Rückstand, wenn die Nachbearbeitung langsamer als die Simulation ist)
+
+    Methods:
+    -------
+    submit:
+        Übergibt eine Aufgabe
+    check:
+        Löst die erste Exception einer bereits abgeschlossenen Aufgabe erneut aus (ohne zu warten)
+    wait:
+        Wartet auf alle Aufgaben und löst die erste Exception einer Aufgabe erneut aus
+    """
+
+    def __init__(self, max_workers=2, max_pending=4, logger=None):
+        self.max_workers = max_workers
+        self.max_pending = max(1, max_pending)
+        self.logger = logger
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pipeline")
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._futures = []
+
+    def submit(self, name, function, *args, **kwargs):
+        """ submit: method
+            Übergibt function(*args, **kwargs) unter dem Namen name (z.B. "Versuch5") an den Threadpool.
+        """
+        instrumentation = get_active()
+        self._slots.acquire()
+
+        def task():
+            if instrumentation is not None:
+                instrumentation.activate()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                if instrumentation is not None:
+                    instrumentation.deactivate()
+                self._slots.release()
+
+        future = self._executor.submit(task)
+        self._futures.append((name, future))
+        return future
+
+    def check(self):
+        """ check: method
+            Prüft die abgeschlossenen Aufgaben, ohne auf offene zu warten (z.B. nach jedem Versuch), damit ein Fehler
+            der Nachbearbeitung den Lauf sofort und nicht erst am Ende abbricht. Der erste Fehler wird erneut ausgelöst.
+        """
+        done = [(name, future) for name, future in self._futures if future.done()]
+        self._futures = [(name, future) for name, future in self._futures if not future.done()]
+        for name, future in done:
+            exception = future.exception()
+            if exception is not None:
+                if self.logger is not None:
+                    self.logger.error("Pipeline: Nachbearbeitung {} fehlgeschlagen: {!r}".format(name, exception))
+                raise exception
+
+    def wait(self):
+        """ wait: method
+            Wartet auf alle übergebenen Aufgaben. Fehler werden protokolliert, der erste wird erneut ausgelöst.
+        """
+        error = None
+        for name, future in self._futures:
+            exception = future.exception()
+            if exception is not None:
+                if self.logger is not None:
+                    self.logger.error("Pipeline: Nachbearbeitung {} fehlgeschlagen: {!r}".format(name, exception))
+                error = error or exception
+        self._futures = []
+        if error is not None:
+            raise error
+
+    def shutdown(self):
+        """ shutdown: method
+            Wartet auf alle Aufgaben und beendet die Threads.
+        """
+        try:
+            self.wait()
+        finally:
+            self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.shutdown()
+        else:
+            # Ursprüngliche Exception nicht durch Fehler der Nachbearbeitung verdecken
+            self._executor.shutdown(wait=True)
+
+    def __repr__(self):
+        return "Pipeline(max_workers={}, pending={})".format(self.max_workers, sum(not future.done() for _, future in self._futures))
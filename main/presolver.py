@@ -0,0 +1,216 @@
+""" presolver.py
+
+Analytischer Vorlöser (Zeigerrechnung) für die Vorfehler- und Fehlerspannungen aller Versuche.
+
+Rf/Xf werden mit den geschlossenen Formeln der FGW TR8 aus der Netzimpedanz Za berechnet
+(siehe faults.calc_fault_impedance), die Einspeisung des Parks und die Serienimpedanz Zb bleiben dabei
+unberücksichtigt. Ob die Restspannung uf tatsächlich erreicht wird, zeigt sonst erst ComSim. Der Vorlöser
+berechnet die Spannungen im Ersatzschaltbild aus calc_grid_data für alle Versuche gemeinsam (numpy)
+in Millisekunden:
+
+    ElmVac (E, Za, Z0) -- Klemme "ideales Netz" (Fehlerort, Zf) -- ElmSind (Zb) -- NVP -- Park
+
+    Vorfehler: |U_NVP| = uv (Regelung der Spannungsquelle auf den NVP), Park mit P und Q je qset
+               (Erzeugerzählpfeilsystem) -> Strom des Parks, Spannung am Fehlerort, Quellenspannung E
+    Fehler:    symmetrische Komponenten am Fehlerort, Mit- und Gegensystem Za, Nullsystem Z0;
+               3-polig: Zf, 2-polig: Z1 + Z2 + Zf, 1-polig: Z1 + Z2 + Z0 + 3 Zf.
+               Park als Stromquelle im Mitsystem: Wirkstrom wie vor dem Fehler, Blindstrom
+               iq = iq_pre + k*ΔU*In, Strombetrag auf i_max*In begrenzt (Blindstromvorrang)
+    OVRT:      Schalterereignisse (Rf=None) setzen die Spannung am Fehlerort über U_Sprung auf uf
+               (ideale Quelle, auch bei zweipoligem Zuschalten als symmetrisch angenommen)
+
+Alle Spannungen in p.u. bezogen auf Uc (wie uf und uv), Leistungen in MW/Mvar. Die Prüfung
+(siehe LIMITS) erkennt ungültige Fehlerimpedanzen, Restspannungen, die deutlich von uf abweichen,
+und Arbeitspunkte, die eine unrealistische Quellenspannung erfordern. Bei 1-poligen Fehlern setzt die
+TR8-Formel Z0 = Za voraus; bei isoliertem oder kompensiertem Sternpunkt (Z0 >> Za) bricht die Leiter-Erde-
+Spannung des fehlerbehafteten Leiters nahezu vollständig ein, der Vorlöser meldet dann die Abweichung von uf.
+
+Beispiel:
+    df = presolve(grid_model, p_park=park_active_power(obj_index))
+    df.loc[~df["passed"], ["test", "uf", "u_res", "du", "e"]]
+"""
+import numpy as np
+import pandas as pd
+
+from main.fault_table import FaultTable
+from main.symcomp import A
+
+# Grenzwerte der Prüfung
+LIMITS = {"du_max": 0.05,  # Abweichung der Restspannung am Fehlerort von uf in p.u.
+          "e_max": 1.2}  # Betrag der Quellenspannung E vor dem Fehler in p.u.
+
+# Blindleistung des Parks je qset als Anteil der Wirkleistung im Erzeugerzählpfeilsystem: untererregt nimmt
+# Blindleistung auf (Q < 0), übererregt gibt Blindleistung ab (Q > 0). Der Betrag 0.33 entspricht dem Anlagenregler,
+# dessen Sollwert qsetp ist aber im Verbraucherzählpfeilsystem angegeben (untererregt: positives Vorzeichen).
+Q_FACTOR = {"0": 0.0, "untererregt": -0.33, "uebererregt": 0.33}
+
+
+def park_active_power(obj_index):
+    """ park_active_power: function
+        Gibt die Wirkleistung des Parks in MW zurück (Summe pgini*ngnum der Synchrongeneratoren und
+        statischen Generatoren, wie set_load_flow_controller).
+    """
+    generators = obj_index.get('*.ElmSym') + obj_index.get('*.ElmGenstat')
+    return float(sum(eze.pgini*eze.ngnum for eze in generators))
+
+
+def _fault_columns(faults):
+    """ Gibt die Fehlertabelle als FaultTable zurück (Liste von Faults_values/FaultRecord wird umgewandelt). """
+    if isinstance(faults, FaultTable):
+        return faults
+    faults = list(faults)
+    return FaultTable.from_rows([fault.params() for fault in faults],
+                                Rf=[np.nan if fault.Rf is None else fault.Rf for fault in faults],
+                                Xf=[np.nan if fault.Xf is None else fault.Xf for fault in faults])
+
+
+def _line_voltages(u0, u1, u2):
+    """ Gibt die Beträge der Leiter-Erde- und Leiter-Leiter-Spannungen (je Spalte A, B, C bzw. AB, BC, CA) zurück. """
+    ua, ub, uc = u0 + u1 + u2, u0 + A*A*u1 + A*u2, u0 + A*u1 + A*A*u2
+    ln = np.abs(np.stack([ua, ub, uc], axis=-1))
+    ll = np.abs(np.stack([ua - ub, ub - uc, uc - ua], axis=-1))/np.sqrt(3)
+    return ln, ll
+
+
+def presolve(grid_model, faults=None, p_park=0.0, q_park=None, s_rated=None, k=2.0, i_max=1.1, limits=None,
+             iterations=50):
+    """ presolve: function
+        Berechnet Vorfehler- und Fehlerspannungen aller Versuche im Ersatzschaltbild (siehe Modulbeschreibung).
+
+    Parameters
+    ----------
+    grid_model: GridModel
+        Netzmodell des Laufs (Ersatzschaltbild aus calc_grid_data, grid_Uc)
+    faults: FaultTable or list (optional)
+        Versuche mit Rf/Xf. Default: None -> grid_model.list_of_faults
+    p_park: float
+        Wirkleistung des Parks am NVP in MW (z.B. park_active_power). 0: Netz ohne Park
+    q_park: dictionary (optional)
+        Blindleistung des Parks in Mvar je qset (Erzeugerzählpfeilsystem, positiv: übererregt).
+        Default: None -> Q_FACTOR*p_park
+    s_rated: float (optional)
+        Bemessungsleistung des Parks in MVA (Bezug für k und i_max). Default: None -> größte Scheinleistung aus p_park/q_park
+    k: float
+        k-Faktor der Blindstromstützung (ΔIq/ΔU bezogen auf den Bemessungsstrom)
+    i_max: float
+        maximaler Strom des Parks bezogen auf den Bemessungsstrom
+    limits: dictionary (optional)
+        Grenzwerte (siehe LIMITS). Default: LIMITS
+    iterations: int
+        Anzahl der Bisektionsschritte für die spannungsabhängige Stromquelle des Parks
+
+    Returns
+    -------
+    df: pandas.DataFrame
+        Eine Zeile je Versuch: test, fault_type, phases, grid, qset, uv, uf, Rf, Xf, e (Quellenspannung),
+        u_pre (Fehlerort vor dem Fehler), u1, u2, u0 (Fehlerort während des Fehlers), u_res (Restspannung am
+        Fehlerort: kleinste Leiter-Leiter-Spannung, 1-polig kleinste Leiter-Erde-Spannung), u_res_nvp (kleinste
+        Leiter-Leiter-Spannung am NVP), du (u_res - uf), converged (nur Meldung), pass_rf, pass_uf, pass_e und passed
+    """
+    limits = dict(LIMITS, **(limits or {}))
+    table = _fault_columns(grid_model.list_of_faults if faults is None else faults)
+    columns = ["test", "fault_type", "phases", "grid", "qset", "uv", "uf", "Rf", "Xf"]
+    df = pd.DataFrame({column: table[column] for column in columns})
+    if not len(table):
+        return df
+
+    # Impedanzen in p.u. (Bezug Uc, 1 MVA)
+    z_base = grid_model.grid_Uc**2
+    flag_gleich = table["grid"] == "g"
+    za = np.where(flag_gleich, grid_model.grid_Ra_gleich + 1j*grid_model.grid_Xa_gleich,
+                  grid_model.grid_Ra_vorg + 1j*grid_model.grid_Xa_vorg)/z_base
+    zb = np.where(flag_gleich, grid_model.grid_Rb_gleich + 1j*grid_model.grid_Xb_gleich,
+                  grid_model.grid_Rb_vorg + 1j*grid_model.grid_Xb_vorg)/z_base
+    z0 = (grid_model.grid_R0 + 1j*grid_model.grid_X0)/z_base
+    zf = (table["Rf"] + 1j*table["Xf"])/z_base
+    fault_type = table["fault_type"]
+    flag_switch = table["uf"] > 1
+
+    # Park: Scheinleistung je Versuch (qset), Bemessungsstrom
+    if q_park is None:
+        q_park = {qset: factor*p_park for qset, factor in Q_FACTOR.items()}
+    q = np.array([q_park.get(qset, 0.0) for qset in table["qset"]], dtype=float)
+    s = p_park + 1j*q
+    if s_rated is None:
+        s_rated = max([abs(complex(p_park, value)) for value in q_park.values()] + [abs(p_park)])
+    i_n = s_rated or 1.0
+
+    # Vorfehler: Spannung am NVP geregelt (Winkel 0), Strom des Parks in das Netz
+    u_nvp = table["uv"].astype(complex)
+    i_pre = np.conj(s/u_nvp)
+    u_pre = u_nvp - zb*i_pre
+    e = u_pre - za*i_pre
+    ip_pre, iq_pre = p_park/np.abs(u_nvp), q/np.abs(u_nvp)
+
+    def fault_state(x):
+        """ Spannungen am Fehlerort und am NVP, wenn der Park mit dem Strom für |U_NVP| = x einspeist. """
+        # Blindstromstützung mit Begrenzung (Blindstromvorrang), Winkel bezogen auf den Vorfehlerwinkel am NVP (0)
+        iq = np.clip(iq_pre + k*(np.abs(u_nvp) - x)*i_n, -i_max*i_n, i_max*i_n)
+        ip = np.minimum(ip_pre, np.sqrt(np.clip((i_max*i_n)**2 - iq**2, 0.0, None)))
+        i_park = ip - 1j*iq
+        # Ersatzspannungsquelle am Fehlerort: E über Za und eingespeister Strom des Parks
+        v_th = e + za*i_park
+        i1 = np.select([fault_type == 1, fault_type == 2],
+                       [v_th/(2*za + zf), v_th/(2*za + z0 + 3*zf)], v_th/(za + zf))
+        u1 = v_th - za*i1
+        u2 = np.select([fault_type == 1, fault_type == 2], [za*i1, -za*i1], 0)
+        u0 = np.where(fault_type == 2, -z0*i1, 0)
+        # Spannungssprung (OVRT): Spannung am Fehlerort durch U_Sprung eingeprägt
+        u1 = np.where(flag_switch, table["uf"]*np.exp(1j*np.angle(u_pre)), u1)
+        u2 = np.where(flag_switch, 0, u2)
+        u0 = np.where(flag_switch, 0, u0)
+        return u0, u1, u2, u1 + zb*i_park
+
+    # Fehler: Betrag der Spannung am NVP x mit |U_NVP(x)| = x durch Bisektion (der Strom des Parks ist
+    # begrenzt, daher ist |U_NVP(x)| - x bei x = 0 nicht negativ und für große x negativ)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        lower, upper = np.zeros(len(table)), np.full(len(table), 2.0)
+        for _ in range(30):
+            flag_low = np.abs(fault_state(upper)[3]) > upper
+            if not flag_low.any():
+                break
+            upper = np.where(flag_low, 2*upper, upper)
+        for _ in range(max(1, iterations)):
+            x = 0.5*(lower + upper)
+            flag_low = np.abs(fault_state(x)[3]) > x
+            lower, upper = np.where(flag_low, x, lower), np.where(flag_low, upper, x)
+        x = 0.5*(lower + upper)
+        u0, u1, u2, u1_nvp = fault_state(x)
+        # Versuche ohne gültige Fehlerimpedanz (nan) nicht berücksichtigen
+        converged = ~(np.abs(np.abs(u1_nvp) - x) > 1e-6)
+
+    ln, ll = _line_voltages(u0, u1, u2)
+    _, ll_nvp = _line_voltages(0, u1_nvp, u2)
+    u_res = np.where(fault_type == 2, ln.min(axis=-1), ll.min(axis=-1))
+    u_res = np.where(flag_switch, ll.max(axis=-1), u_res)
+    df = df.assign(e=np.abs(e), u_pre=np.abs(u_pre), u1=np.abs(u1), u2=np.abs(u2), u0=np.abs(u0), u_res=u_res,
+                   u_res_nvp=np.where(flag_switch, ll_nvp.max(axis=-1), ll_nvp.min(axis=-1)),
+                   du=u_res - table["uf"], converged=converged)
+
+    # Prüfung: gültige Fehlerimpedanz (LVRT), Restspannung, Quellenspannung (nan: nicht bestanden)
+    with np.errstate(invalid="ignore"):
+        df["pass_rf"] = flag_switch | (table["Rf"] >= 0) & (table["Xf"] >= 0)
+        df["pass_uf"] = np.abs(df["du"].to_numpy()) <= limits["du_max"]
+        df["pass_e"] = np.abs(e) <= limits["e_max"]
+    # Nicht konvergierte Versuche werden nur gemeldet (presolve_messages), nicht als nicht bestanden bewertet
+    df["passed"] = df["pass_rf"] & df["pass_uf"] & df["pass_e"]
+    return df
+
+
+def presolve_messages(df):
+    """ presolve_messages: function
+        Gibt je nicht bestandenem oder nicht konvergiertem Versuch eine Meldung zurück (z.B. für logger.warning).
+    """
+    messages = []
+    for row in df.loc[~df["passed"] | ~df["converged"]].itertuples():
+        reasons = []
+        if not row.pass_rf:
+            reasons.append("ungültige Fehlerimpedanz Rf={}, Xf={} Ohm".format(row.Rf, row.Xf))
+        if not row.pass_uf:
+            reasons.append("Restspannung {} p.u. statt uf={} p.u.".format(round(row.u_res, 3), row.uf))
+        if not row.pass_e:
+            reasons.append("Quellenspannung {} p.u. für uv={} p.u.".format(round(row.e, 3), row.uv))
+        if not row.converged:
+            reasons.append("Stromquelle des Parks nicht konvergiert")
+        messages.append("Vorlöser: Versuch {}: {}".format(row.test, ", ".join(reasons)))
+    return messages
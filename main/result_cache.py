@@ -0,0 +1,273 @@
+""" result_cache.py
+
+Ergebniscache für Versuche: unveränderte Versuche werden nicht erneut simuliert.
+
+Der Schlüssel eines Versuchs ist ein SHA-256-Hash über das Ersatzschaltbild (GridModel),
+die Fehlerdefinition inkl. Rf/Xf, die Simulationseinstellungen (t_sim, lfd_unsym, alle Parameter
+von ComInc und ComSim, Variablen des Ergebnisobjekts), die Variablenauswahl (res_vars), die
+Exportoptionen und einen Fingerabdruck aller Parameter der berechnungsrelevanten Elemente, Typen und
+DSL-Blöcke (model_fingerprint). Die Exportdateien eines Versuchs werden unter
+diesem Schlüssel auf der lokalen Platte abgelegt; ein Index in sqlite3 hält Größe und letzten
+Zugriff. Überschreitet der Cache max_bytes, werden die am längsten nicht genutzten Einträge
+gelöscht (LRU). Mehrere Workerprozesse (runner) können denselben Cache verwenden.
+
+Beispiel:
+    cache = ResultCache(r"C:\\DynSim_Cache", max_bytes=20*1024**3)
+    execute_simulation(..., result_cache=cache)
+"""
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from fnmatch import fnmatchcase
+
+from main.faults import EQUIVALENT_CIRCUIT_KEYS
+from main.pf_proxy import unwrap
+
+# Klassen der berechnungsrelevanten Objekte für den Modell-Fingerabdruck (Elemente, Typen, DSL-Blöcke).
+# Objekte, auf die deren Attribute verweisen (z.B. typ_id, Blockdefinitionen), werden mit erfasst.
+MODEL_CLASSES = ("Elm*", "Typ*", "Blk*")
+# Elemente, deren Daten aus dem Ersatzschaltbild bzw. den Betriebsfällen folgen (bereits im Schlüssel)
+MODEL_EXCLUDE = ("ElmVac", "ElmSind", "ElmStactrl")
+# Attribute der Simulationsbefehle, die bereits über andere Teile des Schlüssels erfasst sind
+SETTINGS_EXCLUDE = ("tstop", "p_resvar")
+
+
+def _relative_name(obj):
+    """ Gibt den Namen des Objekts relativ zum Projekt zurück (gleicher Schlüssel für Kopien des Projekts, z.B. Worker). """
+    full_name = obj.GetFullName()
+    position = full_name.find(".IntPrj")
+    if position == -1:
+        return full_name
+    return full_name[full_name.find("\\", position) + 1:]
+
+
+def _canonical(value):
+    """ Wandelt value in JSON-serialisierbare, eindeutige Werte um (numpy-Werte, Tupel, PowerFactory-Objekte). """
+    if isinstance(value, dict):
+        return {str(key): _canonical(item) for key, item in sorted(value.items())}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    if hasattr(value, "GetFullName"):
+        return _relative_name(value)
+    if hasattr(value, "item"):
+        return value.item()
+    if isinstance(value, float):
+        return repr(value)
+    return value
+
+
+def hash_key(*parts):
+    """ hash_key: function
+        Gibt den SHA-256-Hash (hex) der kanonischen JSON-Darstellung von parts zurück.
+    """
+    text = json.dumps(_canonical(list(parts)), sort_keys=True, default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _attribute_names(obj):
+    """ Gibt die Namen aller Parameter eines PowerFactory-Objekts zurück (dir, ohne Methoden). """
+    return sorted(name for name in dir(obj) if not name.startswith("_") and not callable(getattr(obj, name, None)))
+
+
+def object_attributes(obj, exclude=()):
+    """ object_attributes: function
+        Gibt alle Parameter des Objekts als Liste von Tupeln (Name, kanonischer Wert) zurück.
+    """
+    obj = unwrap(obj)
+    return [(name, _canonical(getattr(obj, name, None))) for name in _attribute_names(obj) if name not in exclude]
+
+
+def model_fingerprint(obj_index, classes=MODEL_CLASSES, exclude=MODEL_EXCLUDE, model_version=""):
+    """ model_fingerprint: function
+        Gibt einen Hash über alle Parameter der berechnungsrelevanten Objekte (classes) und der Objekte,
+        auf die sie verweisen (Typen, DSL-Blöcke), zurück.
+        model_version: zusätzliche Kennung für Änderungen, die nicht in den Parametern sichtbar sind.
+    """
+    objects = {}
+    stack = [unwrap(obj) for pattern in classes for obj in obj_index.get('*.{}'.format(pattern))]
+    while stack:
+        obj = stack.pop()
+        name = _relative_name(obj)
+        class_name = obj.GetClassName()
+        if name in objects or class_name in exclude or not any(fnmatchcase(class_name, pattern) for pattern in classes):
+            continue
+        rows = []
+        for attribute in _attribute_names(obj):
+            value = getattr(obj, attribute, None)
+            rows.append((attribute, _canonical(value)))
+            values = value if isinstance(value, (list, tuple)) else [value]
+            stack.extend(unwrap(item) for item in values if hasattr(item, "GetFullName"))
+        objects[name] = [class_name, rows]
+    return hash_key(model_version, objects)
+
+
+def run_settings(obj_index, flag_load_flow_unsym, t_sim, res_vars, decimation=None, flag_store=False, flag_keep_dat=True,
+                 model_version=""):
+    """ run_settings: function
+        Gibt die Einstellungen eines Laufs, die alle Versuche betreffen, als dictionary zurück
+        (Eingang von fault_key). Wird einmal je Lauf bzw. Worker berechnet.
+
+    Parameters
+    ----------
+    obj_index: ObjectIndex
+        Objektindex des Projekts (ComInc, Modell-Fingerabdruck)
+    flag_load_flow_unsym, t_sim, res_vars, decimation, flag_store, flag_keep_dat:
+        siehe pf_functions.execute_simulation (Optionen, die die Exportdateien verändern)
+    model_version: str
+        siehe model_fingerprint
+    """
+    com_inc = object_attributes(obj_index.from_study_case('ComInc'), exclude=SETTINGS_EXCLUDE)
+    com_sim = object_attributes(obj_index.from_study_case('ComSim'), exclude=SETTINGS_EXCLUDE)
+    # Ergebnisobjekt: aufgezeichnete Variablen je Objekt (IntMon)
+    allcalcs = obj_index.from_study_case('*.ElmRes')
+    monitors = sorted([_canonical(monitor.obj_id) or "", sorted(monitor.vars)] for monitor in allcalcs.GetContents('*.IntMon')[0])
+    return {"flag_load_flow_unsym": bool(flag_load_flow_unsym), "t_sim": t_sim, "ComInc": com_inc,
+            "ComSim": com_sim, "ElmRes": monitors, "res_vars": res_vars, "export": {"decimation": decimation, "flag_store": bool(flag_store),
+                                             "flag_keep_dat": bool(flag_keep_dat)},
+            "model": model_fingerprint(obj_index, model_version=model_version)}
+
+
+def fault_key(grid_model, fault, settings):
+    """ fault_key: function
+        Gibt den Cache-Schlüssel eines Versuchs zurück (Ersatzschaltbild, Fehlerdefinition, settings aus run_settings).
+    """
+    circuit = {key: getattr(grid_model, "grid_{}".format(key), None)
+               for key in EQUIVALENT_CIRCUIT_KEYS + ["Un", "Uc", "Usoll"]}
+    flags = [getattr(grid_model, name, None) for name in ("flag_UW", "flag_MS", "flag_HS")]
+    return hash_key(circuit, flags, fault.params(), fault.Rf, fault.Xf, settings)
+
+
+class ResultCache:
+    """ ResultCache: class
+
+    Cache der Exportdateien je Versuch auf der lokalen Platte mit LRU-Verdrängung.
+
+    Attributes:
+    ----------
+    cache_dir: str
+        Verzeichnis des Caches (Index index.db, Einträge in Unterverzeichnissen)
+    max_bytes: int
+        Maximale Größe aller Einträge in Byte
+    hits, misses: int
+        Treffer und Fehlversuche dieser Instanz
+
+    Methods:
+    -------
+    get:
+        Kopiert die Dateien eines Eintrags in den Ausgabeordner und gibt die Metadaten zurück (None: kein Eintrag)
+    put:
+        Legt Dateien unter einem Schlüssel ab und verdrängt ggf. alte Einträge
+    evict, clear, stats
+    """
+
+    def __init__(self, cache_dir, max_bytes=10*1024**3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._conns = {}
+
+    def __getstate__(self):
+        # Verbindungen nicht an Workerprozesse übergeben (werden dort neu geöffnet)
+        state = self.__dict__.copy()
+        state["_conns"] = {}
+        return state
+
+    def _db(self):
+        # Eine Verbindung je Thread (sqlite3-Verbindungen sind an den Thread gebunden, z.B. Pipeline)
+        conn = self._conns.get(threading.get_ident())
+        if conn is None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            conn = self._conns[threading.get_ident()] = sqlite3.connect(os.path.join(self.cache_dir, "index.db"), timeout=60)
+            conn.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, size INTEGER, "
+                         "created REAL, last_used REAL, hits INTEGER, meta TEXT)")
+            conn.commit()
+        return conn
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def get(self, key, target_dir):
+        """ get: method
+            Kopiert die Dateien des Eintrags key nach target_dir und gibt die Metadaten zurück (None: kein Eintrag).
+        """
+        conn = self._db()
+        row = conn.execute("SELECT meta FROM entries WHERE key=?", (key,)).fetchone()
+        entry_dir = self._entry_dir(key)
+        if row is None or not os.path.isdir(entry_dir):
+            self.misses += 1
+            return None
+        meta = json.loads(row[0])
+        try:
+            for fname in meta["files"]:
+                shutil.copyfile(os.path.join(entry_dir, fname), os.path.join(target_dir, fname))
+        except OSError:
+            # Eintrag unvollständig (z.B. gleichzeitig verdrängt): wie kein Eintrag behandeln
+            self.misses += 1
+            return None
+        with conn:
+            conn.execute("UPDATE entries SET last_used=?, hits=hits+1 WHERE key=?", (time.time(), key))
+        self.hits += 1
+        return meta
+
+    def put(self, key, fnames, meta=None):
+        """ put: method
+            Legt die Dateien fnames (Pfade) unter dem Schlüssel key ab. meta (JSON-serialisierbar) wird mit
+            der Liste der Dateinamen (files) bei get zurückgegeben.
+        """
+        entry_dir = self._entry_dir(key)
+        tmp_dir = "{}.{}.tmp".format(entry_dir, uuid.uuid4().hex)
+        os.makedirs(tmp_dir)
+        size = 0
+        for fname in fnames:
+            shutil.copyfile(fname, os.path.join(tmp_dir, os.path.basename(fname)))
+            size += os.path.getsize(fname)
+        meta = dict(meta or {}, files=[os.path.basename(fname) for fname in fnames])
+        if os.path.isdir(entry_dir):
+            shutil.rmtree(entry_dir, ignore_errors=True)
+        os.replace(tmp_dir, entry_dir)
+        now = time.time()
+        with self._db() as conn:
+            conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, 0, ?)", (key, size, now, now, json.dumps(meta)))
+        self.evict()
+
+    def evict(self, max_bytes=None):
+        """ evict: method
+            Löscht die am längsten nicht genutzten Einträge, bis die Größe max_bytes (Default: self.max_bytes) einhält.
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        conn = self._db()
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= max_bytes:
+            return 0
+        removed = 0
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY last_used").fetchall():
+            if total <= max_bytes:
+                break
+            with conn:
+                conn.execute("DELETE FROM entries WHERE key=?", (key,))
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self):
+        """ clear: method
+            Löscht alle Einträge.
+        """
+        return self.evict(max_bytes=-1)
+
+    def stats(self):
+        """ stats: method
+            Gibt Anzahl und Größe der Einträge sowie Treffer/Fehlversuche dieser Instanz zurück.
+        """
+        entries, size = self._db().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {"entries": entries, "bytes": size, "hits": self.hits, "misses": self.misses}
+
+    def __repr__(self):
+        return "ResultCache('{}', max_bytes={}, hits={}, misses={})".format(self.cache_dir, self.max_bytes, self.hits, self.misses)
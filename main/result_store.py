@@ -0,0 +1,277 @@
+""" result_store.py
+
+Spaltenbasierter Binärspeicher für die Simulationsergebnisse eines Versuchs.
+
+Die mit ComRes exportierten Textdateien (Versuch1_NAP.dat, Versuch1_EZE_ULE.dat, ...) werden
+nach dem Export in eine Datei je Versuch (Versuch1.dynres) übernommen. Jede Exportdatei wird
+eine Tabelle (z.B. "NAP", "EZE_ULE"), jede Variable eine zusammenhängende Spalte. Einzelne
+Variablen können daher ohne Parsen der gesamten Datei gelesen werden. Für lange EMT-Versuche
+liest ResultStore die Spalten memory-mapped und gibt nur Zeitfenster bzw. Blöcke zurück
+(window, iter_chunks), ohne die gesamte Datei in den Speicher zu laden.
+
+Dateiformat:
+    8 Byte   Kennung b"DYNRES1\\x00"
+    8 Byte   Länge des Headers in Byte (uint64, little endian)
+    Header   JSON (utf-8): version, meta (Versuch, Simulationsart, ...), tables
+    Daten    Spalten (little endian), jeweils auf ALIGNMENT Byte ausgerichtet
+
+Jede Tabelle im Header: name, point (Messstelle), var_type (Sym/Unsym/ULE), source (Exportdatei),
+nrows und columns mit name (Variable), object, dtype, offset (ab Dateianfang).
+"""
+import json
+import os
+import struct
+
+import numpy as np
+
+from main.results import read_dat, match_column
+
+MAGIC = b"DYNRES1\x00"
+VERSION = 1
+ALIGNMENT = 64
+# Zeitspalte immer in float64, damit die Zeitpunkte exakt bleiben
+TIME_VARIABLE = "b:tnow in s"
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1)//ALIGNMENT*ALIGNMENT
+
+
+def write_store(fname, tables, meta=None, dtype="float32"):
+    """ write_store: function
+        Schreibt Tabellen in eine Ergebnisdatei.
+
+    Parameters
+    ----------
+    fname: str
+        Pfad der Ergebnisdatei, z.B. "C:\\Ausgabe_Skript\\Versuch1.dynres"
+    tables: list
+        Ein dictionary je Tabelle mit den keys name, variables (list), data (numpy.ndarray, shape (nrows, ncols))
+        und optional objects (list), point, var_type, source
+    meta: dictionary (optional)
+        Metadaten des Versuchs (JSON-serialisierbar), z.B. test, sim_mode, duration, uf
+    dtype: str
+        Datentyp der Variablen ("float32" oder "float64"). Die Zeitspalte wird immer als float64 gespeichert.
+    """
+    header_tables = []
+    blocks = []
+    offset = 0
+    for table in tables:
+        data = np.asarray(table["data"])
+        objects = table.get("objects") or [""]*len(table["variables"])
+        columns = []
+        for i, (variable, obj) in enumerate(zip(table["variables"], objects)):
+            column_dtype = "float64" if variable == TIME_VARIABLE else dtype
+            column = np.ascontiguousarray(data[:, i], dtype=np.dtype(column_dtype).newbyteorder("<"))
+            offset = _align(offset)
+            columns.append({"name": variable, "object": obj, "dtype": column_dtype, "offset": offset})
+            blocks.append((offset, column))
+            offset += column.nbytes
+        header_tables.append({"name": table["name"], "point": table.get("point"), "var_type": table.get("var_type"),
+                              "source": table.get("source"), "nrows": int(data.shape[0]), "columns": columns})
+
+    header = json.dumps({"version": VERSION, "meta": meta or {}, "tables": header_tables}).encode("utf-8")
+    data_start = _align(len(MAGIC) + 8 + len(header))
+    tmp_fname = fname + ".tmp"
+    with open(tmp_fname, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        for block_offset, column in blocks:
+            f.seek(data_start + block_offset)
+            column.tofile(f)
+    # Erst nach vollständigem Schreiben umbenennen (keine halben Dateien bei Abbruch)
+    os.replace(tmp_fname, fname)
+    return fname
+
+
+def export_table_name(fname, test):
+    """ export_table_name: function
+        Gibt den Tabellennamen für eine Exportdatei zurück: "Versuch1_EZE_ULE.dat" -> "EZE_ULE".
+    """
+    name = os.path.splitext(os.path.basename(fname))[0]
+    prefix = "Versuch{}_".format(test)
+    return name[len(prefix):] if name.startswith(prefix) else name
+
+
+def ingest_exports(fname, exports, meta=None, dtype="float32", flag_keep_dat=True, decimal="."):
+    """ ingest_exports: function
+        Übernimmt die Exportdateien eines Versuchs in eine Ergebnisdatei.
+
+    Parameters
+    ----------
+    fname: str
+        Pfad der Ergebnisdatei
+    exports: list
+        Ein dictionary je Exportdatei mit den keys fname, point, var_type (Rückgabewert von execute_export)
+    meta: dictionary (optional)
+        Metadaten des Versuchs, siehe write_store
+    dtype: str
+        Datentyp der Variablen, siehe write_store
+    flag_keep_dat: bool
+        False: Exportdateien nach der Übernahme löschen
+    decimal: str
+        Dezimaltrennzeichen der Exportdateien
+    """
+    test = (meta or {}).get("test")
+    tables = []
+    for export in exports:
+        result = read_dat(export["fname"], decimal=decimal)
+        tables.append({"name": export_table_name(export["fname"], test), "point": export.get("point"),
+                       "var_type": export.get("var_type"), "source": os.path.basename(export["fname"]),
+                       "objects": result["objects"], "variables": result["variables"], "data": result["data"]})
+    write_store(fname, tables, meta=meta, dtype=dtype)
+    if not flag_keep_dat:
+        for export in exports:
+            os.remove(export["fname"])
+    return fname
+
+
+class ResultStore:
+    """ ResultStore: class
+
+    Lesezugriff auf eine Ergebnisdatei (siehe write_store).
+
+    Attributes:
+    ----------
+    fname: str
+        Pfad der Ergebnisdatei
+    meta: dictionary
+        Metadaten des Versuchs
+    tables: dictionary
+        Tabellenname -> Tabellenbeschreibung aus dem Header
+
+    Methods:
+    -------
+    get:
+        Gibt eine Spalte als numpy.ndarray (oder numpy.memmap) zurück
+    time:
+        Gibt die Zeitspalte einer Tabelle zurück
+    window, iter_chunks:
+        Gibt ein Zeitfenster einer Tabelle bzw. die Tabelle blockweise zurück (memory-mapped)
+    table:
+        Gibt eine Tabelle im Format von results.read_dat zurück
+    """
+
+    def __init__(self, fname):
+        self.fname = fname
+        with open(fname, "rb") as f:
+            if not f.read(len(MAGIC)) == MAGIC:
+                raise ValueError("ResultStore: keine Ergebnisdatei: {}".format(fname))
+            header_length = struct.unpack("<Q", f.read(8))[0]
+            header = json.loads(f.read(header_length).decode("utf-8"))
+        self.version = header["version"]
+        self.meta = header["meta"]
+        self.tables = {table["name"]: table for table in header["tables"]}
+        self._data_start = _align(len(MAGIC) + 8 + header_length)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def _column(self, table, variable):
+        try:
+            table = self.tables[table]
+        except KeyError:
+            raise KeyError("ResultStore: Tabelle {} nicht vorhanden (vorhanden: {})".format(table, sorted(self.tables)))
+        columns = table["columns"]
+        try:
+            i = match_column([column["object"] for column in columns], [column["name"] for column in columns], variable)
+        except KeyError as e:
+            raise KeyError("ResultStore: {} in Tabelle {}".format(e.args[0], table["name"]))
+        return table, columns[i]
+
+    def _read(self, table, column, flag_mmap=False):
+        dtype = np.dtype(column["dtype"]).newbyteorder("<")
+        if flag_mmap:
+            if table["nrows"] == 0:
+                return np.empty(0, dtype=dtype)
+            return np.memmap(self.fname, dtype=dtype, mode="r", shape=(table["nrows"],),
+                             offset=self._data_start + column["offset"])
+        return np.fromfile(self.fname, dtype=dtype, count=table["nrows"],
+                           offset=self._data_start + column["offset"])
+
+    def columns(self, table):
+        """ columns: method
+            Gibt die Spalten der Tabelle table als (Objekt, Variable) zurück.
+        """
+        return [(column["object"], column["name"]) for column in self.tables[table]["columns"]]
+
+    def get(self, table, variable, flag_mmap=False):
+        """ get: method
+            Liest die Spalte variable der Tabelle table (z.B. "NAP") als numpy.ndarray. variable: (Objekt, Variable),
+            z.B. ("NAP", "m:u1:bus1"), oder ein in der Tabelle eindeutiger Variablenname (siehe results.match_column).
+            flag_mmap=True: numpy.memmap (nur lesend), die Daten werden erst beim Zugriff gelesen.
+        """
+        return self._read(*self._column(table, variable), flag_mmap=flag_mmap)
+
+    def time(self, table):
+        """ time: method
+            Gibt die Zeitspalte (b:tnow) der Tabelle table in s zurück.
+        """
+        return self.get(table, TIME_VARIABLE)
+
+    def _index_range(self, table, t_start, t_stop):
+        """ Gibt die Zeilen (start, stop) des Zeitfensters zurück (Bisektion auf der memory-mapped Zeitspalte). """
+        t = self.get(table, TIME_VARIABLE, flag_mmap=True)
+        start = 0 if t_start is None else int(np.searchsorted(t, t_start, side="left"))
+        stop = len(t) if t_stop is None else int(np.searchsorted(t, t_stop, side="right"))
+        return start, max(start, stop)
+
+    def window(self, table, t_start=None, t_stop=None, variables=None):
+        """ window: method
+            Gibt das Zeitfenster t_start bis t_stop in s (z.B. results.fault_window(fault)) der Tabelle table
+            wie results.read_dat zurück. Gelesen werden nur die Zeilen des Fensters der Spalten variables
+            (Default: alle, die Zeit ist immer die erste Spalte).
+        """
+        start, stop = self._index_range(table, t_start, t_stop)
+        columns = self._select(table, variables)
+        data = np.column_stack([np.asarray(self._read(self.tables[table], column, flag_mmap=True)[start:stop],
+                                           dtype=np.float64) for column in columns]) \
+            if stop > start else np.empty((0, len(columns)))
+        return {"objects": [column["object"] for column in columns],
+                "variables": [column["name"] for column in columns], "data": data}
+
+    def iter_chunks(self, table, chunk_size=100000, t_start=None, t_stop=None, variables=None):
+        """ iter_chunks: method
+            Gibt die Tabelle (bzw. das Zeitfenster t_start bis t_stop) in Blöcken zu chunk_size Zeitpunkten
+            wie results.iter_dat zurück.
+        """
+        start, stop = self._index_range(table, t_start, t_stop)
+        columns = self._select(table, variables)
+        objects = [column["object"] for column in columns]
+        names = [column["name"] for column in columns]
+        mmaps = [self._read(self.tables[table], column, flag_mmap=True) for column in columns]
+        for i in range(start, stop, chunk_size):
+            j = min(i + chunk_size, stop)
+            yield {"objects": objects, "variables": names,
+                   "data": np.column_stack([np.asarray(column[i:j], dtype=np.float64) for column in mmaps])}
+
+    def _select(self, table, variables):
+        """ Gibt die Spalten der Auswahl variables zurück, die Zeitspalte immer zuerst. """
+        if variables is None:
+            return self._column(table, TIME_VARIABLE)[0]["columns"]
+        time_column = self._column(table, TIME_VARIABLE)[1]
+        columns = [self._column(table, variable)[1] for variable in variables]
+        return [time_column] + [column for column in columns if column is not time_column]
+
+    def table(self, table):
+        """ table: method
+            Gibt die Tabelle als dictionary mit objects, variables und data (float64) wie results.read_dat zurück.
+        """
+        columns = self.tables[table]["columns"]
+        data = np.column_stack([self._read(self.tables[table], column).astype(np.float64) for column in columns])
+        return {"objects": [column["object"] for column in columns],
+                "variables": [column["name"] for column in columns], "data": data}
+
+    def __repr__(self):
+        return "ResultStore('{}', tables={})".format(self.fname, sorted(self.tables))
+
+
+def read_store(fname):
+    """ read_store: function
+        Öffnet eine Ergebnisdatei zum Lesen (ResultStore).
+    """
+    return ResultStore(fname)
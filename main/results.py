@@ -0,0 +1,310 @@
+""" results.py
+
+Einlesen der mit ComRes (iopt_exp=4) exportierten Simulationsergebnisse (*.dat).
+
+Aufbau einer Exportdatei (Tabulator getrennt):
+    Zeile 1: Objektnamen je Spalte (z.B. "All calculations", "xNAP")
+    Zeile 2: Variablen je Spalte (z.B. "b:tnow in s", "m:u1:bus1")
+    ab Zeile 3: Zeitpunkte mit einem Wert je Spalte
+
+Für große Exportdateien (EMT, z.B. Versuch14_EMT_NAP.dat) liest iter_dat die Datei blockweise
+und nur im gewählten Zeitfenster: der Beginn des Fensters wird in der memory-mapped Datei per
+Bisektion über die Zeitspalte gesucht, davor liegende Zeilen werden nicht geparst.
+
+export_windows und decimate_dat reduzieren Exportdateien auf volle Auflösung um die
+Fehlerereignisse und eine gröbere Schrittweite im stationären Bereich.
+"""
+import mmap
+import os
+
+import numpy as np
+import pandas as pd
+
+# Zeitpunkt der Fehlereintritts in s (Ereignisse aus pf_functions._fault_event_specs)
+T_FAULT = 1.0
+
+
+def read_dat(fname, decimal="."):
+    """ read_dat: function
+        Liest eine Exportdatei von ComRes ein.
+
+    Parameters
+    ----------
+    fname: str
+        Pfad der Exportdatei, z.B. "C:\\Ausgabe_Skript\\Versuch1_NAP.dat"
+    decimal: str
+        Dezimaltrennzeichen der Exportdatei. Default: "."
+
+    Returns
+    -------
+    result: dictionary
+        "objects": list, Objektnamen je Spalte
+        "variables": list, Variablen je Spalte (erste Spalte: Zeit)
+        "data": numpy.ndarray, shape (Anzahl Zeitpunkte, Anzahl Spalten), float64
+    """
+    with open(fname, "r") as f:
+        objects = f.readline().rstrip("\r\n").split("\t")
+        variables = f.readline().rstrip("\r\n").split("\t")
+        data = pd.read_csv(f, sep="\t", header=None, decimal=decimal, dtype=np.float64).to_numpy()
+    return {"objects": objects, "variables": variables, "data": data}
+
+
+def get_column(result, variable):
+    """ get_column: function
+        Gibt die Spalte der Variable variable (z.B. "m:u1:bus1") aus dem Ergebnis von read_dat zurück.
+    """
+    return result["data"][:, result["variables"].index(variable)]
+
+
+def fault_window(fault, t_before=0.1, t_after=1.0):
+    """ fault_window: function
+        Gibt das Zeitfenster (t_start, t_stop) in s um die Fehlerereignisse eines Versuchs zurück:
+        t_before vor dem Fehlereintritt bis t_after nach der Fehlerklärung.
+    """
+    return T_FAULT - t_before, T_FAULT + fault.duration + t_after
+
+
+def _next_line(buffer, pos):
+    """ Gibt den Anfang der nächsten Zeile nach pos zurück (Dateiende, wenn keine folgt). """
+    end = buffer.find(b"\n", pos)
+    return len(buffer) if end == -1 else end + 1
+
+
+def _line_time(buffer, pos, decimal):
+    """ Gibt die Zeit (erste Spalte) der Zeile ab pos zurück (inf für leere Zeilen am Dateiende). """
+    end = _next_line(buffer, pos)
+    tab = buffer.find(b"\t", pos, end)
+    field = buffer[pos:end if tab == -1 else tab].strip()
+    return float(field.decode().replace(decimal, ".")) if field else float("inf")
+
+
+def _seek_time(buffer, data_start, t_start, decimal):
+    """ Sucht per Bisektion den Anfang der ersten Zeile mit Zeit >= t_start (Zeitspalte aufsteigend). """
+    lo, hi = data_start, len(buffer)
+    while True:
+        mid = (lo + hi)//2
+        pos = lo if mid == lo else _next_line(buffer, mid - 1)
+        if pos >= hi:
+            break
+        if _line_time(buffer, pos, decimal) >= t_start:
+            hi = pos
+        else:
+            lo = _next_line(buffer, pos)
+    # Zwischen lo und hi liegen nur noch wenige Zeilen
+    while lo < hi and _line_time(buffer, lo, decimal) < t_start:
+        lo = _next_line(buffer, lo)
+    return lo
+
+
+def match_column(objects, variables, variable):
+    """ match_column: function
+        Gibt die Spaltennummer der Variable variable zurück. Die Exporte enthalten dieselbe Variable für mehrere
+        Objekte (z.B. "m:u1:bus1" für jede Leitung), daher wird eine Spalte über (Objekt, Variable) ausgewählt.
+        Ein Variablenname allein ist nur zulässig, wenn er eindeutig ist.
+
+    Parameters
+    ----------
+    objects, variables: list
+        Objekte und Variablen aller Spalten (Kopfzeilen der Exportdatei)
+    variable: str or tuple
+        (Objekt, Variable), z.B. ("NAP", "m:u1:bus1"), oder nur der Variablenname
+    """
+    if isinstance(variable, tuple):
+        matches = [i for i, column in enumerate(zip(objects, variables)) if column == variable]
+    else:
+        matches = [i for i, name in enumerate(variables) if name == variable]
+    if not matches:
+        raise KeyError("Variable {} nicht vorhanden".format(variable))
+    if len(matches) > 1:
+        raise KeyError("Variable {} nicht eindeutig (Objekte: {}), (Objekt, Variable) angeben"
+                       .format(variable, [objects[i] for i in matches]))
+    return matches[0]
+
+
+def _read_header(f, variables):
+    """ Liest die Kopfzeilen einer Exportdatei (Binärmodus) und gibt Objekte, Variablen und Spaltennummern der Auswahl zurück. """
+    objects = f.readline().decode().rstrip("\r\n").split("\t")
+    all_variables = f.readline().decode().rstrip("\r\n").split("\t")
+    if variables is None:
+        columns = list(range(len(all_variables)))
+    else:
+        columns = [0] + [i for i in (match_column(objects, all_variables, variable) for variable in variables) if i != 0]
+    return [objects[i] for i in columns], [all_variables[i] for i in columns], columns
+
+
+def iter_dat(fname, variables=None, t_start=None, t_stop=None, chunk_size=100000, decimal="."):
+    """ iter_dat: function
+        Liest eine Exportdatei von ComRes blockweise ein, ohne die gesamte Datei in den Speicher zu laden.
+
+    Parameters
+    ----------
+    fname: str
+        Pfad der Exportdatei, z.B. "C:\\Ausgabe_Skript\\Versuch14_EMT_NAP.dat"
+    variables: list (optional)
+        Nur diese Variablen lesen, jeweils (Objekt, Variable) oder ein eindeutiger Variablenname (siehe match_column).
+        Die Zeit wird immer als erste Spalte gelesen. Default: alle
+    t_start, t_stop: float (optional)
+        Zeitfenster in s, z.B. fault_window(fault). Default: gesamte Datei
+    chunk_size: int
+        Anzahl der Zeitpunkte je Block
+    decimal: str
+        Dezimaltrennzeichen der Exportdatei. Default: "."
+
+    Yields
+    ------
+    chunk: dictionary
+        "objects", "variables" und "data" (numpy.ndarray, shape (Zeitpunkte im Block, Anzahl Spalten)) wie read_dat
+    """
+    with open(fname, "rb") as f:
+        objects, names, columns = _read_header(f, variables)
+        data_start = f.tell()
+        offset = data_start
+        if t_start is not None:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                offset = _seek_time(buffer, data_start, t_start, decimal)
+        # Zeitfenster nach dem Dateiende bzw. keine Zeitpunkte
+        if offset >= os.fstat(f.fileno()).st_size:
+            return
+        f.seek(offset)
+        reader = pd.read_csv(f, sep="\t", header=None, decimal=decimal, usecols=columns, dtype=np.float64,
+                             chunksize=chunk_size)
+        for frame in reader:
+            data = frame[columns].to_numpy()
+            if t_start is not None:
+                data = data[data[:, 0] >= t_start]
+            flag_last = t_stop is not None and data.shape[0] > 0 and data[-1, 0] > t_stop
+            if t_stop is not None:
+                data = data[data[:, 0] <= t_stop]
+            if data.shape[0]:
+                yield {"objects": objects, "variables": names, "data": data}
+            if flag_last:
+                break
+
+
+def read_dat_window(fname, t_start, t_stop, variables=None, chunk_size=100000, decimal="."):
+    """ read_dat_window: function
+        Liest nur das Zeitfenster t_start bis t_stop einer Exportdatei (siehe iter_dat) und gibt es wie read_dat zurück.
+    """
+    chunks = list(iter_dat(fname, variables=variables, t_start=t_start, t_stop=t_stop,
+                           chunk_size=chunk_size, decimal=decimal))
+    if chunks:
+        return {"objects": chunks[0]["objects"], "variables": chunks[0]["variables"],
+                "data": np.concatenate([chunk["data"] for chunk in chunks])}
+    with open(fname, "rb") as f:
+        objects, names, columns = _read_header(f, variables)
+    return {"objects": objects, "variables": names, "data": np.empty((0, len(columns)))}
+
+
+def export_windows(fault, t_before=0.1, t_after=0.5, dt_event=None, dt_steady=0.01):
+    """ export_windows: function
+        Gibt die Zeitfenster für den Export eines Versuchs zurück: um Fehlereintritt (T_FAULT) und
+        Fehlerklärung (T_FAULT + duration) jeweils t_before bis t_after mit Schrittweite dt_event,
+        dazwischen und davor/danach mit Schrittweite dt_steady.
+
+    Parameters
+    ----------
+    fault: Instance of Class
+        Fehlerdefinition (duration in s)
+    t_before, t_after: float
+        Fenster vor/nach den Ereignissen in s
+    dt_event: float (optional)
+        Schrittweite um die Ereignisse in s. Default: None -> volle Auflösung
+    dt_steady: float (optional)
+        Schrittweite außerhalb der Fenster in s. None -> volle Auflösung
+
+    Returns
+    -------
+    windows: list
+        Tupel (t_start, t_stop, dt) aufsteigend und lückenlos von 0 bis inf
+    """
+    events = []
+    for t_event in (T_FAULT, T_FAULT + fault.duration):
+        t_start, t_stop = max(t_event - t_before, 0.0), t_event + t_after
+        # Überlappende Fenster (kurze Fehlerdauer) zusammenfassen
+        if events and t_start <= events[-1][1]:
+            events[-1] = (events[-1][0], max(events[-1][1], t_stop))
+        else:
+            events.append((t_start, t_stop))
+    windows, t = [], 0.0
+    for t_start, t_stop in events:
+        if t_start > t:
+            windows.append((t, t_start, dt_steady))
+        windows.append((t_start, t_stop, dt_event))
+        t = t_stop
+    windows.append((t, float("inf"), dt_steady))
+    return windows
+
+
+class _RowFilter:
+    """ Entscheidet zeilenweise (Zeit aufsteigend), ob ein Zeitpunkt gemäß den Zeitfenstern exportiert wird.
+        Der erste Zeitpunkt eines Fensters wird immer übernommen, danach nur Zeitpunkte im Abstand >= dt.
+    """
+
+    def __init__(self, windows):
+        self.windows = windows
+        self.i = 0
+        self.t_last = None
+
+    def keep(self, t):
+        window_changed = False
+        while self.i < len(self.windows) - 1 and t >= self.windows[self.i][1]:
+            self.i += 1
+            window_changed = True
+        dt = self.windows[self.i][2]
+        if window_changed or self.t_last is None or not dt or t - self.t_last >= dt*(1 - 1e-9):
+            self.t_last = t
+            return True
+        return False
+
+
+def decimate_dat(fname, windows, decimal="."):
+    """ decimate_dat: function
+        Reduziert eine Exportdatei auf die Zeitpunkte der Zeitfenster windows (siehe export_windows).
+        Die Datei wird zeilenweise gelesen und ersetzt, die Werte werden als Text übernommen.
+        Die Datei wird nachträglich verkleinert: PowerFactory hat sie zuvor mit voller Auflösung geschrieben.
+    """
+    row_filter = _RowFilter(windows)
+    tmp_fname = fname + ".tmp"
+    with open(fname, "r") as f, open(tmp_fname, "w") as out:
+        out.write(f.readline())
+        out.write(f.readline())
+        for line in f:
+            field = line.split("\t", 1)[0].strip()
+            if field and row_filter.keep(float(field.replace(decimal, "."))):
+                out.write(line)
+    os.replace(tmp_fname, fname)
+
+
+def split_dat(fname, outputs, windows=None, decimal="."):
+    """ split_dat: function
+        Teilt eine Exportdatei spaltenweise in mehrere Exportdateien auf. Die Werte werden als Text
+        übernommen (keine Rundung), die Datei wird zeilenweise gelesen.
+
+    Parameters
+    ----------
+    fname: str
+        Pfad der Exportdatei (z.B. Sammeldatei eines Versuchs)
+    outputs: list
+        Ein Tupel (Pfad, Spaltennummern) je Ausgabedatei, z.B. ("C:\\Ausgabe_Skript\\Versuch1_NAP.dat", [0, 1, 2])
+    windows: list (optional)
+        Zeitfenster (siehe export_windows), nur diese Zeitpunkte übernehmen. Default: alle Zeitpunkte
+    decimal: str
+        Dezimaltrennzeichen der Exportdatei. Default: "."
+    """
+    row_filter = _RowFilter(windows) if windows is not None else None
+    files = []
+    try:
+        for out_fname, columns in outputs:
+            files.append((open(out_fname, "w"), columns))
+        with open(fname, "r") as f:
+            for row, line in enumerate(f):
+                fields = line.rstrip("\r\n").split("\t")
+                # Die ersten beiden Zeilen (Objekte, Variablen) immer übernehmen
+                if row_filter is not None and row > 1 and (not fields[0].strip() or
+                                                           not row_filter.keep(float(fields[0].replace(decimal, ".")))):
+                    continue
+                for out, columns in files:
+                    out.write("\t".join([fields[i] for i in columns]) + "\n")
+    finally:
+        for out, columns in files:
+            out.close()
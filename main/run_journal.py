@@ -0,0 +1,162 @@
+""" run_journal.py
+
+Laufjournal für lange Simulationskampagnen (Wiederaufnahme nach Abbruch).
+
+Das Journal speichert je Lauf (run_id, z.B. Projektnummer und Fehlertabelle) und Versuch den
+erreichten Stand in einer lokalen sqlite3-Datenbank neben DB_Faults.db:
+    scenario   Betriebs- und Fehlerfälle angelegt
+    load_flow  Lastfluss und Anfangsbedingungen berechnet (err: 1 bei Fehler)
+    simulated  Simulation durchgeführt
+    exported   Ergebnisse exportiert (Versuch abgeschlossen)
+Bricht ein Lauf ab (z.B. Absturz von PowerFactory), setzt ein erneuter Aufruf mit derselben
+run_id beim ersten unvollständigen Versuch fort: abgeschlossene Versuche (exported, err=0) werden
+übersprungen, die Betriebs- und Fehlerfälle abgeglichen statt neu angelegt. Ändern sich Netzdaten,
+Fehlerdefinitionen oder Einstellungen (fingerprint), beginnt der Lauf neu. Nach einem vollständigen
+Lauf (finish) beginnt der nächste Aufruf ebenfalls neu.
+
+Beispiel:
+    journal = RunJournal("./data/DB_Journal.db", "{}_{}".format(projektnummer, tablename),
+                         run_fingerprint(grid_model, settings)).start()
+    execute_simulation(..., journal=journal)
+    journal.finish()
+"""
+import sqlite3
+import threading
+import time
+
+from main.result_cache import hash_key, fault_key
+
+STAGES = ("scenario", "load_flow", "simulated", "exported")
+
+
+def run_fingerprint(grid_model, settings):
+    """ run_fingerprint: function
+        Gibt einen Hash über Ersatzschaltbild, Fehlerdefinitionen und settings (dictionary, z.B. t_sim,
+        flag_load_flow_unsym, Exportoptionen) zurück. Die Reihenfolge der Versuche ist Teil des Hashes.
+    """
+    return hash_key([fault_key(grid_model, fault, settings) for fault in grid_model.list_of_faults])
+
+
+class RunJournal:
+    """ RunJournal: class
+
+    Journal eines Laufs mit dem Stand je Versuch (siehe STAGES).
+
+    Attributes:
+    ----------
+    db_name: str
+        Pfad der sqlite3-Datenbank
+    run_id: str
+        Kennung des Laufs, z.B. "4711_FAULTS_4120_TYP1"
+    fingerprint: str
+        Hash der Eingangsdaten des Laufs (siehe run_fingerprint)
+    resumed: bool
+        True: start hat einen abgebrochenen Lauf mit gleichem fingerprint gefunden
+
+    Methods:
+    -------
+    start:
+        Setzt einen abgebrochenen Lauf fort oder beginnt einen neuen
+    mark:
+        Speichert den Stand eines Versuchs
+    stage, is_done, pending:
+        Stand eines Versuchs, abgeschlossen ja/nein, nicht abgeschlossene Versuche
+    finish:
+        Schließt den Lauf ab (der nächste Aufruf beginnt neu)
+    """
+
+    def __init__(self, db_name, run_id, fingerprint=""):
+        self.db_name = db_name
+        self.run_id = run_id
+        self.fingerprint = fingerprint
+        self.resumed = False
+        self._conns = {}
+
+    def __getstate__(self):
+        # Verbindungen nicht an Workerprozesse übergeben (werden dort neu geöffnet)
+        state = self.__dict__.copy()
+        state["_conns"] = {}
+        return state
+
+    def _db(self):
+        # Eine Verbindung je Thread (sqlite3-Verbindungen sind an den Thread gebunden, z.B. Pipeline)
+        conn = self._conns.get(threading.get_ident())
+        if conn is None:
+            conn = self._conns[threading.get_ident()] = sqlite3.connect(self.db_name, timeout=60)
+            with conn:
+                conn.execute("CREATE TABLE IF NOT EXISTS runs (run_id TEXT PRIMARY KEY, fingerprint TEXT, "
+                             "status TEXT, created REAL, updated REAL)")
+                conn.execute("CREATE TABLE IF NOT EXISTS journal (run_id TEXT, test TEXT, stage TEXT, "
+                             "err INTEGER, updated REAL, PRIMARY KEY (run_id, test))")
+        return conn
+
+    def start(self):
+        """ start: method
+            Setzt den Lauf run_id fort, wenn er nicht abgeschlossen ist und der fingerprint übereinstimmt.
+            Sonst wird das Journal des Laufs geleert. Gibt self zurück.
+        """
+        conn = self._db()
+        row = conn.execute("SELECT fingerprint, status FROM runs WHERE run_id=?", (self.run_id,)).fetchone()
+        self.resumed = row is not None and row[0] == self.fingerprint and row[1] == "running"
+        now = time.time()
+        with conn:
+            if self.resumed:
+                conn.execute("UPDATE runs SET updated=? WHERE run_id=?", (now, self.run_id))
+            else:
+                conn.execute("DELETE FROM journal WHERE run_id=?", (self.run_id,))
+                conn.execute("INSERT OR REPLACE INTO runs VALUES (?, ?, 'running', ?, ?)", (self.run_id, self.fingerprint, now, now))
+        return self
+
+    def mark(self, test, stage, err=0):
+        """ mark: method
+            Speichert den Stand stage (siehe STAGES) des Versuchs test. err: 1 bei Fehler (z.B. Lastfluss).
+        """
+        if stage not in STAGES:
+            raise ValueError("RunJournal: unbekannter Stand {} (möglich: {})".format(stage, STAGES))
+        with self._db() as conn:
+            conn.execute("INSERT OR REPLACE INTO journal VALUES (?, ?, ?, ?, ?)", (self.run_id, str(test), stage, int(err), time.time()))
+
+    def mark_new(self, tests, stage):
+        """ mark_new: method
+            Speichert den Stand stage für alle Versuche tests, die noch keinen Stand haben.
+        """
+        now = time.time()
+        with self._db() as conn:
+            conn.executemany("INSERT OR IGNORE INTO journal VALUES (?, ?, ?, 0, ?)",
+                             [(self.run_id, str(test), stage, now) for test in tests])
+
+    def stage(self, test):
+        """ stage: method
+            Gibt den Stand (stage, err) des Versuchs test zurück, (None, None) ohne Eintrag.
+        """
+        row = self._db().execute("SELECT stage, err FROM journal WHERE run_id=? AND test=?", (self.run_id, str(test))).fetchone()
+        return (None, None) if row is None else row
+
+    def is_done(self, test):
+        """ is_done: method
+            True: Versuch test fehlerfrei exportiert.
+        """
+        return self.stage(test) == ("exported", 0)
+
+    def pending(self, faults):
+        """ pending: method
+            Gibt die nicht abgeschlossenen Versuche aus faults (Reihenfolge bleibt erhalten) zurück.
+        """
+        return [fault for fault in faults if not self.is_done(fault.test)]
+
+    def finish(self):
+        """ finish: method
+            Schließt den Lauf ab. Der nächste start mit derselben run_id beginnt neu.
+        """
+        with self._db() as conn:
+            conn.execute("UPDATE runs SET status='done', updated=? WHERE run_id=?", (time.time(), self.run_id))
+
+    def summary(self):
+        """ summary: method
+            Gibt die Anzahl der Versuche je Stand zurück, z.B. {"exported": 12, "simulated": 1}.
+        """
+        rows = self._db().execute("SELECT stage, COUNT(*) FROM journal WHERE run_id=? GROUP BY stage", (self.run_id,)).fetchall()
+        return dict(rows)
+
+    def __repr__(self):
+        return "RunJournal('{}', resumed={}, {})".format(self.run_id, self.resumed, self.summary())
@@ -0,0 +1,414 @@
+""" runner.py
+
+Parallele Simulation der Versuche in mehreren PowerFactory-Instanzen.
+
+Die Versuche einer Kampagne (z.B. 4120 Typ1: 17 Versuche) sind voneinander unabhängig.
+run_parallel verteilt sie auf einen Prozesspool, in dem jeder Prozess eine eigene Instanz
+(engine) besitzt: PowerFactory im Engine-Modus (PowerFactoryEngine) oder ein Ersatz mit
+derselben app-Schnittstelle. Die Versuche werden nach absteigender Simulationsdauer gestartet
+(longest job first), sodass die 60 s-Versuche (14-17) nicht am Ende allein laufen.
+
+Jede Instanz benötigt ein eigenes Projekt (z.B. Kopien "Park_{worker}"), da PowerFactory ein
+aktiviertes Projekt sperrt und die Ergebnisse (ElmRes) im Projekt gespeichert werden.
+Beendet sich ein Workerprozess (z.B. Absturz der Instanz), wird der laufende Versuch als
+abgebrochen gemeldet und der neu gestartete Prozess übernimmt Workernummer und Projekt (WorkerState).
+"""
+import logging
+import multiprocessing
+import os
+import sys
+import traceback
+from time import time
+
+from main.fault_table import FaultRecord
+from main.instrumentation import Instrumentation, get_active, span
+from main.pf_index import ObjectIndex
+from main.pf_proxy import WriteCache
+from main.pf_functions import (set_grid, create_load_flow_controller, sync_faults_scenarios,
+                               sync_res_vars, simulate_fault, scenario_names, EXPORT_DIR)
+from main.result_cache import run_settings, fault_key
+from main.runtime_history import sim_duration, stage_durations, Progress
+
+
+# PowerFactory-Instanz des Prozesses je Benutzer (siehe PowerFactoryEngine)
+_applications = {}
+
+
+class PowerFactoryEngine:
+    """ PowerFactoryEngine: class
+
+    Erzeugt in einem Workerprozess eine PowerFactory-Instanz im Engine-Modus und aktiviert das Projekt.
+    Die Instanz wird erst im Workerprozess erzeugt, das Objekt selbst ist daher picklebar.
+
+    Attributes:
+    ----------
+    project: str
+        Projektname oder Pfad. Der Platzhalter {worker} wird durch die Nummer des Workers (0..N-1) ersetzt,
+        z.B. "\\\\Benutzer\\\\Park_{worker}"
+    study_case: str or None
+        Name des zu aktivierenden Berechnungsfalls (None: aktiver Berechnungsfall des Projekts)
+    user: str or None
+        PowerFactory-Benutzer (None: Standardbenutzer)
+    pf_path: str or None
+        Verzeichnis des powerfactory Python-Moduls, z.B. "C:\\\\Program Files\\\\DIgSILENT\\\\PowerFactory 2022\\\\Python\\\\3.9"
+    """
+
+    def __init__(self, project, study_case=None, user=None, pf_path=None):
+        self.project = project
+        self.study_case = study_case
+        self.user = user
+        self.pf_path = pf_path
+
+    def __call__(self, worker=0):
+        # Eine Instanz je Prozess: weitere Aufrufe (z.B. andere Projekte eines Batchlaufs) aktivieren nur das Projekt
+        app = _applications.get(self.user)
+        if app is None:
+            if self.pf_path is not None and self.pf_path not in sys.path:
+                sys.path.append(self.pf_path)
+            import powerfactory as pf
+            app = _applications[self.user] = pf.GetApplicationExt(self.user) if self.user else pf.GetApplicationExt()
+        return self.activate(app, worker)
+
+    def activate(self, app, worker=0):
+        """ activate: method
+            Aktiviert das Projekt (und den Berechnungsfall) des Workers in einer vorhandenen Instanz,
+            z.B. beim Wechsel zwischen den Projekten eines Batchlaufs (siehe batch).
+        """
+        project = self.project.format(worker=worker)
+        if app.ActivateProject(project):
+            raise RuntimeError("PowerFactoryEngine: Projekt {} konnte nicht aktiviert werden".format(project))
+        if self.study_case is not None:
+            study_case = app.GetProjectFolder('study').GetContents('{}.IntCase'.format(self.study_case), 1)[0]
+            if not study_case:
+                raise RuntimeError("PowerFactoryEngine: Berechnungsfall {} nicht gefunden".format(self.study_case))
+            study_case[0].Activate()
+        return app
+
+    def __repr__(self):
+        return "PowerFactoryEngine(project='{}', study_case={})".format(self.project, self.study_case)
+
+
+def schedule_faults(faults, t_sim, estimate=None):
+    """ schedule_faults: function
+        Gibt die Positionen der Versuche sortiert nach absteigender geschätzter Laufzeit zurück (longest job first).
+        estimate: fault -> Laufzeit in s (z.B. RuntimeHistory.estimator). Default: None -> Simulationsdauer.
+        Bei gleicher Laufzeit bleibt die Reihenfolge der Fehlertabelle erhalten.
+    """
+    if estimate is None:
+        estimate = lambda fault: sim_duration(fault, t_sim)
+    runtimes = [estimate(fault) for fault in faults]
+    return sorted(range(len(faults)), key=lambda i: -runtimes[i])
+
+
+# Zustand des Workerprozesses (wird von _init_worker gesetzt)
+_worker = {}
+
+
+class WorkerState:
+    """ WorkerState: class
+
+    Gemeinsamer Zustand der Workerprozesse eines Pools je Workernummer: Prozess-ID und Nummer des laufenden
+    Auftrags (-1: keiner). Beendet sich ein Workerprozess (z.B. Absturz der Instanz), startet der Pool einen
+    neuen Prozess, der auf eine freie Workernummer wartet. lost gibt die Nummer des beendeten Workers wieder frei
+    und meldet den verlorenen Auftrag, dessen Ergebnis sonst nie eintreffen würde.
+
+    Attributes:
+    ----------
+    pids: multiprocessing.Array
+        Prozess-ID je Workernummer (0: nicht vergeben)
+    jobs: multiprocessing.Array
+        Nummer des laufenden Auftrags je Workernummer (runner: Position des Versuchs, -1: keiner)
+    """
+
+    def __init__(self, ctx, num_workers):
+        self.pids = ctx.Array("l", [0]*num_workers)
+        self.jobs = ctx.Array("l", [-1]*num_workers)
+
+    def start(self, worker, number):
+        self.jobs[worker] = number
+
+    def done(self, worker):
+        self.jobs[worker] = -1
+
+    def lost(self, worker_ids, alive):
+        """ lost: method
+            Gibt die Paare (Workernummer, Auftrag) der Workerprozesse zurück, die nicht mehr laufen (alive: Menge der
+            Prozess-IDs, z.B. aus multiprocessing.active_children), und legt deren Workernummern in worker_ids zurück.
+            Auftrag ist -1, wenn der Worker keinen Auftrag bearbeitet hat.
+        """
+        lost = []
+        for worker in range(len(self.pids)):
+            if self.pids[worker] and self.pids[worker] not in alive:
+                lost.append((worker, self.jobs[worker]))
+                self.pids[worker] = 0
+                self.jobs[worker] = -1
+                worker_ids.put(worker)
+        return lost
+
+
+def claim_worker_id(worker_ids, worker_state):
+    """ claim_worker_id: function
+        Gibt eine freie Workernummer aus worker_ids zurück und vermerkt die Prozess-ID (wartet, bis eine Nummer frei ist).
+    """
+    worker = worker_ids.get()
+    worker_state.pids[worker] = os.getpid()
+    return worker
+
+
+def lost_job_result(worker, position, test):
+    """ Gibt das Ergebnis eines Auftrags zurück, dessen Workerprozess sich während der Bearbeitung beendet hat. """
+    return {"position": position, "test": test, "worker": worker, "err": None, "runtime": 0.0,
+            "error": "Workerprozess {} während Versuch {} beendet (z.B. Absturz der Instanz)".format(worker, test)}
+
+
+def _worker_logger(worker, log_dir):
+    """ Gibt den Logger eines Workerprozesses zurück (Logdatei Log_DynSim_worker<N>.log in log_dir oder keine Ausgabe). """
+    logger = logging.getLogger("{}.worker{}".format(__name__, worker))
+    logger.setLevel(logging.DEBUG)
+    if log_dir is not None:
+        file_handler = logging.FileHandler(os.path.join(log_dir, "Log_DynSim_worker{}.log".format(worker)), mode="w")
+        file_handler.setFormatter(logging.Formatter(fmt='%(asctime)s:%(levelname)s:%(message)s', datefmt='%Y-%m-%d %H:%M:%S'))
+        logger.addHandler(file_handler)
+    else:
+        logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+    return logger
+
+
+def _prepare_project(app, logger, grid_model, res_vars, settings):
+    """ Bringt das Projekt einer Instanz auf den Stand des Laufs und gibt den Objektindex zurück. """
+    obj_index = ObjectIndex(app, write_cache=WriteCache())
+    if settings["flag_setup"]:
+        # Projekt des Workers auf den Stand des Laufs bringen (nur Unterschiede werden geschrieben)
+        set_grid(app, grid_model, logger, obj_index=obj_index)
+        if not obj_index.get('*.ElmStactrl'):
+            create_load_flow_controller(app, logger, obj_index=obj_index)
+        sync_faults_scenarios(app, logger, grid_model, obj_index=obj_index)
+        sync_res_vars(app, logger, res_vars, flag_vis=False, obj_index=obj_index)
+    return obj_index
+
+
+def _cache_settings(obj_index, res_vars, settings):
+    """ Gibt die Einstellungen für den Cache-Schlüssel zurück (None ohne Ergebniscache). """
+    if settings["result_cache"] is None:
+        return None
+    return run_settings(obj_index, settings["flag_load_flow_unsym"], settings["t_sim"], res_vars,
+                        decimation=settings["decimation"], flag_store=settings["flag_store"],
+                        flag_keep_dat=settings["flag_keep_dat"], model_version=settings["model_version"])
+
+
+def _simulate(app, logger, obj_index, grid_model, res_vars, fault, settings, cache_settings, export_dir, journal):
+    """ Simuliert einen Versuch im Workerprozess (simulate_fault mit den Einstellungen des Laufs). """
+    cache_key = None
+    if cache_settings is not None:
+        cache_key = fault_key(grid_model, fault, cache_settings)
+    with span("simulate_fault", test=fault.test):
+        return simulate_fault(app, logger, fault, settings["flag_load_flow_unsym"], res_vars, settings["t_sim"],
+                              obj_index=obj_index, export_dir=export_dir, flag_store=settings["flag_store"],
+                              flag_keep_dat=settings["flag_keep_dat"], flag_single_export=settings["flag_single_export"],
+                              decimation=settings["decimation"], result_cache=settings["result_cache"],
+                              cache_key=cache_key, journal=journal,
+                              scenario_name=scenario_names(grid_model.list_of_faults)[fault.test])
+
+
+def _start_instrumentation(worker, settings):
+    """ Startet die Messpunkte eines Versuchs im Workerprozess (für instrumentation bzw. runtime_history). """
+    if settings["flag_instrument"] or settings["flag_history"]:
+        return Instrumentation("worker{}".format(worker)).start()
+    return None
+
+
+def _stop_instrumentation(result, instrumentation, settings):
+    """ Übernimmt die Laufzeiten je Stufe (durations) und ggf. die Messpunkte (spans) in das Ergebnis. """
+    if instrumentation is None:
+        return
+    instrumentation.stop()
+    result["durations"] = stage_durations(instrumentation.records)
+    if settings["flag_instrument"]:
+        result["spans"] = instrumentation.records
+
+
+def _record_runtime(runtime_history, project, tablename, fault, t_sim, result):
+    """ Speichert die Laufzeit eines simulierten Versuchs (nicht bei Abbruch oder Übernahme aus dem Ergebniscache). """
+    durations = result.get("durations", {})
+    if runtime_history is None or result["error"] is not None or "ComSim" not in durations:
+        return
+    runtime_history.record(project, tablename, fault.test, result.get("sim_mode"), sim_duration(fault, t_sim),
+                           result["runtime"], durations)
+
+
+def _init_worker(engine_factory, worker_ids, worker_state, grid_model, res_vars, settings):
+    """ Initialisiert einen Workerprozess: Instanz erzeugen und Projekt vorbereiten. """
+    worker = claim_worker_id(worker_ids, worker_state)
+    logger = _worker_logger(worker, settings["log_dir"])
+    _worker.update(worker=worker, logger=logger, grid_model=grid_model, res_vars=res_vars, settings=settings,
+                   init_error=None, cache_settings=None, worker_state=worker_state)
+
+    # Fehler bei der Initialisierung werden je Versuch zurückgegeben (eine Exception im
+    # initializer würde den Pool endlos neue Worker starten lassen)
+    try:
+        app = engine_factory(worker)
+        app.EchoOff()
+        obj_index = _prepare_project(app, logger, grid_model, res_vars, settings)
+        # Einstellungen für den Cache-Schlüssel (nach der Vorbereitung des Projekts)
+        _worker["cache_settings"] = _cache_settings(obj_index, res_vars, settings)
+    except Exception:
+        _worker["init_error"] = traceback.format_exc()
+        logger.error("runner: Initialisierung Worker {} fehlgeschlagen:\n{}".format(worker, _worker["init_error"]))
+        return
+    _worker.update(app=app, obj_index=obj_index)
+
+
+def _run_fault(job):
+    """ Simuliert einen Versuch (Position, Zeile der Fehlertabelle) im Workerprozess und gibt das Ergebnis als dictionary zurück. """
+    position, row = job
+    fault = FaultRecord(*row)
+    settings = _worker["settings"]
+    result = {"position": position, "test": fault.test, "worker": _worker["worker"], "err": None, "error": None}
+    if _worker["init_error"] is not None:
+        result["error"] = _worker["init_error"]
+        result["runtime"] = 0.0
+        return result
+    # Messpunkte des Versuchs werden an den Hauptprozess zurückgegeben (siehe instrumentation, runtime_history)
+    instrumentation = _start_instrumentation(_worker["worker"], settings)
+    _worker["worker_state"].start(_worker["worker"], position)
+    tstart = time()
+    try:
+        result["err"] = _simulate(_worker["app"], _worker["logger"], _worker["obj_index"], _worker["grid_model"],
+                                  _worker["res_vars"], fault, settings, _worker["cache_settings"],
+                                  settings["export_dir"], settings["journal"])
+        result["sim_mode"] = _worker["obj_index"].from_study_case('ComInc').iopt_sim
+    except Exception:
+        result["error"] = traceback.format_exc()
+        _worker["logger"].error("runner: Versuch {} abgebrochen:\n{}".format(fault.test, result["error"]))
+    result["runtime"] = time() - tstart
+    _worker["worker_state"].done(_worker["worker"])
+    _stop_instrumentation(result, instrumentation, settings)
+    return result
+
+
+def _collect(iterator, num_jobs, worker_ids, worker_state, lost_result, logger, key="position", timeout=5.0):
+    """ Gibt die Ergebnisse aus iterator (imap_unordered) zurück, bis alle num_jobs Aufträge abgeschlossen sind.
+        Beendete Workerprozesse werden alle timeout s erkannt, für ihren laufenden Auftrag (Nummer wie result[key])
+        wird lost_result(worker, Nummer) zurückgegeben.
+    """
+    numbers = set()
+    while len(numbers) < num_jobs:
+        try:
+            result = iterator.next(timeout=timeout)
+        except multiprocessing.TimeoutError:
+            alive = {process.pid for process in multiprocessing.active_children()}
+            for worker, number in worker_state.lost(worker_ids, alive):
+                logger.error("Workerprozess {} beendet, Workernummer wieder freigegeben".format(worker))
+                if number >= 0 and number not in numbers:
+                    numbers.add(number)
+                    yield lost_result(worker, number)
+            continue
+        numbers.add(result[key])
+        yield result
+
+
+def run_parallel(engine_factory, grid_model, res_vars, flag_load_flow_unsym, t_sim, num_workers=None,
+                 logger=None, flag_setup=True, log_dir=None, python_exe=None, export_dir=EXPORT_DIR,
+                 flag_store=False, flag_keep_dat=True, flag_single_export=False, decimation=None,
+                 result_cache=None, model_version="", journal=None, runtime_history=None, project="", tablename="",
+                 sim_mode=None):
+    """ run_parallel: function
+        Simuliert alle Versuche aus grid_model.list_of_faults in num_workers parallelen Instanzen.
+
+    Parameters
+    ----------
+    engine_factory: callable
+        Picklebares Objekt, das im Workerprozess mit der Workernummer aufgerufen wird und eine
+        app mit der PowerFactory-Schnittstelle zurückgibt, z.B. PowerFactoryEngine("Park_{worker}")
+    grid_model: GridModel
+        Netzmodell des Laufs mit den Fehlerereignissen
+    res_vars: dict
+        Variablenauswahl für die Messstellen (json_res_vars.txt)
+    flag_load_flow_unsym: bool
+        True: Alle Lastflüsse und Berechnung der Anfangsbedingungen werden unsymmetrisch ausgeführt
+    t_sim: float
+        Simulationsdauer in s
+    num_workers: int (optional)
+        Anzahl der Workerprozesse. Default: None -> min(Anzahl Versuche, Anzahl CPU-Kerne)
+    logger: logging.logger object (optional)
+        Logger für den Fortschritt im Hauptprozess
+    flag_setup: bool
+        True: Jeder Worker stellt Netzdaten, Betriebs-/Fehlerfälle und Variablenauswahl in seinem
+        Projekt ein (sync_faults_scenarios/sync_res_vars). False: Projekte sind bereits vorbereitet.
+    log_dir: str (optional)
+        Verzeichnis für die Logdateien der Worker (Log_DynSim_worker<N>.log). Default: keine Logdateien
+    python_exe: str (optional)
+        Python-Interpreter für die Workerprozesse. Notwendig, wenn der Hauptprozess in PowerFactory
+        läuft (sys.executable ist dann PowerFactory.exe).
+    export_dir, flag_store, flag_keep_dat, flag_single_export, decimation:
+        Export und Ergebnisdateien der Versuche (siehe pf_functions.execute_simulation)
+    result_cache, model_version:
+        Ergebniscache (siehe pf_functions.execute_simulation). Alle Worker verwenden denselben Cache.
+    journal: RunJournal (optional)
+        Laufjournal (siehe run_journal): abgeschlossene Versuche werden nicht verteilt, die Worker speichern den Stand je Versuch
+    runtime_history: RuntimeHistory (optional)
+        Laufzeithistorie (siehe runtime_history): Reihenfolge nach geschätzter Laufzeit, Restlaufzeit im Log,
+        gemessene Laufzeiten werden gespeichert. Default: None -> Reihenfolge nach Simulationsdauer
+    project, tablename, sim_mode:
+        Projekt, Fehlertabelle und Simulationsart ("rms"/"ins", None: unbekannt) für die Laufzeithistorie
+
+    Returns
+    -------
+    results: list
+        Ein dictionary je Versuch (mit journal: je nicht abgeschlossenem Versuch) in der Reihenfolge der Fehlertabelle mit den keys
+        position, test, worker, err (Rückgabewert von simulate_fault), error (Traceback oder None), runtime in s
+    """
+    if logger is None:
+        logger = logging.getLogger(__name__)
+    faults = list(grid_model.list_of_faults)
+    if journal is not None:
+        faults = journal.pending(faults)
+    if not faults:
+        return []
+    estimate = runtime_history.estimator(project, tablename, t_sim, sim_mode=sim_mode) if runtime_history is not None else None
+    order = schedule_faults(faults, t_sim, estimate=estimate)
+    if num_workers is None:
+        num_workers = min(len(faults), os.cpu_count() or 1)
+    num_workers = max(1, min(num_workers, len(faults)))
+    logger.info("run_parallel: {} Versuche auf {} Worker, Reihenfolge: {}".format(len(faults), num_workers, [faults[i].test for i in order]))
+    estimates = [estimate(fault) if estimate is not None else sim_duration(fault, t_sim) for fault in faults]
+    progress = Progress(enumerate(estimates), num_workers)
+
+    ctx = multiprocessing.get_context("spawn")
+    if python_exe is not None:
+        ctx.set_executable(python_exe)
+    worker_ids = ctx.Queue()
+    for worker in range(num_workers):
+        worker_ids.put(worker)
+    worker_state = WorkerState(ctx, num_workers)
+    # Ist im Hauptprozess eine Instrumentation aktiv, zeichnen die Worker je Versuch Messpunkte auf
+    instrumentation = get_active()
+    settings = {"flag_load_flow_unsym": flag_load_flow_unsym, "t_sim": t_sim,
+                "flag_setup": flag_setup, "log_dir": log_dir, "flag_instrument": instrumentation is not None,
+                "export_dir": export_dir, "flag_store": flag_store, "flag_keep_dat": flag_keep_dat,
+                "flag_single_export": flag_single_export, "decimation": decimation,
+                "result_cache": result_cache, "model_version": model_version, "journal": journal,
+                "flag_history": runtime_history is not None}
+
+    results = {}
+    tstart = time()
+    with ctx.Pool(num_workers, initializer=_init_worker,
+                  initargs=(engine_factory, worker_ids, worker_state, grid_model, res_vars, settings)) as pool:
+        # chunksize=1: jeder Versuch wird einzeln vergeben, damit die Reihenfolge erhalten bleibt
+        jobs = [(i, faults[i].params() + (faults[i].Rf, faults[i].Xf)) for i in order]
+        lost_result = lambda worker, position: lost_job_result(worker, position, faults[position].test)
+        for result in _collect(pool.imap_unordered(_run_fault, jobs, chunksize=1), len(jobs), worker_ids,
+                               worker_state, lost_result, logger):
+            results[result["position"]] = result
+            _record_runtime(runtime_history, project, tablename, faults[result["position"]], t_sim, result)
+            progress.update(result["position"], result["runtime"])
+            if instrumentation is not None:
+                instrumentation.add_records(result.pop("spans", []), worker=result["worker"])
+            if result["error"] is not None:
+                logger.error("run_parallel: Versuch {} (Worker {}) abgebrochen:\n{}".format(result["test"], result["worker"], result["error"]))
+            else:
+                logger.info("run_parallel: Versuch {} (Worker {}) in {} s simuliert ({})".format(
+                    result["test"], result["worker"], round(result["runtime"], 2), progress.message()))
+    logger.info("run_parallel: {} Versuche in {} s simuliert".format(len(results), round(time() - tstart, 2)))
+    return [results[i] for i in sorted(results)]
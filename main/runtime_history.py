@@ -0,0 +1,185 @@
+""" runtime_history.py
+
+Laufzeithistorie je Versuch für die Reihenfolge der Simulationen und die Restlaufzeit (ETA).
+
+Die Fehlerdauern der Tabellen FAULTS_* liegen zwischen 0,15 s und 60 s, die Simulationsdauer ist
+max(t_sim, 1 + Fehlerdauer + 5) s. Die Wandzeit je Versuch unterscheidet sich daher um mehr als den
+Faktor 10. RuntimeHistory speichert die gemessenen Laufzeiten (Lastfluss, ComInc, ComSim, Export, gesamt)
+je Projekt, Fehlertabelle, Versuch und Simulationsart (rms/ins) in einer lokalen sqlite3-Datenbank
+und schätzt daraus die Laufzeit kommender Versuche:
+    1. Median der letzten Läufe desselben Projekts und Versuchs
+    2. Median desselben Versuchs in anderen Projekten
+    3. Wandzeit je simulierter Sekunde (Median der Simulationsart) * Simulationsdauer
+    4. ohne Historie: Simulationsdauer in s
+Mit den Schätzungen ordnen runner/batch die Versuche (longest job first); Progress gibt während des
+Laufs die Restlaufzeit aus, korrigiert um das Verhältnis gemessener zu geschätzter Laufzeit.
+"""
+import sqlite3
+import statistics
+import time
+
+# span-Namen (siehe instrumentation) -> Stufe in der Historie
+STAGES = {"ComLdf": "ComLdf", "ComInc": "ComInc", "ComSim": "ComSim", "execute_export": "export", "result_store": "export"}
+# Anzahl der letzten Läufe je Versuch für den Median
+HISTORY_DEPTH = 5
+
+
+def sim_duration(fault, t_sim):
+    """ sim_duration: function
+        Gibt die Simulationsdauer eines Versuchs in s zurück (wie simulate_fault: mindestens 1 s + Fehlerdauer + 5 s).
+    """
+    return max(t_sim, 1 + fault.duration + 5)
+
+
+def stage_durations(records, test=None):
+    """ stage_durations: function
+        Gibt die Summe der Wandzeit je Stufe (siehe STAGES) der Messpunkte records (instrumentation) eines Versuchs zurück.
+        test: Messpunkte anderer Versuche (tag test, z.B. aus der Pipeline) nicht berücksichtigen
+    """
+    durations = {}
+    for record in records:
+        stage = STAGES.get(record["name"])
+        if test is not None and record["tags"].get("test", test) != test:
+            continue
+        if stage is not None:
+            durations[stage] = durations.get(stage, 0.0) + record["duration"]
+    return durations
+
+
+class RuntimeHistory:
+    """ RuntimeHistory: class
+
+    Gemessene Laufzeiten je (Projekt, Fehlertabelle, Versuch, Simulationsart) in sqlite3.
+
+    Attributes:
+    ----------
+    db_name: str
+        Pfad der sqlite3-Datenbank, z.B. "./data/DB_Runtime.db"
+
+    Methods:
+    -------
+    record:
+        Speichert die Laufzeiten eines Versuchs
+    predict:
+        Schätzt die Laufzeit eines Versuchs in s
+    estimator:
+        Gibt eine Schätzfunktion fault -> s für runner.schedule_faults zurück
+    """
+
+    def __init__(self, db_name):
+        self.db_name = db_name
+        self._conn = None
+
+    def __getstate__(self):
+        # Verbindung nicht an Workerprozesse übergeben (wird dort neu geöffnet)
+        state = self.__dict__.copy()
+        state["_conn"] = None
+        return state
+
+    def _db(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_name, timeout=60)
+            with self._conn:
+                self._conn.execute("CREATE TABLE IF NOT EXISTS runtimes (project TEXT, tablename TEXT, test TEXT, "
+                                   "sim_mode TEXT, t_stop REAL, total REAL, ComLdf REAL, ComInc REAL, ComSim REAL, "
+                                   "export REAL, recorded REAL)")
+                self._conn.execute("CREATE INDEX IF NOT EXISTS runtimes_test ON runtimes (tablename, test, sim_mode)")
+        return self._conn
+
+    def record(self, project, tablename, test, sim_mode, t_stop, total, durations=None):
+        """ record: method
+            Speichert die Laufzeit total in s (simulate_fault) und die Laufzeiten je Stufe durations
+            (siehe stage_durations) eines Versuchs mit der Simulationsdauer t_stop in s.
+        """
+        durations = durations or {}
+        with self._db() as conn:
+            conn.execute("INSERT INTO runtimes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                         (project, tablename, str(test), sim_mode, t_stop, total, durations.get("ComLdf"),
+                          durations.get("ComInc"), durations.get("ComSim"), durations.get("export"), time.time()))
+
+    def _totals(self, where, parameters):
+        rows = self._db().execute("SELECT total FROM runtimes WHERE {} ORDER BY recorded DESC LIMIT ?".format(where),
+                                  parameters + (HISTORY_DEPTH,)).fetchall()
+        return [row[0] for row in rows]
+
+    def predict(self, project, tablename, fault, t_sim, sim_mode=None):
+        """ predict: method
+            Schätzt die Laufzeit des Versuchs fault in s (siehe Modulbeschreibung).
+            sim_mode: "rms" oder "ins", None: alle Simulationsarten
+        """
+        mode = "" if sim_mode is None else " AND sim_mode=?"
+        mode_parameters = () if sim_mode is None else (sim_mode,)
+        totals = self._totals("project=? AND tablename=? AND test=?" + mode, (project, tablename, str(fault.test)) + mode_parameters)
+        if not totals:
+            totals = self._totals("tablename=? AND test=?" + mode, (tablename, str(fault.test)) + mode_parameters)
+        if totals:
+            return statistics.median(totals)
+        t_stop = sim_duration(fault, t_sim)
+        rates = [row[0] for row in self._db().execute(
+            "SELECT total/t_stop FROM runtimes WHERE t_stop > 0" + mode + " ORDER BY recorded DESC LIMIT 100",
+            mode_parameters).fetchall()]
+        if rates:
+            return statistics.median(rates)*t_stop
+        return t_stop
+
+    def estimator(self, project, tablename, t_sim, sim_mode=None):
+        """ estimator: method
+            Gibt eine Funktion fault -> geschätzte Laufzeit in s zurück (z.B. für runner.schedule_faults).
+        """
+        return lambda fault: self.predict(project, tablename, fault, t_sim, sim_mode=sim_mode)
+
+    def __repr__(self):
+        count = self._db().execute("SELECT COUNT(*) FROM runtimes").fetchone()[0]
+        return "RuntimeHistory('{}', records={})".format(self.db_name, count)
+
+
+class Progress:
+    """ Progress: class
+
+    Restlaufzeit (ETA) eines Laufs aus den geschätzten Laufzeiten der Versuche.
+
+    Attributes:
+    ----------
+    estimates: dictionary
+        Versuch (key) -> geschätzte Laufzeit in s
+    num_workers: int
+        Anzahl der parallel simulierenden Instanzen
+
+    Methods:
+    -------
+    update:
+        Meldet einen abgeschlossenen Versuch und gibt die Restlaufzeit in s zurück
+    """
+
+    def __init__(self, estimates, num_workers=1):
+        self.estimates = dict(estimates)
+        self.num_workers = max(1, num_workers)
+        self._pending = set(self.estimates)
+        self._predicted = 0.0
+        self._actual = 0.0
+
+    def update(self, key, runtime):
+        """ update: method
+            Meldet den Versuch key mit der Laufzeit runtime in s. Gibt die Restlaufzeit in s zurück: verbleibende
+            Schätzungen * (gemessen/geschätzt der abgeschlossenen Versuche) / num_workers.
+        """
+        if key in self._pending:
+            self._pending.discard(key)
+            self._predicted += self.estimates[key]
+            self._actual += runtime
+        return self.remaining()
+
+    def remaining(self):
+        """ remaining: method
+            Gibt die geschätzte Restlaufzeit in s zurück.
+        """
+        factor = self._actual/self._predicted if self._predicted > 0 and self._actual > 0 else 1.0
+        return sum(self.estimates[key] for key in self._pending)*factor/self.num_workers
+
+    def message(self):
+        """ message: method
+            Gibt Fortschritt und Restlaufzeit als Text zurück, z.B. "12/17, Restlaufzeit 95 s (ETA 14:32:10)".
+        """
+        remaining = self.remaining()
+        return "{}/{}, Restlaufzeit {} s (ETA {})".format(len(self.estimates) - len(self._pending), len(self.estimates),
+                                                          round(remaining), time.strftime("%H:%M:%S", time.localtime(time.time() + remaining)))
@@ -0,0 +1,282 @@
+""" symcomp.py
+
+Symmetrische Komponenten aus exportierten Leitergrößen unsymmetrischer Versuche (phases != 3).
+
+RMS-Export:
+    Leiter-Leiter-Spannungen n:ul:<bus>:A/B/C sind Beträge ohne Winkel. Da sich die drei
+    Leiter-Leiter-Spannungen zu null ergänzen, folgen Mit- und Gegensystem aus dem Spannungsdreieck:
+    |U1|² + |U2|² = (Uab² + Ubc² + Uca²)/3 und |U1|² - |U2|² = 4/√3 * Fläche (Mitsystem überwiegt).
+    Sind Winkel exportiert (n:phiu, m:phii in °), werden die Komponenten aus den Zeigern berechnet.
+EMT-Export:
+    Augenblickswerte werden mit einer gleitenden DFT über eine Periode der Netzfrequenz in Zeiger
+    (Effektivwerte) umgerechnet. Die Dateien werden blockweise gelesen (results.iter_dat); die letzte
+    Periode eines Blocks wird für den nächsten Block vorgehalten. Die Schrittweite muss konstant sein
+    (kein dezimierter Export, siehe results.export_windows).
+
+Wirk- und Blindstrom beziehen sich auf die Mitsystem- bzw. Gegensystemspannung der Phase
+(Leiter-Leiter-Größen: Mitsystem -30°, Gegensystem +30°). Blindstrom positiv: induktiv (übererregt,
+Erzeugerzählpfeilsystem).
+"""
+import numpy as np
+
+from main.results import iter_dat
+
+F_NOM = 50.0
+A = np.exp(2j*np.pi/3)
+# Drehung der Leiter-Leiter-Zeiger auf die Leiter-Erde-Zeiger (Mit-/Gegensystem)
+ROTATION_LL = {1: np.exp(-1j*np.pi/6), 2: np.exp(1j*np.pi/6)}
+PHASES = ("A", "B", "C")
+
+
+def sequence(xa, xb, xc):
+    """ sequence: function
+        Gibt Null-, Mit- und Gegensystem (x0, x1, x2) der Zeiger xa, xb, xc (komplex) zurück.
+    """
+    return (xa + xb + xc)/3, (xa + A*xb + A*A*xc)/3, (xa + A*A*xb + A*xc)/3
+
+
+def sequence_from_line_magnitudes(uab, ubc, uca):
+    """ sequence_from_line_magnitudes: function
+        Gibt die Beträge von Mit- und Gegensystem (u1, u2) aus den Beträgen der Leiter-Leiter-Spannungen zurück.
+    """
+    s = (uab + ubc + uca)/2
+    area = np.sqrt(np.clip(s*(s - uab)*(s - ubc)*(s - uca), 0.0, None))
+    total = (uab**2 + ubc**2 + uca**2)/6
+    return np.sqrt(total + 2/np.sqrt(3)*area), np.sqrt(np.clip(total - 2/np.sqrt(3)*area, 0.0, None))
+
+
+def current_components(i, u):
+    """ current_components: function
+        Gibt Wirk- und Blindanteil (ip, iq) des Stromzeigers i bezogen auf den Spannungszeiger u zurück.
+    """
+    with np.errstate(invalid="ignore", divide="ignore"):
+        reference = np.where(np.abs(u) > 1e-6, u/np.abs(u), np.nan)
+    s = i*np.conj(reference)
+    return s.real, -s.imag
+
+
+class SlidingDFT:
+    """ SlidingDFT: class
+
+    Gleitende DFT über eine Periode (Grundschwingung) für mehrere Signale, blockweise.
+
+    Attributes:
+    ----------
+    dt: float
+        Schrittweite der Augenblickswerte in s
+    n: int
+        Anzahl der Abtastwerte je Periode
+
+    Methods:
+    -------
+    process:
+        Gibt die Zeiger (Effektivwerte, komplex) zu einem Block von Augenblickswerten zurück.
+        Die erste Periode nach Beginn ist nan.
+    """
+
+    def __init__(self, dt, f_nom=F_NOM):
+        self.dt = dt
+        self.omega = 2*np.pi*f_nom
+        self.n = int(round(1/(f_nom*dt)))
+        if self.n < 4:
+            raise ValueError("SlidingDFT: Schrittweite {} s zu groß für f={} Hz".format(dt, f_nom))
+        self._tail = None  # letzte n Werte von x*exp(-jωt) des vorherigen Blocks
+        self._t_last = None
+
+    def process(self, t, x):
+        """ process: method
+
+        Parameters
+        ----------
+        t: numpy.ndarray
+            Zeitpunkte des Blocks in s, shape (k,), Schrittweite dt
+        x: numpy.ndarray
+            Augenblickswerte, shape (k, Anzahl Signale)
+        """
+        steps = np.diff(t) if self._t_last is None else np.diff(np.concatenate(([self._t_last], t)))
+        if steps.size and np.any(np.abs(steps - self.dt) > 0.01*self.dt):
+            raise ValueError("SlidingDFT: Schrittweite nicht konstant {} s (dezimierter Export?)".format(self.dt))
+        z = x*np.exp(-1j*self.omega*t)[:, None]
+        if self._tail is None:
+            self._tail = np.full((self.n, x.shape[1]), np.nan + 0j)
+        z_all = np.concatenate((self._tail, z))
+        cumsum = np.concatenate((np.zeros((1, x.shape[1]), dtype=complex), np.nancumsum(z_all, axis=0)))
+        # Summe über die letzten n Werte je Zeitpunkt des Blocks
+        window = cumsum[self.n + 1:] - cumsum[1:len(z) + 1]
+        phasors = np.sqrt(2)/self.n*window
+        # Einschwingen: Fenster mit Werten vor Beginn (nan) ungültig
+        valid = ~np.isnan(z_all).any(axis=1)
+        count = np.concatenate(([0], np.cumsum(valid)))
+        phasors[(count[self.n + 1:] - count[1:len(z) + 1]) < self.n] = np.nan
+        self._tail = z_all[-self.n:]
+        self._t_last = t[-1]
+        return phasors
+
+
+def _columns(variables, prefix):
+    """ Gibt die Spaltennummern der Leitergrößen A, B, C mit dem Präfix prefix zurück (None, wenn nicht vollständig). """
+    columns = []
+    for phase in PHASES:
+        matches = [i for i, variable in enumerate(variables) if variable.startswith(prefix) and variable.endswith(":" + phase)]
+        if not matches:
+            return None
+        columns.append(matches[0])
+    return columns
+
+
+class SymCompStream:
+    """ SymCompStream: class
+
+    Berechnet blockweise die symmetrischen Komponenten einer Exportdatei.
+
+    Attributes:
+    ----------
+    variables: list
+        Variablen der Exportdatei (zweite Kopfzeile)
+    flag_emt: bool
+        True: Augenblickswerte (EMT), False: Effektivwerte (RMS)
+    dt: float
+        Schrittweite der Augenblickswerte in s (EMT). None: aus den ersten beiden Zeitpunkten
+
+    Methods:
+    -------
+    process:
+        Gibt zu einem Block (dictionary wie results.iter_dat) ein dictionary mit t und den Komponenten zurück:
+        u0, u1, u2 (Beträge), i0, i1, i2 (Beträge), ip1, iq1, iq2. Nicht berechenbare Größen sind nan.
+    """
+
+    def __init__(self, variables, flag_emt, f_nom=F_NOM, dt=None):
+        self.variables = variables
+        self.flag_emt = flag_emt
+        self.f_nom = f_nom
+        self.dt = dt
+        # Leiter-Leiter- (ul) oder Leiter-Erde-Spannungen (u), Ströme (I)
+        self.u_columns, self.flag_ll = _columns(variables, "n:ul:"), True
+        if self.u_columns is None:
+            self.u_columns, self.flag_ll = _columns(variables, "n:u:"), False
+        self.i_columns = _columns(variables, "m:I:")
+        self.phiu_columns = _columns(variables, "n:phiu:")
+        self.phii_columns = _columns(variables, "m:phii:")
+        self.pq_columns = [self._find("m:I1P:"), self._find("m:I1Q:")]
+        self._dft = None
+        self._pending = None  # erster Block mit nur einem Zeitpunkt (t, x), solange dt unbekannt ist
+
+    def _find(self, prefix):
+        matches = [i for i, variable in enumerate(self.variables) if variable.startswith(prefix)]
+        return matches[0] if matches else None
+
+    def _phasors(self, data, columns, angle_columns, emt):
+        """ Gibt die Zeiger der Leitergrößen (shape (k, 3)) zurück (None, wenn nur Beträge vorhanden sind). """
+        if columns is None:
+            return None
+        if emt is not None:
+            return np.column_stack([emt[i] for i in columns])
+        if angle_columns is None:
+            return None
+        return data[:, columns]*np.exp(1j*np.deg2rad(data[:, angle_columns]))
+
+    def process(self, chunk):
+        """ process: method
+            Berechnet die Komponenten zu einem Block (siehe Methods).
+        """
+        data = chunk["data"]
+        t = data[:, 0]
+        nan = np.full(t.shape, np.nan)
+        result = {"t": t}
+        emt = None
+        if self.flag_emt:
+            # Zeiger aller Leitergrößen aus der gleitenden DFT (Spaltennummer -> Zeiger)
+            columns = (self.u_columns or []) + (self.i_columns or [])
+            x = data[:, columns]
+            if self._dft is None:
+                dt = self.dt
+                if dt is None:
+                    t_all = t if self._pending is None else np.concatenate((self._pending[0], t))
+                    dt = t_all[1] - t_all[0] if len(t_all) > 1 else None
+                if dt is None:
+                    # Nur ein Zeitpunkt: Schrittweite erst mit dem nächsten Block bekannt,
+                    # die Zeiger der ersten Periode sind ohnehin nan
+                    self._pending = (t, x)
+                    emt = dict(zip(columns, np.full((len(columns), len(t)), np.nan + 0j)))
+                else:
+                    self._dft = SlidingDFT(dt, self.f_nom)
+                    if self._pending is not None:
+                        self._dft.process(*self._pending)
+                        self._pending = None
+            if self._dft is not None:
+                emt = dict(zip(columns, self._dft.process(t, x).T))
+
+        u = self._phasors(data, self.u_columns, self.phiu_columns, emt)
+        if u is not None:
+            u0, u1, u2 = sequence(u[:, 0], u[:, 1], u[:, 2])
+            if self.flag_ll:
+                # Leiter-Leiter-Zeiger: Nullsystem entfällt, Winkel auf Leiter-Erde beziehen
+                u0, u1, u2 = nan, u1*ROTATION_LL[1], u2*ROTATION_LL[2]
+            result.update(u0=np.abs(u0), u1=np.abs(u1), u2=np.abs(u2))
+        elif self.u_columns is not None and self.flag_ll:
+            u1, u2 = sequence_from_line_magnitudes(*(data[:, i] for i in self.u_columns))
+            result.update(u0=nan, u1=u1, u2=u2)
+        else:
+            result.update(u0=nan, u1=nan, u2=nan)
+
+        i = self._phasors(data, self.i_columns, self.phii_columns, emt)
+        if i is not None:
+            i0, i1, i2 = sequence(i[:, 0], i[:, 1], i[:, 2])
+            result.update(i0=np.abs(i0), i1=np.abs(i1), i2=np.abs(i2))
+            if u is not None:
+                ip1, iq1 = current_components(i1, u1)
+                result.update(ip1=ip1, iq1=iq1, iq2=current_components(i2, u2)[1])
+        for name in ("i0", "i1", "i2", "ip1", "iq1", "iq2"):
+            result.setdefault(name, nan)
+        # RMS: Wirk-/Blindstrom des Mitsystems aus dem Export, wenn keine Zeiger vorhanden sind
+        if not self.flag_emt:
+            for name, column in zip(("ip1", "iq1"), self.pq_columns):
+                if column is not None and np.isnan(result[name]).all():
+                    result[name] = data[:, column]
+        return result
+
+
+def iter_symcomp(fname, flag_emt=None, t_start=None, t_stop=None, chunk_size=100000, f_nom=F_NOM, decimal=".",
+                 dt=None):
+    """ iter_symcomp: function
+        Liest eine Exportdatei blockweise (results.iter_dat) und gibt je Block die symmetrischen Komponenten zurück.
+
+    Parameters
+    ----------
+    fname: str
+        Pfad der Exportdatei, z.B. "C:\\Ausgabe_Skript\\Versuch5_EMT_NAP.dat"
+    flag_emt: bool (optional)
+        True: Augenblickswerte. Default: None -> "_EMT_" im Dateinamen
+    t_start, t_stop: float (optional)
+        Zeitfenster in s (EMT: die erste Periode ab t_start ist nan)
+    chunk_size: int
+        Anzahl der Zeitpunkte je Block
+    f_nom: float
+        Netzfrequenz in Hz
+    decimal: str
+        Dezimaltrennzeichen der Exportdatei
+    dt: float (optional)
+        Schrittweite der Augenblickswerte in s (EMT). Default: None -> aus den ersten beiden Zeitpunkten
+
+    Yields
+    ------
+    result: dictionary
+        Siehe SymCompStream.process
+    """
+    if flag_emt is None:
+        flag_emt = "_EMT_" in fname
+    stream = None
+    for chunk in iter_dat(fname, t_start=t_start, t_stop=t_stop, chunk_size=chunk_size, decimal=decimal):
+        if stream is None:
+            stream = SymCompStream(chunk["variables"], flag_emt, f_nom=f_nom, dt=dt)
+        yield stream.process(chunk)
+
+
+def symcomp_dat(fname, **kwargs):
+    """ symcomp_dat: function
+        Gibt die symmetrischen Komponenten einer Exportdatei als dictionary von numpy.ndarray zurück (siehe iter_symcomp).
+    """
+    chunks = list(iter_symcomp(fname, **kwargs))
+    if not chunks:
+        return {}
+    return {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]}